@@ -0,0 +1,57 @@
+import math
+import numpy as np
+
+# Partials below this many Hz are culled by default; they are too low to hear
+AUDIBLE_LOW = 15.0
+# Width of the fade at each edge of the band, as a frequency ratio
+BAND_FADE = 1.1
+
+class AudibleBand:
+    """Frequency window partials are rendered in, from `low` Hz up to `high` (Nyquist).
+
+    A partial's gain fades smoothly from 1 inside the band to 0 at either
+    edge over one `fade` ratio, so partials gliding across an edge don't
+    click. Partials with a gain of 0 are culled: their state keeps moving
+    but they are not synthesized.
+    """
+    def __init__(self, low, high, fade=BAND_FADE):
+        if fade <= 1:
+            raise ValueError("Band fade must be a frequency ratio above 1")
+        if not 0 <= low * fade < high / fade:
+            raise ValueError("Audible band is too narrow for its fades")
+        self.low = float(low)
+        self.high = float(high)
+        self.fade = float(fade)
+        self._scale = 1 / math.log(self.fade)
+
+    def weight(self, freq):
+        """Gain of a single partial at `freq` Hz"""
+        if freq <= self.low or freq >= self.high:
+            return 0.0
+        x = min(math.log(freq / self.low) * self._scale if self.low > 0 else 1.0,
+                1 - math.log(max(freq * self.fade / self.high, 1.0)) * self._scale, 1.0)
+        return x * x * (3 - 2 * x)
+
+    def gain(self, freq, out, work):
+        """Gain of every partial in `freq`, written to `out`; `work` is a scratch array of the same size"""
+        # Log distance into the band past the low edge and below the high edge, in fades
+        # and clipped to [0, 1]; the fades never overlap, so one of the two is always 1
+        if self.low > 0:
+            np.multiply(freq, 1 / self.low, out=out)
+            np.clip(out, 1.0, self.fade, out=out)
+            np.log(out, out=out)
+            out *= self._scale
+        else:
+            out[:] = 1
+        np.multiply(freq, self.fade / self.high, out=work)
+        np.clip(work, 1.0, self.fade, out=work)
+        np.log(work, out=work)
+        work *= -self._scale
+        work += 1
+        out *= work
+        # Smoothstep, x * x * (3 - 2x)
+        np.multiply(out, -2.0, out=work)
+        work += 3
+        out *= out
+        out *= work
+        return out
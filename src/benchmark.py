@@ -0,0 +1,222 @@
+"""Throughput benchmark for SineGen.audio_callback, run directly without PortAudio.
+
+    python benchmark.py --harmonics 1 100 2000 --chunks 64 1024 --json run.json
+    python benchmark.py --compare before.json after.json
+    python benchmark.py --crossover --chunks 1024
+"""
+import argparse
+import gc
+import itertools
+import json
+import platform
+import string
+import time
+import numpy as np
+from key_state import FakeKeySource
+from sine_gen import SineGen
+
+HARMONIC_COUNTS = (1, 10, 100, 500, 2000)
+CHUNK_SIZES = (32, 64, 256, 1024, 4096)
+# individual: every harmonic has its own trigger key; grouped: blocks of 16 share a group key
+LAYOUTS = ('individual', 'grouped')
+# instant: no amplitude or pitch smoothing; smoothed: the app's per-harmonic defaults
+SMOOTHINGS = ('instant', 'smoothed')
+GROUP_SIZE = 16
+KEYS = string.ascii_lowercase
+
+def build_generator(harmonics, chunk_size, layout, smoothing, engine="loop", oscillator="exact",
+                    sample_rate=44100, engine_options=None, settings=None):
+    """A generator with `harmonics` partials, every one of them triggered"""
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout '{layout}'")
+    if smoothing not in SMOOTHINGS:
+        raise ValueError(f"Unknown smoothing '{smoothing}'")
+    keys = FakeKeySource()
+    generator = SineGen(sample_rate=sample_rate, chunk_size=chunk_size, engine=engine,
+                        oscillator=oscillator, key_source=keys, engine_options=engine_options)
+    amp_smoothing, pitch_smoothing = (0.0, 0.0) if smoothing == 'instant' else (100.0, 50.0)
+    if smoothing == 'instant':
+        generator.update_settings(global_amp_smoothing=0, global_pitch_smoothing=0)
+    if settings:
+        generator.update_settings(**settings)
+
+    with generator.batch_update():
+        for i in range(harmonics):
+            generator.add_harmonic(1 + i * 0.25, 1.0 / harmonics, amp_smoothing, pitch_smoothing,
+                                   trigger_key=KEYS[i % len(KEYS)])
+        if layout == 'grouped':
+            for start in range(0, harmonics, GROUP_SIZE):
+                name = f"group {start // GROUP_SIZE}"
+                generator.create_group(name, KEYS[(start // GROUP_SIZE) % len(KEYS)])
+                for i in range(start, min(start + GROUP_SIZE, harmonics)):
+                    generator.assign_to_group(1 + i * 0.25, name)
+
+    generator.key_state.start()
+    for key in KEYS:
+        keys.press(key)
+    return generator
+
+def run_case(harmonics, chunk_size, layout, smoothing, engine="loop", oscillator="exact",
+             sample_rate=44100, seconds=2.0, max_time=2.0, warmup=10, engine_options=None, settings=None):
+    """Time the callback over `seconds` of audio, stopping early after `max_time` seconds of wall time"""
+    if engine == "parallel":
+        # Measure throughput: wait for late chunks instead of skipping them
+        engine_options = dict(engine_options or {}, realtime=False)
+    generator = build_generator(harmonics, chunk_size, layout, smoothing, engine, oscillator, sample_rate,
+                                engine_options, settings)
+    iterations = max(20, int(np.ceil(seconds * sample_rate / chunk_size)))
+    # Sweep the mouse so pitch smoothing and trigger updates stay busy
+    sweep = np.linspace(0, generator.screen_x, iterations + warmup).astype(int)
+    callback = generator.audio_callback
+
+    for x in sweep[:warmup]:
+        generator.mouse_x = x
+        callback(None, chunk_size, None, 0)
+
+    times = np.empty(iterations, dtype=np.int64)
+    deadline = time.perf_counter() + max_time
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        done = 0
+        for x in sweep[warmup:]:
+            generator.mouse_x = x
+            start = time.perf_counter_ns()
+            callback(None, chunk_size, None, 0)
+            times[done] = time.perf_counter_ns() - start
+            done += 1
+            if time.perf_counter() > deadline:
+                break
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+        generator.close()
+
+    times = times[:done]
+    p50, p99 = np.percentile(times, (50, 99))
+    budget_ns = chunk_size / sample_rate * 1e9
+    return {
+        'harmonics': harmonics,
+        'chunk_size': chunk_size,
+        'layout': layout,
+        'smoothing': smoothing,
+        'engine': engine,
+        'oscillator': oscillator,
+        'sample_rate': sample_rate,
+        'iterations': done,
+        'ns_per_sample_partial': float(p50 / (chunk_size * harmonics)),
+        'p50_us': float(p50 / 1e3),
+        'p99_us': float(p99 / 1e3),
+        'max_us': float(times.max() / 1e3),
+        'budget_p50': float(p50 / budget_ns),
+        'budget_p99': float(p99 / budget_ns),
+    }
+
+def case_key(result):
+    return tuple(result[k] for k in ('harmonics', 'chunk_size', 'layout', 'smoothing', 'engine', 'oscillator'))
+
+def run_matrix(harmonic_counts=HARMONIC_COUNTS, chunk_sizes=CHUNK_SIZES, layouts=LAYOUTS,
+               smoothings=SMOOTHINGS, engines=SineGen.ENGINES, oscillators=("exact",),
+               report=None, **options):
+    results = []
+    for case in itertools.product(harmonic_counts, chunk_sizes, layouts, smoothings, engines, oscillators):
+        result = run_case(*case, **options)
+        results.append(result)
+        if report:
+            report(result)
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+        },
+        'results': results,
+    }
+
+def measure_crossover(chunk_size=1024, counts=(1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000),
+                      oscillator="exact", report=None, **options):
+    """Smallest harmonic count at which the bank engine's spectral path beats the time domain.
+
+    Compares p99 callback times: at chunks smaller than a spectral frame, the
+    FFT cost lands on some chunks and not others, and the slow ones set the
+    deadline. Returns None when the time domain wins at every count tried.
+    """
+    for harmonics in counts:
+        timings = {}
+        for mode, crossover in (('time', float('inf')), ('spectral', 0)):
+            timings[mode] = run_case(harmonics, chunk_size, 'individual', 'smoothed', 'bank', oscillator,
+                                     settings={'spectral_crossover': crossover}, **options)['p99_us']
+        if report:
+            report(harmonics, timings)
+        if timings['spectral'] < timings['time']:
+            return harmonics
+    return None
+
+def format_result(r):
+    over = "  OVER BUDGET" if r['budget_p99'] >= 1 else ""
+    return (f"{r['engine']:>8} {r['oscillator']:>9} n={r['harmonics']:<5} chunk={r['chunk_size']:<5} "
+            f"{r['layout']:>10} {r['smoothing']:>8}  {r['ns_per_sample_partial']:7.2f} ns/sample/partial  "
+            f"p50 {r['p50_us']:9.1f} us  p99 {r['p99_us']:9.1f} us  max {r['max_us']:9.1f} us  "
+            f"budget {r['budget_p50']:6.1%} / {r['budget_p99']:6.1%}{over}")
+
+def compare(before, after):
+    """Pair up matching cases from two runs; speedup > 1 means `after` is faster"""
+    old = {case_key(r): r for r in before['results']}
+    rows = []
+    for r in after['results']:
+        previous = old.get(case_key(r))
+        if previous is not None:
+            rows.append((r, previous['p50_us'] / r['p50_us']))
+    return rows
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the audio callback")
+    parser.add_argument('--harmonics', type=int, nargs='+', default=HARMONIC_COUNTS)
+    parser.add_argument('--chunks', type=int, nargs='+', default=CHUNK_SIZES)
+    parser.add_argument('--layouts', nargs='+', choices=LAYOUTS, default=LAYOUTS)
+    parser.add_argument('--smoothings', nargs='+', choices=SMOOTHINGS, default=SMOOTHINGS)
+    parser.add_argument('--engines', nargs='+', choices=SineGen.ENGINES, default=SineGen.ENGINES)
+    parser.add_argument('--oscillators', nargs='+', default=("exact",))
+    parser.add_argument('--workers', type=int, help="parallel engine worker processes")
+    parser.add_argument('--lookahead', type=int, default=1, help="parallel engine chunks rendered ahead")
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--seconds', type=float, default=2.0, help="audio rendered per case")
+    parser.add_argument('--max-time', type=float, default=2.0, help="wall-clock cap per case")
+    parser.add_argument('--json', help="write results to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help="compare two saved runs instead of benchmarking")
+    parser.add_argument('--crossover', action='store_true',
+                        help="find the harmonic count where spectral rendering gets faster, per chunk size")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        runs = []
+        for path in args.compare:
+            with open(path, 'r') as f:
+                runs.append(json.load(f))
+        for r, speedup in compare(*runs):
+            print(f"{speedup:6.2f}x  {format_result(r)}")
+        return
+
+    if args.crossover:
+        for chunk_size in args.chunks:
+            report = lambda n, t: print(f"chunk={chunk_size:<5} n={n:<5} time {t['time']:9.1f} us  "
+                                        f"spectral {t['spectral']:9.1f} us", flush=True)
+            found = measure_crossover(chunk_size, oscillator=args.oscillators[0], report=report,
+                                      sample_rate=args.sample_rate, seconds=args.seconds,
+                                      max_time=args.max_time)
+            print(f"chunk={chunk_size:<5} crossover: {found if found is not None else 'none'}")
+        return
+
+    run = run_matrix(args.harmonics, args.chunks, args.layouts, args.smoothings, args.engines,
+                     args.oscillators, report=lambda r: print(format_result(r), flush=True),
+                     sample_rate=args.sample_rate, seconds=args.seconds, max_time=args.max_time,
+                     engine_options={'workers': args.workers, 'lookahead': args.lookahead})
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(run, f, indent=4)
+
+if __name__ == "__main__":
+    main()
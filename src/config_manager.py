@@ -1,15 +1,29 @@
 import json
+import numpy as np
 import tkinter as tk
 from tkinter import filedialog, messagebox
 
+CONFIG_FILETYPES = [('JSON config files', '*.json'), ('NumPy presets', '*.npz')]
+
 class ConfigManager:
+    # Per-harmonic columns of an .npz preset, in config key order
+    PRESET_COLUMNS = (('multiplier', np.float64), ('amplitude', np.float64), ('amp_smoothing', np.float64),
+                      ('pitch_smoothing', np.float64), ('snap_enabled', bool), ('trigger_key', str))
+    # Generator settings a config carries
+    PATCH_SETTINGS = ('min_freq', 'max_freq', 'global_amp_smoothing', 'global_pitch_smoothing', 'active_threshold')
+
     @staticmethod
-    def save_config(generator, parent_window):
+    def build_config(generator):
+        """Current patch as a JSON-serializable dict"""
         config = {
             'min_freq': generator.min_freq,
             'max_freq': generator.max_freq,
             'global_amp_smoothing': generator.global_amp_smoothing,
             'global_pitch_smoothing': generator.global_pitch_smoothing,
+            'active_threshold': generator.active_threshold,
+            'tuning': generator.tuning_name,
+            'polyphony': ({'voices': generator.voices.voices, 'steal': generator.voices.steal}
+                          if generator.voices is not None else {'voices': 0}),
             'harmonics': [],
             'groups': {name: {'trigger_key': group.trigger_key, 'harmonics': group.harmonics} 
                       for name, group in generator.groups.items()}
@@ -24,18 +38,109 @@ class ConfigManager:
                 'snap_enabled': harmonic.snap_enabled,
                 'trigger_key': harmonic.trigger_key
             })
+        return config
+
+    @staticmethod
+    def read_config(filepath):
+        if filepath.lower().endswith('.npz'):
+            return ConfigManager.read_preset(filepath)
+        with open(filepath, 'r') as f:
+            return json.load(f)
+
+    @staticmethod
+    def write_config(config, filepath):
+        if filepath.lower().endswith('.npz'):
+            ConfigManager.write_preset(config, filepath)
+        else:
+            with open(filepath, 'w') as f:
+                json.dump(config, f, indent=4)
+
+    @staticmethod
+    def write_preset(config, filepath):
+        """Save a config as a compressed .npz: one array per harmonic field, groups flattened.
+
+        Everything else in the config goes into a JSON string under 'settings'.
+        """
+        harmonics = config.get('harmonics', [])
+        groups = config.get('groups', {})
+        arrays = {
+            name: np.array([(h.get(name) or '') if dtype is str else h[name] for h in harmonics], dtype=dtype)
+            for name, dtype in ConfigManager.PRESET_COLUMNS
+        }
+        arrays['group_names'] = np.array(list(groups), dtype=str)
+        arrays['group_keys'] = np.array([g['trigger_key'] for g in groups.values()], dtype=str)
+        arrays['group_sizes'] = np.array([len(g['harmonics']) for g in groups.values()], dtype=np.int64)
+        arrays['group_members'] = np.array([m for g in groups.values() for m in g['harmonics']], dtype=np.float64)
+        arrays['settings'] = np.array(json.dumps({k: v for k, v in config.items() if k not in ('harmonics', 'groups')}))
+        np.savez_compressed(filepath, **arrays)
+
+    @staticmethod
+    def read_preset(filepath):
+        """Load an .npz preset written by write_preset back into config form"""
+        with np.load(filepath, allow_pickle=False) as data:
+            config = json.loads(str(data['settings']))
+            columns = [data[name].tolist() for name, _ in ConfigManager.PRESET_COLUMNS]
+            names = [name for name, _ in ConfigManager.PRESET_COLUMNS]
+            config['harmonics'] = [dict(zip(names, values)) for values in zip(*columns)]
+            ends = np.cumsum(data['group_sizes']).tolist()
+            members = data['group_members'].tolist()
+            config['groups'] = {
+                name: {'trigger_key': key, 'harmonics': members[end - size:end]}
+                for name, key, size, end in zip(data['group_names'].tolist(), data['group_keys'].tolist(),
+                                                data['group_sizes'].tolist(), ends)
+            }
+        return config
+
+    @staticmethod
+    def patch_settings(config):
+        """Generator settings stored in `config`, as floats"""
+        return {name: float(config[name]) for name in ConfigManager.PATCH_SETTINGS if name in config}
+
+    @staticmethod
+    def patch_specs(config):
+        """Harmonics and groups of `config` as SineGen.replace_patch() arguments"""
+        harmonics = [{
+            'multiplier': float(harmonic_data['multiplier']),
+            'initial_amp': float(harmonic_data.get('amplitude', 1.0)),
+            'amp_smoothing': float(harmonic_data.get('amp_smoothing', 100)),
+            'pitch_smoothing': float(harmonic_data.get('pitch_smoothing', 1)),
+            'trigger_key': harmonic_data.get('trigger_key', 'space'),
+            'snap_enabled': bool(harmonic_data.get('snap_enabled', False)),
+        } for harmonic_data in config.get('harmonics', [])]
+        groups = {group_name: (group_data['trigger_key'], group_data['harmonics'])
+                  for group_name, group_data in config.get('groups', {}).items()}
+        return harmonics, groups
+
+    @staticmethod
+    def apply_config(generator, config):
+        """Replace the generator's patch with `config`, publishing it as one block"""
+        # Build the whole patch before the audio thread sees any of it
+        with generator.batch_update():
+            # Through update_settings, so stale envelope kernels are dropped as for any other edit
+            generator.update_settings(**ConfigManager.patch_settings(config))
+            if 'tuning' in config:
+                generator.set_tuning(config['tuning'])
+            if 'polyphony' in config:
+                polyphony = config['polyphony']
+                generator.set_polyphony(int(polyphony.get('voices', 0)), steal=polyphony.get('steal', 'oldest'))
+        
+            # Harmonics and groups in one pass
+            generator.replace_patch(*ConfigManager.patch_specs(config))
+
+    @staticmethod
+    def save_config(generator, parent_window):
+        config = ConfigManager.build_config(generator)
         
         filepath = filedialog.asksaveasfilename(
             parent=parent_window,
             defaultextension='.json',
-            filetypes=[('JSON config files', '*.json')],
+            filetypes=CONFIG_FILETYPES,
             title='Save configuration'
         )
         
         if filepath:
             try:
-                with open(filepath, 'w') as f:
-                    json.dump(config, f, indent=4)
+                ConfigManager.write_config(config, filepath)
                 messagebox.showinfo('Success', 'Configuration saved successfully!', parent=parent_window)
             except Exception as e:
                 messagebox.showerror('Error', f'Failed to save configuration:\n{str(e)}', parent=parent_window)
@@ -45,7 +150,7 @@ class ConfigManager:
         filepath = filedialog.askopenfilename(
             parent=parent_window,
             defaultextension='.json',
-            filetypes=[('JSON config files', '*.json')],
+            filetypes=CONFIG_FILETYPES,
             title='Load configuration'
         )
         
@@ -53,38 +158,8 @@ class ConfigManager:
             return False
         
         try:
-            with open(filepath, 'r') as f:
-                config = json.load(f)
-            
-            # Clear existing data
-            for harmonic in generator.harmonics[:]:
-                generator.remove_harmonic(harmonic.multiplier)
-            
-            generator.min_freq = float(config.get('min_freq', generator.min_freq))
-            generator.max_freq = float(config.get('max_freq', generator.max_freq))
-            generator.global_amp_smoothing = float(config.get('global_amp_smoothing', generator.global_amp_smoothing))
-            generator.global_pitch_smoothing = float(config.get('global_pitch_smoothing', generator.global_pitch_smoothing))
-            
-            # Recreate groups
-            generator.groups = {}
-            generator.group_assignments = {}
-            for group_name, group_data in config.get('groups', {}).items():
-                generator.create_group(group_name, group_data['trigger_key'], group_data['harmonics'])
-            
-            # Recreate harmonics
-            for harmonic_data in config.get('harmonics', []):
-                mult = float(harmonic_data['multiplier'])
-                generator.add_harmonic(
-                    multiplier=mult,
-                    initial_amp=float(harmonic_data.get('amplitude', 1.0)),
-                    amp_smoothing=float(harmonic_data.get('amp_smoothing', 100)),
-                    pitch_smoothing=float(harmonic_data.get('pitch_smoothing', 1)),
-                    trigger_key=harmonic_data.get('trigger_key', 'space')
-                )
-                idx = generator._get_harmonic_index(mult)
-                if idx != -1:
-                    generator.harmonics[idx].snap_enabled = bool(harmonic_data.get('snap_enabled', False))
-            
+            ConfigManager.apply_config(generator, ConfigManager.read_config(filepath))
+
             if ui_callback:
                 ui_callback()
             
@@ -1,25 +1,27 @@
 import sys
 import subprocess
-import importlib
+import importlib.util
 
 class DependencyManager:
+    # (module name, pip package)
+    REQUIRED = (
+        ('numpy', 'numpy'),
+        ('pyaudio', 'pyaudio'),
+        ('keyboard', 'keyboard'),
+        ('pynput', 'pynput'),
+        ('tkinter', 'tkinter')  # Usually comes with Python
+    )
+
+    @staticmethod
+    def missing_dependencies():
+        """Packages whose modules can't be found; only module specs are looked up, nothing is imported"""
+        return [package_name for import_name, package_name in DependencyManager.REQUIRED
+                if importlib.util.find_spec(import_name) is None]
+
     @staticmethod
     def install_dependencies():
-        required = [
-            ('numpy', 'numpy'),
-            ('pyaudio', 'pyaudio'),
-            ('keyboard', 'keyboard'),
-            ('pynput', 'pynput'),
-            ('tkinter', 'tkinter')  # Usually comes with Python
-        ]
-        
-        missing = []
-        for (import_name, package_name) in required:
-            try:
-                importlib.import_module(import_name)
-            except ImportError:
-                missing.append(package_name)
-        
+        """Install whatever is missing with pip; run `python dependency_manager.py`, the app never does this"""
+        missing = DependencyManager.missing_dependencies()
         if missing:
             print(f"Installing missing dependencies: {', '.join(missing)}")
             try:
@@ -28,4 +30,7 @@ class DependencyManager:
             except subprocess.CalledProcessError:
                 print("Failed to install dependencies. Please install them manually:")
                 print(f"pip install {' '.join(missing)}")
-                sys.exit(1)
\ No newline at end of file
+                sys.exit(1)
+
+if __name__ == "__main__":
+    DependencyManager.install_dependencies()
@@ -0,0 +1,36 @@
+import numpy as np
+
+class DisplayFeed:
+    """Per-harmonic frequencies published by the audio thread for the UI.
+
+    At most every `interval` seconds of audio the callback fills the spare
+    one of two buffers and swaps it in with a single reference assignment,
+    so readers never lock. `latest` is (harmonics, freqs): the block's
+    harmonics tuple and their current frequencies in the same order.
+    Readers should not hold on to `freqs` across refreshes.
+    """
+    def __init__(self, interval=0.03):
+        self.interval = interval
+        self.latest = ((), np.zeros(0))
+        self._buffers = [np.zeros(0), np.zeros(0)]
+        self._back = 0
+        self._frames = float('inf')
+
+    def publish(self, block, frame_count, sample_rate):
+        """Called at the end of every callback, from the audio thread only"""
+        self._frames += frame_count
+        if self._frames < self.interval * sample_rate:
+            return
+        self._frames = 0
+
+        count = len(block.harmonics)
+        out = self._buffers[self._back]
+        if len(out) != count:
+            out = self._buffers[self._back] = np.zeros(count)
+        if block.bank_state is not None:
+            block.bank_state.read('current_freq', out)
+        else:
+            for i, harmonic in enumerate(block.harmonics):
+                out[i] = harmonic.current_freq
+        self.latest = (block.harmonics, out)
+        self._back ^= 1
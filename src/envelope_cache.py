@@ -0,0 +1,78 @@
+from collections import OrderedDict, deque
+import numpy as np
+
+class EnvelopeKernel:
+    """One-pole smoothing over a chunk, stepping `decay` of the way back each sample.
+
+    Sample k of a chunk that starts from `current` is
+    target + (current - target) * curve[k], and curve[-1] takes it to where
+    the next chunk starts, so a chunk of any size covers the same ground as
+    that many samples. A frequency smoothed this way gains
+    start * t + (target - start) * glide cycles by each sample, glide_end
+    over the whole chunk.
+    """
+    def __init__(self, smoothing, sample_rate, frame_count):
+        if smoothing > 0:
+            tau = smoothing / 1000
+            self.decay = float(np.exp(-1 / (tau * sample_rate)))
+            self.curve = self.decay ** np.arange(1, frame_count + 1)
+        else:
+            self.decay = 0.0
+            self.curve = np.zeros(frame_count)
+        # Seconds spent away from the start frequency, summed up to but not including each sample
+        steps = np.cumsum(1 - self.curve) / sample_rate
+        self.glide = np.concatenate(([0.0], steps))[:frame_count]
+        self.glide_end = float(steps[-1]) if frame_count else 0.0
+        self.curve.flags.writeable = False
+        self.glide.flags.writeable = False
+
+class EnvelopeCache:
+    """Bounded LRU of precomputed decay curves keyed by (smoothing ms, sample rate, frame count).
+
+    Only the thread calling get() touches the LRU. invalidate() may be called
+    from any thread: it queues the request and the next get() applies it.
+    """
+    def __init__(self, max_entries=64):
+        self.max_entries = max(1, int(max_entries))
+        self._kernels = OrderedDict()
+        # Smoothing values to drop, None for everything; deque appends and pops are atomic
+        self._invalidated = deque()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, smoothing, sample_rate, frame_count):
+        if self._invalidated:
+            self._drop_invalidated()
+        key = (float(smoothing), sample_rate, frame_count)
+        kernel = self._kernels.get(key)
+        if kernel is not None:
+            self._kernels.move_to_end(key)
+            self.hits += 1
+            return kernel
+
+        self.misses += 1
+        kernel = EnvelopeKernel(*key)
+        self._kernels[key] = kernel
+        if len(self._kernels) > self.max_entries:
+            self._kernels.popitem(last=False)
+        return kernel
+
+    def invalidate(self, smoothing=None):
+        """Drop kernels for one smoothing value, or everything when smoothing is None, before the next get()"""
+        if len(self._invalidated) < self.max_entries:
+            self._invalidated.append(None if smoothing is None else float(smoothing))
+        elif self._invalidated[-1] is not None:
+            # Nothing has drained the queue for a while; one full clear covers the rest
+            self._invalidated.append(None)
+
+    def _drop_invalidated(self):
+        while self._invalidated:
+            smoothing = self._invalidated.popleft()
+            if smoothing is None:
+                self._kernels.clear()
+                continue
+            for key in [k for k in self._kernels if k[0] == smoothing]:
+                del self._kernels[key]
+
+    def __len__(self):
+        return len(self._kernels)
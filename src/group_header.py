@@ -2,14 +2,15 @@ import tkinter as tk
 from tkinter import ttk
 
 class GroupHeader(ttk.Frame):
-    def __init__(self, parent, generator, group_name, on_edit, on_copy, on_remove):
+    def __init__(self, parent, generator, group_name, on_edit, on_copy, on_remove, on_toggle):
         super().__init__(parent)
         self.generator = generator
-        self.container = parent
         self.group_name = group_name
         self.on_edit = on_edit
         self.on_copy = on_copy
         self.on_remove = on_remove
+        # The container shows or hides the group's rows
+        self.on_toggle = on_toggle
         self.expanded = True
 
         self._setup_ui()
@@ -17,7 +18,8 @@ class GroupHeader(ttk.Frame):
     def _setup_ui(self):
         self.configure(style='Group.TFrame')
         
-        ttk.Label(self, text=f"Group: {self.group_name}", style='GroupHeader.TLabel').pack(side=tk.LEFT, padx=5)
+        self.name_label = ttk.Label(self, text=f"Group: {self.group_name}", style='GroupHeader.TLabel')
+        self.name_label.pack(side=tk.LEFT, padx=5)
         
         self.trigger_key = self.generator.groups[self.group_name].trigger_key
         self.key_label = ttk.Label(self, text=f"Key: {self.trigger_key}", style='GroupHeader.TLabel')
@@ -33,11 +35,16 @@ class GroupHeader(ttk.Frame):
     def _toggle_expand(self):
         self.expanded = not self.expanded
         self.expand_btn.config(text="▼" if self.expanded else "▶")
-        for widget in self.container.winfo_children()[1:]:  # Skip header
-            if self.expanded:
-                widget.pack(fill=tk.X, padx=20)
-            else:
-                widget.pack_forget()
+        self.on_toggle(self.group_name)
+
+    def bind_group(self, group_name, expanded=True):
+        """Show `group_name` in this header; headers are recycled as the list scrolls"""
+        if group_name != self.group_name:
+            self.group_name = group_name
+            self.name_label.config(text=f"Group: {group_name}")
+        self.expanded = expanded
+        self.expand_btn.config(text="▼" if expanded else "▶")
+        self.update_key_display()
 
     def update_key_display(self):
         self.trigger_key = self.generator.groups[self.group_name].trigger_key
@@ -0,0 +1,508 @@
+import numpy as np
+from spectral_render import SpectralRenderer
+
+class BankField:
+    """Harmonic runtime attribute that lives in the owning HarmonicBank's arrays once committed"""
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        bank = obj.__dict__.get('_bank')
+        if bank is None or obj._slot < 0:
+            return obj.__dict__[self.name]
+        return float(getattr(bank.state, self.name)[obj._slot])
+
+    def __set__(self, obj, value):
+        bank = obj.__dict__.get('_bank')
+        if bank is None or obj._slot < 0:
+            obj.__dict__[self.name] = float(value)
+        else:
+            getattr(bank.state, self.name)[obj._slot] = value
+
+class BankState:
+    """Runtime arrays for one committed harmonic layout"""
+    def __init__(self, count, source=None, source_rows=None, source_slots=None):
+        self.count = count
+        for name in HarmonicBank.FIELDS:
+            setattr(self, name, np.zeros(count))
+        # Rows carried over from `source`, so the audio thread can pull in the
+        # progress it made on the old layout before switching to this one
+        self.source = source
+        self.source_rows = source_rows
+        self.source_slots = source_slots
+        self._carry = np.empty(0 if source_slots is None else len(source_slots))
+
+    def read(self, name, out):
+        """Copy field `name` into `out`, one value per harmonic in block order"""
+        np.copyto(out, getattr(self, name))
+
+    def carry_from(self, source):
+        for name in HarmonicBank.FIELDS:
+            np.take(getattr(source, name), self.source_slots, out=self._carry)
+            np.put(getattr(self, name), self.source_rows, self._carry)
+
+class HarmonicBank:
+    # Per-harmonic state advanced by the audio thread; parameters come from the ParamBlock
+    FIELDS = ('phase', 'current_amp', 'target_amp', 'current_freq', 'target_freq')
+
+    def __init__(self):
+        self.state = BankState(0)
+        self.active = self.state
+        self._curves_key = None
+        self._decays_key = None
+        self._block_version = None
+        self._scratch = None
+        self.active_rows = None
+        # Partials culled from the last chunk, and the band gain of active_rows
+        self.culled = 0
+        self.band_gain = None
+        # Inverse-FFT path for chunks with at least block.spectral_crossover active rows
+        self.spectral = None
+        self._spectral_chunk = False
+        self._amp_decays_key = None
+        # Frequencies at the start of the chunk, noted by begin_chunk() for pitch sweeps
+        self._start_freq = np.empty(0)
+        self._sweep_state = None
+
+    def attach(self, harmonic):
+        if harmonic.__dict__.get('_bank') is not None:
+            raise ValueError(f"Harmonic {harmonic.multiplier}x already belongs to a bank")
+        # Values stay on the harmonic until the next commit gives it a slot
+        harmonic._slot = -1
+        harmonic._bank = self
+
+    def detach(self, harmonic):
+        if harmonic.__dict__.get('_bank') is not self:
+            return
+        if harmonic._slot >= 0:
+            # Hand the current values back so the detached harmonic stays usable
+            for name in self.FIELDS:
+                harmonic.__dict__[name] = float(getattr(self.state, name)[harmonic._slot])
+        harmonic._bank = None
+        harmonic._slot = -1
+
+    def commit(self, harmonics):
+        """Build runtime arrays for a new harmonic layout.
+
+        The audio thread adopts the returned state at its next chunk boundary.
+        """
+        old = self.state
+        slots = np.array([h._slot for h in harmonics], dtype=np.intp)
+        carried = slots >= 0
+        rows = np.flatnonzero(carried)
+        state = BankState(len(harmonics), old, rows, slots[carried])
+
+        for name in self.FIELDS:
+            getattr(state, name)[rows] = getattr(old, name)[state.source_slots]
+        for i, harmonic in enumerate(harmonics):
+            if harmonic._slot < 0:
+                for name in self.FIELDS:
+                    getattr(state, name)[i] = harmonic.__dict__[name]
+            harmonic._slot = i
+
+        self.state = state
+        return state
+
+    def _adopt(self, state):
+        if state is not self.active:
+            if state.source is self.active:
+                state.carry_from(self.active)
+            self.active = state
+        return state
+
+    def _use_block(self, block):
+        # Trigger lookups derived from a published block, rebuilt once per version
+        if self._block_version != block.version:
+            count = block.bank_state.count
+            self._block_version = block.version
+            self._trigger_rows = [np.array(indices, dtype=np.intp) for _, indices in block.triggers]
+            self._snap_rows = np.flatnonzero(block.snap_enabled)
+            self._instant = block.pitch_smoothing <= 0
+            self._triggered = np.zeros(count, dtype=bool)
+            self._trigger_freq = np.empty(count)
+
+    def _render_scratch(self, count, frame_count, sample_rate):
+        scratch = self._scratch
+        if scratch is None or scratch.key != (count, frame_count, sample_rate):
+            scratch = self._scratch = RenderScratch(count, frame_count, sample_rate)
+        return scratch
+
+    def begin_chunk(self, block):
+        """Note where every partial's frequency starts, before triggers move it.
+
+        Call at the top of a chunk rendered with generator.pitch_sweep set;
+        partials() then glides each row from here to its smoothed frequency.
+        """
+        state = self._adopt(block.bank_state)
+        if len(self._start_freq) != state.count:
+            self._start_freq = np.empty(state.count)
+        np.copyto(self._start_freq, state.current_freq)
+        self._sweep_state = state
+
+    def apply_triggers(self, block, pressed, current_freq):
+        """Retarget every harmonic from the pressed trigger numbers (indices into block.triggers)"""
+        state = self._adopt(block.bank_state)
+        self._use_block(block)
+        triggered = self._triggered
+        triggered[:] = False
+        for k in pressed:
+            triggered[self._trigger_rows[k]] = True
+        np.copyto(state.target_amp, triggered)
+
+        target_freq = self._trigger_freq
+        np.multiply(block.multiplier, current_freq, out=target_freq)
+        if len(self._snap_rows):
+            snap = self._snap_rows
+            target_freq[snap] = block.tuning.snap(target_freq[snap])
+        np.copyto(state.target_freq, target_freq, where=triggered)
+
+        # Harmonics without pitch smoothing jump straight to the new target
+        np.logical_and(triggered, self._instant, out=triggered)
+        np.copyto(state.current_freq, state.target_freq, where=triggered)
+
+    def _decay_curves(self, generator, block, frame_count):
+        """Per-row decay curves gathered from the envelope cache.
+
+        Rebuilt only when a new block is published or the chunk size changes.
+        """
+        key = (block.version, frame_count)
+        if key != self._curves_key:
+            smoothing = np.where(block.amp_smoothing > 0, block.amp_smoothing, block.global_amp_smoothing)
+            values, rows = np.unique(smoothing, return_inverse=True)
+            cache = generator.envelope_cache
+            curves = np.stack([cache.get(v, generator.sample_rate, frame_count).curve for v in values])
+            self._curves = curves[rows]
+            self._curves_key = key
+        return self._curves
+
+    def _freq_decays(self, generator, block, frame_count):
+        """Per-row decay of the frequency over a whole chunk, and 1 minus it.
+
+        Also gathers each row's glide curve and its total for partials().
+        """
+        key = (block.version, frame_count)
+        if key != self._decays_key:
+            smoothing = np.where(block.pitch_smoothing > 0, block.pitch_smoothing, block.global_pitch_smoothing)
+            values, rows = np.unique(smoothing, return_inverse=True)
+            cache = generator.envelope_cache
+            kernels = [cache.get(v, generator.sample_rate, frame_count) for v in values]
+            self._decays = np.array([kernel.curve[-1] for kernel in kernels])[rows]
+            self._glides = 1 - self._decays
+            self._glide_curves = np.stack([kernel.glide for kernel in kernels])[rows]
+            self._glide_ends = np.array([kernel.glide_end for kernel in kernels])[rows]
+            self._decays_key = key
+        return self._decays, self._glides
+
+    def _amp_decays(self, generator, block, frame_count):
+        # Per-sample amplitude decay of each row, for envelopes sampled at arbitrary offsets
+        key = (block.version, frame_count)
+        if key != self._amp_decays_key:
+            smoothing = np.where(block.amp_smoothing > 0, block.amp_smoothing, block.global_amp_smoothing)
+            values, rows = np.unique(smoothing, return_inverse=True)
+            cache = generator.envelope_cache
+            self._amp_decay = np.array([cache.get(v, generator.sample_rate, frame_count).decay for v in values])[rows]
+            self._amp_decays_key = key
+        return self._amp_decay
+
+    def render(self, generator, block, frame_count, amp, out):
+        """Render every partial of the chunk into `out` in one batched 2-D operation.
+
+        Mirrors SineGen._process_harmonic and the per-harmonic loop in audio_callback.
+        Once the block and chunk size settle, every step works in preallocated buffers.
+        """
+        if self.smooth(generator, block, frame_count):
+            np.copyto(out, self.synthesize(generator, block, frame_count, amp), casting='same_kind')
+        else:
+            out[:] = 0
+        return out
+
+    def smooth(self, generator, block, frame_count):
+        """Advance frequency smoothing and build this chunk's amplitude envelopes.
+
+        Only the active rows are worked on; see active_rows. Returns False
+        when there is nothing to render.
+        """
+        state = self._adopt(block.bank_state)
+        self.culled = 0
+        if state.count == 0:
+            self._spectral_chunk = False
+            return False
+        scratch = self._render_scratch(state.count, frame_count, generator.sample_rate)
+        rows = self._select_active(state, block.active_threshold, scratch)
+        count = state.count if rows is None else len(rows)
+        if count == 0:
+            self._spectral_chunk = False
+            return False
+        column = scratch.column[:count]
+        current_freq = state.current_freq
+
+        # Frequency smoothing by every sample of the chunk at once, like the per-harmonic path;
+        # partials() glides each row from glide_from. Rows without smoothing have a decay of 0
+        # and jump straight to the target.
+        freq_decay, freq_glide = self._freq_decays(generator, block, frame_count)
+        np.copyto(scratch.glide_from, current_freq)
+        if rows is None:
+            current_freq *= freq_decay
+            np.multiply(state.target_freq, freq_glide, out=column)
+            current_freq += column
+        else:
+            # Idle rows keep their frequency until they are triggered again
+            smoothed, glide = scratch.freq, scratch.gain
+            np.multiply(current_freq, freq_decay, out=smoothed)
+            np.multiply(state.target_freq, freq_glide, out=glide)
+            smoothed += glide
+            np.copyto(current_freq, smoothed, where=scratch.active)
+
+        count = self._cull(generator, block, frame_count, state, scratch, count)
+        if count == 0:
+            self._spectral_chunk = False
+            return False
+        rows = self.active_rows
+        column = scratch.column[:count]
+
+        spectral = count >= block.spectral_crossover
+        if spectral != self._spectral_chunk:
+            self._spectral_chunk = spectral
+            if spectral:
+                if self.spectral is None:
+                    self.spectral = SpectralRenderer()
+                self.spectral.restart()
+        if spectral:
+            # Envelopes are sampled per frame inside synthesize()
+            return True
+
+        # Amplitude envelopes for all partials at once: target + (current - target) * curve
+        # Column operands are spread into `waves` with copyto first: broadcasting
+        # ufuncs allocate iterator buffers on every call.
+        current_amp = self._gather(state.current_amp, rows, scratch.current)
+        target_amp = self._gather(state.target_amp, rows, scratch.target)
+        envelope = scratch.envelope[:count]
+        waves = scratch.waves[:count]
+        curves = self._decay_curves(generator, block, frame_count)
+        np.subtract(current_amp, target_amp, out=column)
+        np.copyto(waves, column[:, None])
+        if rows is None:
+            np.multiply(waves, curves, out=envelope)
+        else:
+            np.take(curves, rows, axis=0, out=envelope, mode='clip')
+            envelope *= waves
+        np.copyto(waves, target_amp[:, None])
+        envelope += waves
+        current_amp[:] = envelope[:, -1]
+        if rows is not None:
+            np.put(state.current_amp, rows, current_amp)
+        return True
+
+    def _select_active(self, state, threshold, scratch):
+        """Pick the rows worth rendering this chunk and store them in active_rows.
+
+        A row is idle once both its target and current amplitude are below
+        `threshold`; its amplitude snaps to 0 and its phase and frequency hold
+        until a trigger raises the target again. active_rows is None when
+        every row is active, otherwise the row indices in ascending order.
+        """
+        active, idle = scratch.active, scratch.idle
+        np.greater_equal(state.target_amp, threshold, out=active)
+        np.greater_equal(state.current_amp, threshold, out=idle)
+        active |= idle
+        count = int(np.count_nonzero(active))
+        if count == state.count:
+            self.active_rows = None
+        else:
+            np.logical_not(active, out=idle)
+            np.copyto(state.current_amp, 0.0, where=idle)
+            self.active_rows = np.compress(active, scratch.index, out=scratch.rows[:count])
+        return self.active_rows
+
+    def _cull(self, generator, block, frame_count, state, scratch, count):
+        """Drop the active rows outside block.band from active_rows; returns how many are left.
+
+        Culled rows are not synthesized, but their amplitude still moves toward
+        its target and their phase advances along their glide, as partials()
+        would move it without a pitch sweep. band_gain is left holding the band
+        gain of the remaining rows.
+        """
+        rows = self.active_rows
+        band_gain = block.band.gain(self._gather(state.current_freq, rows, scratch.freq),
+                                    out=scratch.band[:count], work=scratch.column[:count])
+        keep = np.greater(band_gain, 0, out=scratch.keep[:count])
+        kept = int(np.count_nonzero(keep))
+        self.culled = count - kept
+        self.band_gain = band_gain
+        if kept == count:
+            return count
+
+        if rows is None:
+            rows = scratch.index
+        culled = rows[~keep]
+        last = self._decay_curves(generator, block, frame_count)[culled, -1]
+        target_amp = state.target_amp[culled]
+        state.current_amp[culled] = target_amp + (state.current_amp[culled] - target_amp) * last
+        start_freq = scratch.glide_from[culled]
+        cycles = (start_freq * (frame_count / generator.sample_rate)
+                  + (state.target_freq[culled] - start_freq) * self._glide_ends[culled])
+        state.phase[culled] = (state.phase[culled] + 2 * np.pi * cycles) % (2 * np.pi)
+        self.active_rows = np.compress(keep, rows, out=scratch.kept[:kept])
+        self.band_gain = np.compress(keep, band_gain, out=scratch.kept_band[:kept])
+        return kept
+
+    @staticmethod
+    def _gather(values, rows, out):
+        # Active rows of `values` packed into `out`, or `values` itself when every row is active
+        if rows is None:
+            return values
+        return np.take(values, rows, out=out[:len(rows)], mode='clip')
+
+    @staticmethod
+    def _gather_rows(values, rows, out):
+        # _gather for per-row curves, shaped (rows, frames)
+        if rows is None:
+            return values
+        return np.take(values, rows, axis=0, out=out[:len(rows)], mode='clip')
+
+    def synthesize(self, generator, block, frame_count, amp):
+        """Oscillate and sum the partials enveloped by smooth(); returns the float64 mix"""
+        if self._spectral_chunk:
+            return self._synthesize_spectral(generator, block, frame_count, amp)
+        return np.sum(self.partials(generator, block, frame_count, amp), axis=0, out=self._scratch.mix)
+
+    def _synthesize_spectral(self, generator, block, frame_count, amp):
+        # Same partials as the time-domain path, mixed by SpectralRenderer. Amplitude
+        # and phase then advance exactly as smooth() and partials() would leave them.
+        state = self.active
+        scratch = self._scratch
+        rows = self.active_rows
+        count = state.count if rows is None else len(rows)
+        column = scratch.column[:count]
+        phase = self._gather(state.phase, rows, scratch.phase)
+        current_freq = self._gather(state.current_freq, rows, scratch.freq)
+        current_amp = self._gather(state.current_amp, rows, scratch.current)
+        target_amp = self._gather(state.target_amp, rows, scratch.target)
+        decays = self._amp_decays(generator, block, frame_count)
+        last = self._decay_curves(generator, block, frame_count)[:, -1]
+        if rows is not None:
+            decays = decays[rows]
+            last = last[rows]
+
+        np.multiply(self._gather(block.initial_amp, rows, scratch.gain), amp / block.total_amp, out=column)
+        column *= self.band_gain
+        mix = self.spectral.render(current_freq, phase, current_amp, target_amp, decays, column,
+                                   frame_count, generator.sample_rate)
+
+        current_amp -= target_amp
+        current_amp *= last
+        current_amp += target_amp
+        # Frames hold the chunk's end frequency, but phase moves on along the glide like partials()
+        start_freq = self._gather(scratch.glide_from, rows, scratch.start)
+        target_freq = self._gather(state.target_freq, rows, scratch.sweep)
+        delta = np.subtract(target_freq, start_freq, out=scratch.sweep[:count])
+        delta *= self._gather(self._glide_ends, rows, scratch.glide_end)
+        delta *= 2 * np.pi
+        np.multiply(start_freq, 2 * np.pi * frame_count / generator.sample_rate, out=column)
+        column += delta
+        phase += column
+        np.remainder(phase, 2 * np.pi, out=phase)
+        if rows is not None:
+            np.put(state.current_amp, rows, current_amp)
+            np.put(state.phase, rows, phase)
+        np.copyto(scratch.mix, mix)
+        return scratch.mix
+
+    def partials(self, generator, block, frame_count, amp):
+        """Per-row output of the chunk, one enveloped partial per active row, before mixing"""
+        state = self.active
+        scratch = self._scratch
+        rows = self.active_rows
+        count = state.count if rows is None else len(rows)
+        column = scratch.column[:count]
+        envelope = scratch.envelope[:count]
+        waves = scratch.waves[:count]
+        phase = self._gather(state.phase, rows, scratch.phase)
+        current_freq = self._gather(state.current_freq, rows, scratch.freq)
+        target_freq = self._gather(state.target_freq, rows, scratch.target)
+
+        sweep = generator.pitch_sweep if self._sweep_state is state else None
+        self._sweep_state = None
+        delta = scratch.sweep[:count]
+        gliding = False
+        if sweep is None:
+            # Rows still gliding follow their smoother sample by sample from where the chunk started
+            start_freq = self._gather(scratch.glide_from, rows, scratch.start)
+            np.subtract(target_freq, start_freq, out=delta)
+            gliding = bool(delta.any())
+        else:
+            # Rows glide from their start frequency by delta along the shared sweep curve;
+            # rows only now fading in start at their new frequency instead
+            start_freq = self._gather(self._start_freq, rows, scratch.start)
+            np.subtract(current_freq, start_freq, out=delta)
+            quiet = np.less(envelope[:, 0], block.active_threshold, out=scratch.quiet[:count])
+            np.copyto(delta, 0.0, where=quiet)
+            np.subtract(current_freq, delta, out=start_freq)
+
+        np.multiply(self._gather(block.initial_amp, rows, scratch.gain), amp / block.total_amp, out=column)
+        column *= self.band_gain
+        np.copyto(waves, column[:, None])
+        envelope *= waves
+        if gliding:
+            glide = self._gather_rows(self._glide_curves, rows, scratch.glide)
+            generator.oscillator.render(start_freq[:, None], phase[:, None], scratch.t, target_freq[:, None],
+                                        out=waves, sweep=(delta[:, None], glide))
+        elif sweep is None:
+            generator.oscillator.render(
+                current_freq[:, None], phase[:, None], scratch.t, target_freq[:, None], out=waves)
+        else:
+            generator.oscillator.render(start_freq[:, None], phase[:, None], scratch.t, target_freq[:, None],
+                                        out=waves, sweep=(delta[:, None], sweep[0]))
+        envelope *= waves
+
+        if gliding:
+            np.multiply(start_freq, 2 * np.pi * frame_count / generator.sample_rate, out=column)
+            delta *= self._gather(self._glide_ends, rows, scratch.glide_end)
+            delta *= 2 * np.pi
+            column += delta
+        elif sweep is None:
+            np.multiply(current_freq, 2 * np.pi * frame_count / generator.sample_rate, out=column)
+        else:
+            np.multiply(start_freq, 2 * np.pi * frame_count / generator.sample_rate, out=column)
+            delta *= 2 * np.pi * sweep[1]
+            column += delta
+        phase += column
+        np.remainder(phase, 2 * np.pi, out=phase)
+        if rows is not None:
+            np.put(state.phase, rows, phase)
+        return envelope
+
+class RenderScratch:
+    """Work buffers for one (harmonic count, frame count, sample rate) combination"""
+    def __init__(self, count, frame_count, sample_rate):
+        self.key = (count, frame_count, sample_rate)
+        self.t = np.arange(frame_count) / sample_rate
+        self.column = np.empty(count)
+        self.envelope = np.empty((count, frame_count))
+        self.waves = np.empty((count, frame_count))
+        self.mix = np.empty(frame_count)
+        # Frequencies before smoothing, and the glide curves and totals of the active rows
+        self.glide_from = np.empty(count)
+        self.glide = np.empty((count, frame_count))
+        self.glide_end = np.empty(count)
+        # Active-set selection and the packed per-row values of the active rows
+        self.active = np.empty(count, dtype=bool)
+        self.idle = np.empty(count, dtype=bool)
+        self.index = np.arange(count, dtype=np.intp)
+        self.rows = np.empty(count, dtype=np.intp)
+        self.current = np.empty(count)
+        self.target = np.empty(count)
+        self.phase = np.empty(count)
+        self.freq = np.empty(count)
+        self.gain = np.empty(count)
+        # Audible-band culling of the active rows
+        self.band = np.empty(count)
+        self.keep = np.empty(count, dtype=bool)
+        self.kept = np.empty(count, dtype=np.intp)
+        self.kept_band = np.empty(count)
+        # Pitch sweeps: start frequencies, glide widths and rows that are only now fading in
+        self.start = np.empty(count)
+        self.sweep = np.empty(count)
+        self.quiet = np.empty(count, dtype=bool)
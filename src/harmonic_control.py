@@ -1,21 +1,30 @@
 import tkinter as tk
 from tkinter import ttk
-from utils import MusicUtils
 from sequence_dialog import SequenceDialog
+from sequence_expr import SequenceExpression
 from tkinter import messagebox
 
 class HarmonicControl(ttk.Frame):
-    def __init__(self, parent, generator, multiplier, on_remove=None):
+    def __init__(self, parent, generator, multiplier, on_remove=None, on_change=None):
         super().__init__(parent)
         self.generator = generator
         self.multiplier = multiplier
+        idx = generator._get_harmonic_index(multiplier)
+        self.harmonic = generator.harmonics[idx] if idx != -1 else None
         self.on_remove = on_remove
+        # Called after edits that move rows around: multiplier, group or a generated sequence
+        self.on_change = on_change
         self.snap_to_note = tk.BooleanVar(value=False)
         self.multiplier_var = tk.StringVar(value=str(multiplier))
         self.pitch_smooth_value = tk.StringVar()
         self.note_var = tk.StringVar()
         self.freq_var = tk.StringVar()
         self.group_var = tk.StringVar()
+        # Set while values are loaded into the widgets, so their callbacks don't write them back
+        self._syncing = False
+        # Frequency text and note label on screen, so unchanged readouts aren't set again
+        self.freq_text = None
+        self.note_label = None
 
         
         self._setup_ui()
@@ -80,78 +89,44 @@ class HarmonicControl(ttk.Frame):
             self._generate_harmonic_sequence(code_str, iterations)
 
     def _generate_harmonic_sequence(self, code_str, iterations):
-        current_value = self.multiplier
         try:
-            # Safely evaluate the code with limited globals
-            safe_globals = {
-                '__builtins__': None,
-                'math': __import__('math'),
-                'x': current_value  # Initial value for first iteration
-            }
-            
-            for i in range(iterations):
-                try:
-                    # Evaluate the code with current_value as 'x'
-                    safe_globals['x'] = current_value  # Update x for each iteration
-                    new_value = eval(code_str, safe_globals)
-                    
-                    if not isinstance(new_value, (int, float)):
-                        raise ValueError(f"Code must evaluate to a number, got {type(new_value)}")
-                    
-                    # Add the new harmonic with same settings as parent
-                    idx = self.generator._get_harmonic_index(self.multiplier)
-                    if idx != -1:
-                        parent_harmonic = self.generator.harmonics[idx]
-                        self.generator.add_harmonic(
-                            multiplier=new_value,
-                            initial_amp=parent_harmonic.initial_amp,
-                            amp_smoothing=parent_harmonic.amp_smoothing,
-                            pitch_smoothing=parent_harmonic.pitch_smoothing,
-                            trigger_key=parent_harmonic.trigger_key
-                        )
-                        
-                        # Copy snap setting
-                        new_idx = self.generator._get_harmonic_index(new_value)
-                        if new_idx != -1:
-                            self.generator.harmonics[new_idx].snap_enabled = parent_harmonic.snap_enabled
-                    
-                    current_value = new_value
-                
-                except Exception as e:
-                    error_msg = (
-                        f"Error in iteration {i + 1}:\n"
-                        f"Expression: {code_str}\n"
-                        f"Current value (x): {current_value}\n"
-                        f"Error: {str(e)}"
-                    )
-                    messagebox.showerror("Sequence Generation Error", error_msg)
-                    return
-            
-            # Trigger UI rebuild
-            parent = self.master
-            while parent and not hasattr(parent, 'rebuild_ui'):
-                parent = parent.master
-            if parent:
-                parent.rebuild_ui()
-                
-        except Exception as e:
+            multipliers = SequenceExpression(code_str).sequence(self.multiplier, iterations)
+        except ValueError as e:
             error_msg = (
-                f"Initialization error:\n"
                 f"Expression: {code_str}\n"
                 f"Starting value: {self.multiplier}\n"
                 f"Error: {str(e)}"
             )
             messagebox.showerror("Sequence Generation Error", error_msg)
+            return
+
+        # New harmonics take the parent's settings; the whole sequence is published as one block
+        parent = self.harmonic
+        self.generator.add_harmonics([{
+            'multiplier': multiplier,
+            'initial_amp': parent.initial_amp,
+            'amp_smoothing': parent.amp_smoothing,
+            'pitch_smoothing': parent.pitch_smoothing,
+            'trigger_key': parent.trigger_key,
+            'snap_enabled': parent.snap_enabled,
+        } for multiplier in multipliers.tolist()])
+
+        if self.on_change:
+            self.on_change()
 
     def _initialize_values(self):
         idx = self.generator._get_harmonic_index(self.multiplier)
         if idx != -1:
             harmonic = self.generator.harmonics[idx]
-            self.snap_to_note.set(harmonic.snap_enabled)
-            self.amp_slider.set(harmonic.initial_amp)
-            self.amp_smoothing_slider.set(harmonic.amp_smoothing)
-            self.pitch_smoothing_slider.set(harmonic.pitch_smoothing)
-            self.pitch_smooth_value.set(f"{int(harmonic.pitch_smoothing)}ms")
+            self._syncing = True
+            try:
+                self.snap_to_note.set(harmonic.snap_enabled)
+                self.amp_slider.set(harmonic.initial_amp)
+                self.amp_smoothing_slider.set(harmonic.amp_smoothing)
+                self.pitch_smoothing_slider.set(harmonic.pitch_smoothing)
+                self.pitch_smooth_value.set(f"{int(harmonic.pitch_smoothing)}ms")
+            finally:
+                self._syncing = False
 
     def _edit_multiplier(self):
         try:
@@ -159,8 +134,8 @@ class HarmonicControl(ttk.Frame):
             if new_mult != self.multiplier and new_mult > 0:
                 if self.generator.update_harmonic_multiplier(self.multiplier, new_mult):
                     self.multiplier = new_mult
-                    if hasattr(self.master.master, 'rebuild_ui'):
-                        self.master.master.rebuild_ui()
+                    if self.on_change:
+                        self.on_change()
                 else:
                     self.multiplier_var.set(str(self.multiplier))
         except ValueError:
@@ -179,11 +154,20 @@ class HarmonicControl(ttk.Frame):
         else:
             self.generator.assign_to_group(self.multiplier, selected)
         
-        parent = self.master
-        while parent and not hasattr(parent, 'rebuild_ui'):
-            parent = parent.master
-        if parent:
-            parent.rebuild_ui()
+        if self.on_change:
+            self.on_change()
+
+    def sync(self, harmonic, groups_changed=False):
+        """Point a reused row at `harmonic` and refresh whatever of it is out of date"""
+        if harmonic is not self.harmonic:
+            # Recycled for another row, or a multiplier edit or config load replaced the Harmonic
+            self.harmonic = harmonic
+            self.multiplier = harmonic.multiplier
+            self.multiplier_var.set(str(harmonic.multiplier))
+            self._initialize_values()
+            groups_changed = True
+        if groups_changed or self.group_var.get() != (harmonic.group or '(No group)'):
+            self._update_group_dropdown()
 
     def _remove_harmonic(self):
         self.generator.remove_harmonic(self.multiplier)
@@ -191,36 +175,49 @@ class HarmonicControl(ttk.Frame):
             self.on_remove(self.multiplier)
 
     def _on_amp_change(self, value):
+        if self._syncing:
+            return
         idx = self.generator._get_harmonic_index(self.multiplier)
         if idx != -1:
-            self.generator.harmonics[idx].initial_amp = max(0.0, min(1.0, float(value)))
+            self.generator.set_harmonic_params(self.multiplier, initial_amp=max(0.0, min(1.0, float(value))))
             self.update_display()
 
     def _on_amp_smoothing_change(self, value):
+        if self._syncing:
+            return
         idx = self.generator._get_harmonic_index(self.multiplier)
         if idx != -1:
-            self.generator.harmonics[idx].amp_smoothing = max(0.0, float(value))
+            self.generator.set_harmonic_params(self.multiplier, amp_smoothing=max(0.0, float(value)))
 
     def _on_pitch_smoothing_change(self, value):
+        if self._syncing:
+            return
         idx = self.generator._get_harmonic_index(self.multiplier)
         if idx != -1:
             val = max(0.0, float(value))
-            self.generator.harmonics[idx].pitch_smoothing = val
+            self.generator.set_harmonic_params(self.multiplier, pitch_smoothing=val)
             self.pitch_smooth_value.set(f"{int(val)}ms")
 
     def _on_snap_change(self):
         idx = self.generator._get_harmonic_index(self.multiplier)
         if idx != -1:
-            self.generator.harmonics[idx].snap_enabled = self.snap_to_note.get()
+            self.generator.set_harmonic_params(self.multiplier, snap_enabled=self.snap_to_note.get())
             self.update_display()
 
     def update_display(self):
+        """Show the harmonic's frequency right away rather than at the next periodic refresh"""
         idx = self.generator._get_harmonic_index(self.multiplier)
         if idx != -1:
-            display_freq = self.generator.harmonics[idx].current_freq
-            note_info = MusicUtils.note_from_freq(display_freq)
-            self.note_var.set(f"{note_info[0]}{note_info[1]}" if note_info else "")
-            self.freq_var.set(f"{display_freq:.1f} Hz")
+            freq = self.generator.harmonics[idx].current_freq
+            label, = self.generator.tuning.labels([freq])
+            self.show_frequency(f"{freq:.1f} Hz", label)
         else:
-            self.note_var.set("")
-            self.freq_var.set("")
\ No newline at end of file
+            self.show_frequency("", "")
+
+    def show_frequency(self, text, label):
+        if text != self.freq_text:
+            self.freq_text = text
+            self.freq_var.set(text)
+        if label != self.note_label:
+            self.note_label = label
+            self.note_var.set(label)
\ No newline at end of file
@@ -0,0 +1,134 @@
+import json
+import time
+import numpy as np
+
+# PortAudio stream callback status flags (portaudio.h)
+STATUS_FLAGS = (
+    ('input_underflow', 0x01),
+    ('input_overflow', 0x02),
+    ('output_underflow', 0x04),
+    ('output_overflow', 0x08),
+    ('priming_output', 0x10),
+)
+
+class CallbackStats:
+    """Counters and timing histograms for SineGen.audio_callback.
+
+    Everything lives in one int64 block written only by the audio thread.
+    Readers never lock: snapshot() copies the block and retries if the
+    writer was in the middle of an update (sequence counter is odd or moved).
+    """
+    STAGES = ('triggers', 'smoothing', 'synthesis', 'output', 'callback')
+    # culled_partials adds up, over every chunk, the partials skipped for being out of the audible band
+    COUNTERS = ('callbacks', 'frames', 'deadline_misses', 'culled_partials') + tuple(name for name, _ in STATUS_FLAGS)
+    # Stage histograms use power-of-two microsecond buckets: < 1 us, 1-2 us, 2-4 us, ...
+    TIME_BUCKETS = 24
+    # Callback time as a fraction of the chunk budget, in 10% steps; the last bucket is overruns
+    LOAD_BUCKETS = 11
+
+    def __init__(self):
+        self.block = np.zeros(sum(self._sizes()), dtype=np.int64)
+        self._sequence, self.counters, self.total_ns, self.max_ns, self.last_ns, histograms, self.load = \
+            self._split(self.block)
+        self.histograms = histograms.reshape(len(self.STAGES), self.TIME_BUCKETS)
+        self._reset_requested = False
+
+    @classmethod
+    def _sizes(cls):
+        stages = len(cls.STAGES)
+        return [1, len(cls.COUNTERS), stages, stages, stages, stages * cls.TIME_BUCKETS, cls.LOAD_BUCKETS]
+
+    @classmethod
+    def _split(cls, block):
+        return np.split(block, np.cumsum(cls._sizes())[:-1])
+
+    def record(self, status, frame_count, budget_ns, triggers_ns, smoothing_ns, synthesis_ns, output_ns,
+               culled=0):
+        """Called once at the end of every callback, from the audio thread only"""
+        callback_ns = triggers_ns + smoothing_ns + synthesis_ns + output_ns
+        self._sequence[0] += 1
+        if self._reset_requested:
+            self.block[1:] = 0
+            self._reset_requested = False
+        counters = self.counters
+        counters[0] += 1
+        counters[1] += frame_count
+        if callback_ns > budget_ns:
+            counters[2] += 1
+        counters[3] += culled
+        if status:
+            for i, (_, flag) in enumerate(STATUS_FLAGS):
+                if status & flag:
+                    counters[4 + i] += 1
+
+        for stage, ns in enumerate((triggers_ns, smoothing_ns, synthesis_ns, output_ns, callback_ns)):
+            self.total_ns[stage] += ns
+            self.last_ns[stage] = ns
+            if ns > self.max_ns[stage]:
+                self.max_ns[stage] = ns
+            self.histograms[stage, min(max(int(ns).bit_length() - 10, 0), self.TIME_BUCKETS - 1)] += 1
+        self.load[min(int(10 * callback_ns / budget_ns), self.LOAD_BUCKETS - 1)] += 1
+        self._sequence[0] += 1
+
+    def reset(self):
+        # Applied by the audio thread on its next record() so it never races the writer
+        self._reset_requested = True
+
+    def snapshot(self, retries=10):
+        block = self.block.copy()
+        for _ in range(retries):
+            before = int(self._sequence[0])
+            if before % 2 == 0:
+                np.copyto(block, self.block)
+                if int(self._sequence[0]) == before:
+                    break
+            time.sleep(0)
+
+        _, counters, total, peak, last, histograms, load = self._split(block)
+        callbacks = int(counters[0])
+        histograms = histograms.reshape(len(self.STAGES), self.TIME_BUCKETS)
+        return {
+            'counters': dict(zip(self.COUNTERS, counters.tolist())),
+            'stages': {
+                name: {
+                    'mean_us': float(total[i] / callbacks / 1e3) if callbacks else 0.0,
+                    'max_us': float(peak[i] / 1e3),
+                    'last_us': float(last[i] / 1e3),
+                    'histogram': histograms[i].tolist(),
+                }
+                for i, name in enumerate(self.STAGES)
+            },
+            'load_histogram': load.tolist(),
+        }
+
+    @classmethod
+    def time_bucket_edges_us(cls):
+        # Upper edge of each stage histogram bucket; the last one is open-ended
+        return [2 ** (i + 10) / 1e3 for i in range(cls.TIME_BUCKETS - 1)] + [float('inf')]
+
+    def export(self, filepath):
+        """Write a snapshot to JSON with the bucket edges needed to read the histograms"""
+        data = self.snapshot()
+        data['time_bucket_upper_us'] = [edge if edge != float('inf') else None
+                                        for edge in self.time_bucket_edges_us()]
+        data['load_bucket_lower'] = [i / 10 for i in range(self.LOAD_BUCKETS)]
+        data['exported_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+        with open(filepath, 'w') as f:
+            json.dump(data, f, indent=4)
+
+class StartupTimer:
+    """Wall-clock time of each launch stage, from `start` to the first rendered chunk"""
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.stages = []
+        self._last = self.start
+
+    def mark(self, stage, at=None):
+        """End `stage` now, or at the perf_counter() time `at`"""
+        at = time.perf_counter() if at is None else at
+        self.stages.append((stage, at - self._last))
+        self._last = at
+
+    def report(self):
+        parts = [f"{stage} {seconds * 1e3:.0f} ms" for stage, seconds in self.stages]
+        return f"Startup: {', '.join(parts)}; total {(self._last - self.start) * 1e3:.0f} ms"
@@ -0,0 +1,103 @@
+import threading
+import numpy as np
+
+def normalize_key(name):
+    name = str(name).lower()
+    return 'space' if name == ' ' else name
+
+class KeyState:
+    """Pressed-key table written from an input thread and read lock-free by the audio callback.
+
+    Every key name gets a small integer id; `pressed` is indexed by that id.
+    Combinations such as "ctrl+a" resolve to a tuple of ids that must all be down.
+    """
+    def __init__(self, source=None, max_keys=256):
+        self.source = source if source is not None else KeyboardSource()
+        self.pressed = np.zeros(max_keys, dtype=bool)
+        self._key_ids = {}
+        self._id_lock = threading.Lock()
+
+    def key_id(self, name):
+        name = normalize_key(name)
+        key = self._key_ids.get(name)
+        if key is None:
+            with self._id_lock:
+                key = self._key_ids.get(name)
+                if key is None:
+                    if len(self._key_ids) >= len(self.pressed):
+                        return -1
+                    key = len(self._key_ids)
+                    self._key_ids[name] = key
+        return key
+
+    def combo_ids(self, trigger_key):
+        if not trigger_key:
+            return ()
+        parts = [trigger_key] if trigger_key.strip() == '' else trigger_key.split('+')
+        ids = tuple(self.key_id(part.strip() or part) for part in parts)
+        return () if -1 in ids else ids
+
+    def press(self, name):
+        key = self.key_id(name)
+        if key != -1:
+            self.pressed[key] = True
+
+    def release(self, name):
+        key = self.key_id(name)
+        if key != -1:
+            self.pressed[key] = False
+
+    def is_pressed(self, ids):
+        pressed = self.pressed
+        for key in ids:
+            if not pressed[key]:
+                return False
+        return bool(ids)
+
+    def start(self):
+        self.source.start(self)
+
+    def stop(self):
+        self.source.stop()
+        self.pressed[:] = False
+
+class KeyboardSource:
+    """Feeds key down/up events from the keyboard library's listener thread"""
+    def __init__(self):
+        self._hook = None
+
+    def start(self, key_state):
+        import keyboard
+
+        def on_event(event):
+            if event.name is None:
+                return
+            if event.event_type == keyboard.KEY_DOWN:
+                key_state.press(event.name)
+            else:
+                key_state.release(event.name)
+
+        self._hook = keyboard.hook(on_event)
+
+    def stop(self):
+        if self._hook is not None:
+            import keyboard
+            keyboard.unhook(self._hook)
+            self._hook = None
+
+class FakeKeySource:
+    """Headless key source: press and release keys programmatically"""
+    def __init__(self):
+        self.key_state = None
+
+    def start(self, key_state):
+        self.key_state = key_state
+
+    def stop(self):
+        pass
+
+    def press(self, name):
+        self.key_state.press(name)
+
+    def release(self, name):
+        self.key_state.release(name)
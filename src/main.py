@@ -1,16 +1,31 @@
+import sys
+import time
+LAUNCHED = time.perf_counter()
 from dependency_manager import DependencyManager
-from sine_ui import ControlUI
-from sine_gen import SineGen
 
 def main():
-    # First ensure dependencies are installed
-    DependencyManager.install_dependencies()
-    
+    # Module specs only: nothing heavy is imported and nothing is installed at launch
+    missing = DependencyManager.missing_dependencies()
+    if missing:
+        print(f"Missing dependencies: {', '.join(missing)}")
+        print("Install them with: python dependency_manager.py")
+        sys.exit(1)
+    checked = time.perf_counter()
+
+    from instrumentation import StartupTimer
+    from sine_gen import SineGen
+    from sine_ui import ControlUI
+    startup = StartupTimer(LAUNCHED)
+    startup.mark('dependency check', checked)
+    startup.mark('imports')
+
     # Now create and run the application
-    generator = SineGen(chunk_size=64)
-    app = ControlUI(generator)
+    # Smoothing and mouse ramps run per sample, so larger chunks cost no audible stepping
+    generator = SineGen(chunk_size=512)
+    startup.mark('generator')
+    app = ControlUI(generator, startup)
     app.protocol("WM_DELETE_WINDOW", app.on_closing)
     app.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
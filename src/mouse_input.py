@@ -0,0 +1,158 @@
+import math
+import time
+import numpy as np
+
+class MouseInput:
+    """Mouse positions pushed from an input thread and read lock-free by the audio callback.
+
+    push() stores timestamped positions in a ring. Events less than
+    `resolution` seconds after the last stored one are coalesced into it, so
+    a 1 kHz pointer fills the ring at control rate. Like CallbackStats, the
+    writer makes a sequence counter odd while it updates the ring; ramp()
+    copies the ring out and retries if the counter was odd or moved.
+    `capacity` slots must cover at least a chunk's worth of events.
+    """
+    def __init__(self, capacity=256, resolution=0.001, clock=time.perf_counter):
+        self.capacity = capacity
+        self.resolution = resolution
+        self.clock = clock
+        self.times = np.zeros(capacity)
+        self.positions = np.zeros((2, capacity))
+        # Slots written so far; slot i lives at index i % capacity
+        self.count = 0
+        self._sequence = 0
+        # Reader side: the ring copied out oldest first, and sample indices for ramps
+        self._order = np.arange(capacity)
+        self._slots = np.empty(capacity, dtype=np.intp)
+        self._times = np.empty(capacity)
+        self._positions = np.empty((2, capacity))
+        self._index = np.arange(0.0)
+
+    def push(self, x, y, at=None):
+        """Called from the input thread only"""
+        at = self.clock() if at is None else at
+        count = self.count
+        self._sequence += 1
+        if count and at - self.times[(count - 1) % self.capacity] < self.resolution:
+            # Same control period: move the last point instead of adding one
+            slot = (count - 1) % self.capacity
+        else:
+            slot = count % self.capacity
+            self.times[slot] = at
+            count += 1
+        self.positions[0, slot] = x
+        self.positions[1, slot] = y
+        self.count = count
+        self._sequence += 1
+
+    def _snapshot(self, retries=10):
+        # Copies the published events, oldest first, into _times/_positions; returns how many
+        for _ in range(retries):
+            before = self._sequence
+            if before % 2 == 0:
+                count = self.count
+                stored = min(count, self.capacity)
+                slots = np.add(self._order[:stored], count - stored, out=self._slots[:stored])
+                np.remainder(slots, self.capacity, out=slots)
+                # mode='clip' so take() writes straight into out instead of buffering
+                np.take(self.times, slots, out=self._times[:stored], mode='clip')
+                np.take(self.positions, slots, axis=1, out=self._positions[:, :stored], mode='clip')
+                if self._sequence == before:
+                    return stored
+        return 0
+
+    def ramp(self, end, frame_count, sample_rate, out):
+        """Fill `out`, shaped (2, frame_count), with x and y at every sample of the chunk ending at `end`.
+
+        Positions are interpolated linearly between events and hold before
+        the first and after the last. Returns False, leaving `out` alone,
+        until something has been pushed, or if the writer kept the ring busy.
+        """
+        stored = self._snapshot()
+        if stored == 0:
+            return False
+        if len(self._index) < frame_count:
+            self._index = np.arange(float(frame_count))
+        index = self._index
+        times = self._times
+        positions = self._positions
+        # Event times in samples from the chunk's first sample
+        first = end - (frame_count - 1) / sample_rate
+        lo = max(int(np.searchsorted(times[:stored], first, 'right')) - 1, 0)
+        hi = min(int(np.searchsorted(times[:stored], end, 'left')), stored - 1)
+
+        # Hold the newest event at or before the chunk start until the next one
+        filled = min(max(math.ceil((float(times[lo]) - first) * sample_rate), 0), frame_count)
+        for axis in range(2):
+            out[axis, :filled].fill(positions[axis, lo])
+        for j in range(lo, hi):
+            start, stop_time = float(times[j]) - first, float(times[j + 1]) - first
+            stop = min(math.ceil(stop_time * sample_rate), frame_count)
+            if stop <= filled or stop_time <= start:
+                continue
+            # Samples before event j + 1 lie on the line from event j to it
+            for axis in range(2):
+                slope = (positions[axis, j + 1] - positions[axis, j]) / ((stop_time - start) * sample_rate)
+                segment = np.subtract(index[filled:stop], start * sample_rate, out=out[axis, filled:stop])
+                segment *= slope
+                segment += positions[axis, j]
+            filled = stop
+        for axis in range(2):
+            out[axis, filled:frame_count].fill(positions[axis, hi])
+        return True
+
+class ControlRamps:
+    """Per-sample mouse pitch and amplitude for one chunk, plus the glide curve partials follow.
+
+    Built by SineGen.audio_callback from a MouseInput. `freq` and `amp` map
+    x and y exactly as the single-position path does. `sweep` is (u, u_end):
+    u is the running integral, in seconds, of a 0..1 glide shape taken from
+    how the mouse pitch moved since the last chunk, and u_end its total over
+    the chunk. A partial gliding by delta Hz this chunk gains 2 pi delta u of
+    phase; see ExactOscillator.render. While the mouse pitch holds still
+    `sweep` is None and partials follow their own pitch smoothing.
+    """
+    def __init__(self, frame_count, sample_rate):
+        self.key = (frame_count, sample_rate)
+        self.positions = np.zeros((2, frame_count))
+        self.freq = np.empty(frame_count)
+        self.amp = np.empty(frame_count)
+        # `amp` as float32, to scale the float32 output chunk without a casting buffer
+        self.amp32 = np.empty(frame_count, dtype=np.float32)
+        self.shape = np.empty(frame_count)
+        self.u = np.zeros(frame_count)
+        self.sweep = None
+        self._last_freq = None
+
+    def build(self, mouse, block, screen_x, screen_y, now):
+        """Fill the ramps from `mouse`; returns False if it has no events yet"""
+        frame_count, sample_rate = self.key
+        if not mouse.ramp(now, frame_count, sample_rate, self.positions):
+            self._last_freq = None
+            return False
+        x, y = self.positions
+        freq = self.freq
+        if block.min_freq <= 0 or block.max_freq <= block.min_freq:
+            freq[:] = block.min_freq
+        else:
+            # min * (max / min) ** (x / screen_x)
+            np.multiply(x, np.log(block.max_freq / block.min_freq) / screen_x, out=freq)
+            np.exp(freq, out=freq)
+            freq *= block.min_freq
+        np.multiply(y, 0.5 / screen_y, out=self.amp)
+        np.copyto(self.amp32, self.amp, casting='same_kind')
+
+        shape = self.shape
+        start, end = self._last_freq, float(freq[-1])
+        self._last_freq = end
+        if start is None or abs(end - start) <= 1e-9 * abs(end):
+            self.sweep = None
+            return True
+        np.subtract(freq, start, out=shape)
+        shape *= 1 / (end - start)
+        np.clip(shape, 0.0, 1.0, out=shape)
+        u = self.u
+        np.cumsum(shape[:-1], out=u[1:])
+        u /= sample_rate
+        self.sweep = (u, float(u[-1] + shape[-1] / sample_rate))
+        return True
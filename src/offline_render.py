@@ -0,0 +1,159 @@
+"""Render a saved config to a WAV file without a display, mouse or sound card.
+
+The gesture script is JSON:
+
+    {
+        "screen": [1920, 1080],
+        "duration": 4.0,
+        "events": [
+            {"time": 0.0, "mouse": [960, 540]},
+            {"time": 0.0, "press": "a"},
+            {"time": 1.5, "mouse": [1400, 300]},
+            {"time": 3.0, "release": "a"}
+        ]
+    }
+
+Times are in seconds. Mouse positions are screen pixels, read the same way as the
+live mouse listener. "duration" is optional and defaults to the last event plus
+--tail seconds. Smoothing runs sample by sample at any block size, but events
+apply at the start of the block that contains them and held keys are checked
+at block starts too, so smaller --block-size values give finer timing. The
+default of 1024 keeps key checks close to the live 20 ms.
+
+    python offline_render.py "../sample configs/flute.json" gesture.json -o flute.wav
+"""
+import argparse
+import json
+import time
+import wave
+import numpy as np
+from config_manager import ConfigManager
+from key_state import FakeKeySource
+from sine_gen import SineGen
+
+ACTIONS = ('mouse', 'press', 'release')
+
+def load_script(filepath):
+    with open(filepath, 'r') as f:
+        script = json.load(f)
+
+    events = []
+    for event in script.get('events', []):
+        actions = [name for name in ACTIONS if name in event]
+        if len(actions) != 1:
+            raise ValueError(f"Gesture event needs exactly one of {ACTIONS}: {event}")
+        if float(event.get('time', -1)) < 0:
+            raise ValueError(f"Gesture event needs a non-negative time: {event}")
+        events.append((float(event['time']), actions[0], event[actions[0]]))
+    # Stable sort keeps the file order for events that share a timestamp
+    events.sort(key=lambda e: e[0])
+
+    screen = script.get('screen', (1920, 1080))
+    return {
+        'screen': (int(screen[0]), int(screen[1])),
+        'duration': script.get('duration'),
+        'events': events,
+    }
+
+def render_offline(generator, keys, script, wav_path, block_size=1024, tail=1.0):
+    """Replay `script` through `generator` and stream the result to a 16-bit mono WAV.
+
+    `keys` is the FakeKeySource the generator's key_state listens to.
+    Returns a dict with frame counts, timings and the real-time factor.
+    """
+    if block_size < 1:
+        raise ValueError("Block size must be at least 1 frame")
+    sample_rate = generator.sample_rate
+    events = script['events']
+    duration = script['duration']
+    if duration is None:
+        duration = (events[-1][0] if events else 0) + tail
+    total_frames = int(round(float(duration) * sample_rate))
+
+    generator.screen_x, generator.screen_y = script['screen']
+    generator.key_state.start()
+    work = np.empty(block_size, dtype=np.float32)
+    pcm = np.empty(block_size, dtype=np.int16)
+    next_event = 0
+    frames_done = 0
+    peak = 0.0
+    clipped = 0
+
+    start = time.perf_counter()
+    with wave.open(wav_path, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+
+        while frames_done < total_frames:
+            while next_event < len(events) and events[next_event][0] * sample_rate <= frames_done:
+                _, action, value = events[next_event]
+                if action == 'mouse':
+                    generator.mouse_x, generator.mouse_y = value
+                elif action == 'press':
+                    keys.press(value)
+                else:
+                    keys.release(value)
+                next_event += 1
+
+            frame_count = min(block_size, total_frames - frames_done)
+            data, _ = generator.audio_callback(None, frame_count, None, 0)
+            samples = np.frombuffer(data, dtype=np.float32)
+
+            peak = max(peak, float(np.abs(samples).max()))
+            clipped += int(np.count_nonzero(np.abs(samples) > 1))
+            scaled = work[:frame_count]
+            np.clip(samples, -1, 1, out=scaled)
+            scaled *= 32767
+            np.rint(scaled, out=scaled)
+            np.copyto(pcm[:frame_count], scaled, casting='unsafe')
+            wav.writeframes(pcm[:frame_count])
+            frames_done += frame_count
+    elapsed = time.perf_counter() - start
+    generator.key_state.stop()
+
+    seconds = frames_done / sample_rate
+    return {
+        'frames': frames_done,
+        'seconds': seconds,
+        'elapsed': elapsed,
+        'realtime_factor': seconds / elapsed if elapsed > 0 else float('inf'),
+        'peak': peak,
+        'clipped_samples': clipped,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render a config and gesture script to WAV")
+    parser.add_argument('config', help="config JSON saved from the app")
+    parser.add_argument('script', help="gesture script JSON")
+    parser.add_argument('-o', '--output', default='render.wav')
+    parser.add_argument('--sample-rate', type=int, default=44100)
+    parser.add_argument('--block-size', type=int, default=1024)
+    parser.add_argument('--tail', type=float, default=1.0,
+                        help="seconds rendered after the last event when the script has no duration")
+    parser.add_argument('--engine', choices=SineGen.ENGINES, default='bank')
+    parser.add_argument('--oscillator', default='exact')
+    parser.add_argument('--workers', type=int, help="parallel engine worker processes")
+    parser.add_argument('--lookahead', type=int, default=1, help="parallel engine blocks rendered ahead")
+    args = parser.parse_args(argv)
+
+    keys = FakeKeySource()
+    engine_options = None
+    if args.engine == 'parallel':
+        # Offline there is no deadline, so wait for every block rather than skipping late ones
+        engine_options = {'workers': args.workers, 'lookahead': args.lookahead, 'realtime': False}
+    generator = SineGen(sample_rate=args.sample_rate, chunk_size=args.block_size, engine=args.engine,
+                        oscillator=args.oscillator, key_source=keys, engine_options=engine_options)
+    try:
+        ConfigManager.apply_config(generator, ConfigManager.read_config(args.config))
+        stats = render_offline(generator, keys, load_script(args.script), args.output,
+                               args.block_size, args.tail)
+    finally:
+        generator.close()
+    print(f"Rendered {stats['seconds']:.2f} s in {stats['elapsed']:.2f} s "
+          f"({stats['realtime_factor']:.1f}x real time) -> {args.output}")
+    if stats['clipped_samples']:
+        print(f"Warning: {stats['clipped_samples']} samples clipped (peak {stats['peak']:.2f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+import time
+import numpy as np
+
+class ExactOscillator:
+    """Reference oscillator: evaluates np.sin for every sample"""
+    name = "exact"
+
+    def __init__(self):
+        self._buffers = {}
+
+    def render(self, freq, phase, t, target_freq=None, out=None, sweep=None):
+        # freq/phase may be scalars or (n, 1) columns, t is the chunk time axis.
+        # target_freq is only used by backends that care whether a partial is gliding.
+        # sweep is (delta, u): partials glide by delta Hz along the curve u, the integral of
+        # the glide's 0..1 shape, so the phase gains 2 pi delta u. u is one row shared by every
+        # partial or, shaped like out, one row per partial. See _sweep_cycles.
+        if out is None:
+            cycles = freq * t if sweep is None else freq * t + sweep[0] * sweep[1]
+            return np.sin(2 * np.pi * cycles + phase)
+        work, = _scratch(self._buffers, out.shape, ('work',))
+        _outer(freq, t, out, work)
+        _sweep_cycles(self._buffers, sweep, out, work)
+        out *= 2 * np.pi
+        np.copyto(work, phase)
+        out += work
+        return np.sin(out, out=out)
+
+def _scratch(cache, shape, names, dtype=np.float64):
+    # Work buffers reused across calls. The leading dimension varies with the
+    # number of active partials, so one set per trailing shape is grown to the
+    # most rows seen and handed out as leading slices.
+    key = (shape[1:], names)
+    buffers = cache.get(key)
+    if buffers is None or len(buffers[0]) < shape[0]:
+        buffers = [np.empty(shape, dtype=dtype) for _ in names]
+        cache[key] = buffers
+    return [buffer[:shape[0]] for buffer in buffers]
+
+def _sweep_cycles(cache, sweep, out, work):
+    # Adds delta * u to the cycle counts in `out`; `work` is free scratch of the same shape
+    if sweep is None:
+        return out
+    delta, u = sweep
+    spread, = _scratch(cache, out.shape, ('sweep',))
+    _outer(delta, u, spread, work)
+    out += spread
+    return out
+
+def _outer(column, row, out, work):
+    # column * row into out. Broadcasting ufuncs allocate iterator buffers on
+    # every call, so both operands are spread to full size with copyto first.
+    np.copyto(work, column)
+    np.copyto(out, row)
+    out *= work
+    return out
+
+class WavetableOscillator:
+    """Phase accumulator driving interpolated lookups into one shared sine table"""
+    name = "wavetable"
+    ORDERS = (0, 1, 3)  # nearest, linear, cubic (4-point Lagrange)
+    _tables = {}
+
+    def __init__(self, table_size=4096, order=1):
+        if int(table_size) < 4:
+            raise ValueError("Table size must be at least 4")
+        if order not in self.ORDERS:
+            raise ValueError(f"Interpolation order must be one of {self.ORDERS}")
+        self.table_size = int(table_size)
+        self.order = order
+        self.table = self._get_table(self.table_size)
+        self._buffers = {}
+
+    @classmethod
+    def _get_table(cls, size):
+        # One table per size, shared by every oscillator instance.
+        # Guard points on both ends let interpolation read i-1 .. i+2 without wrapping.
+        if size not in cls._tables:
+            cls._tables[size] = np.sin(2 * np.pi * np.arange(-1, size + 3) / size)
+        return cls._tables[size]
+
+    def render(self, freq, phase, t, target_freq=None, out=None, sweep=None):
+        # Same continuity and sweep semantics as the exact path: phase is the radian offset at t=0
+        shape = np.broadcast_shapes(np.shape(freq), np.shape(t))
+        if out is None:
+            out = np.empty(shape)
+        pos, frac = _scratch(self._buffers, shape, ('pos', 'frac'))
+        idx, = _scratch(self._buffers, shape, ('idx',), np.intp)
+        table = self.table
+
+        _outer(freq, t, pos, frac)
+        _sweep_cycles(self._buffers, sweep, pos, frac)
+        np.copyto(frac, phase)
+        frac *= 1 / (2 * np.pi)
+        pos += frac
+        np.floor(pos, out=frac)
+        pos -= frac
+        pos *= self.table_size
+
+        if self.order == 0:
+            np.rint(pos, out=pos)
+            np.copyto(idx, pos, casting='unsafe')
+            idx += 1
+            return np.take(table, idx, out=out, mode='clip')
+
+        np.floor(pos, out=frac)
+        np.copyto(idx, frac, casting='unsafe')
+        np.subtract(pos, frac, out=frac)
+        if self.order == 1:
+            y2, = _scratch(self._buffers, shape, ('y2',))
+            idx += 1
+            np.take(table, idx, out=out, mode='clip')
+            idx += 1
+            np.take(table, idx, out=y2, mode='clip')
+            y2 -= out
+            y2 *= frac
+            out += y2
+            return out
+
+        y0, y1, y2, y3, c, tmp = _scratch(self._buffers, shape, ('y0', 'y1', 'y2', 'y3', 'c', 'tmp'))
+        for y in (y0, y1, y2, y3):
+            np.take(table, idx, out=y, mode='clip')
+            idx += 1
+
+        # Horner form of y1 + frac * (c1 + frac * (c2 + frac * c3))
+        np.subtract(y3, y0, out=c)
+        c /= 6
+        np.subtract(y1, y2, out=tmp)
+        tmp /= 2
+        c += tmp                        # c3
+        c *= frac
+        np.add(y0, y2, out=tmp)
+        tmp /= 2
+        tmp -= y1
+        c += tmp                        # c2 + frac * c3
+        c *= frac
+        np.divide(y0, 3, out=tmp)
+        y2 -= tmp
+        np.divide(y1, 2, out=tmp)
+        y2 -= tmp
+        np.divide(y3, 6, out=tmp)
+        y2 -= tmp                       # c1
+        c += y2
+        c *= frac
+        np.add(y1, c, out=out)
+        return out
+
+class RecursiveOscillator:
+    """Complex-rotation recurrence for partials that hold their frequency.
+
+    Each steady partial starts the chunk from its rotor exp(i * phase) and
+    advances by one complex multiply per sample, with the running rotor
+    renormalized every renorm_interval samples. Partials whose current_freq
+    is still gliding toward target_freq, or sweeping within the chunk, use
+    the exact path.
+
+    A partial within glide_tolerance of its target counts as steady and
+    rotates at target_freq. The engines' pitch smoothing never snaps
+    current_freq onto the target, since a snap at a chunk boundary would
+    make the sound depend on chunk size; they pass each chunk's glide as
+    a sweep, so a smoothed partial uses the exact path until its glide
+    rounds away to nothing, about 36 time constants after a pitch change.
+    """
+    name = "recursive"
+
+    def __init__(self, renorm_interval=256, glide_tolerance=1e-6):
+        if int(renorm_interval) < 1:
+            raise ValueError("Renormalization interval must be at least 1 sample")
+        self.renorm_interval = int(renorm_interval)
+        self.glide_tolerance = float(glide_tolerance)
+        self.exact = ExactOscillator()
+        self._buffers = {}
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.stats = {
+            'recursive_partials': 0,
+            'fallback_partials': 0,
+            'renormalizations': 0,
+            'max_drift': 0.0,
+        }
+
+    def _rotate(self, freq, phase, t, rotated):
+        # Fills `rotated`, shaped (frames, partials), with exp(i * phase) * w**k, w the per-sample
+        # rotor. Within a renormalization block the powers are built by doubling: each new span
+        # is the filled span times w**span, still one multiply per sample. Frames run down the
+        # rows so every multiply works on whole contiguous rows and never needs a buffer.
+        frame_count = len(rotated)
+        w, step, z = _scratch(self._buffers, freq.shape, ('w', 'step', 'z'), np.complex128)
+        magnitude, = _scratch(self._buffers, freq.shape, ('magnitude',))
+        spread, = _scratch(self._buffers, ((self.renorm_interval + 1) // 2,) + freq.shape, ('spread',),
+                           np.complex128)
+        np.multiply(freq, 2j * np.pi * (t[1] - t[0]), out=w)
+        np.exp(w, out=w)
+        np.multiply(phase, 1j, out=z)
+        np.exp(z, out=z)
+        for start in range(0, frame_count, self.renorm_interval):
+            block = rotated[start:min(start + self.renorm_interval, frame_count)]
+            block[0] = z
+            np.copyto(step, w)
+            filled = 1
+            while filled < len(block):
+                count = min(filled, len(block) - filled)
+                np.copyto(spread[:count], step)
+                np.multiply(block[:count], spread[:count], out=block[filled:filled + count])
+                filled += count
+                step *= step
+
+            np.multiply(block[-1], w, out=z)
+            np.abs(z, out=magnitude)
+            magnitude -= 1
+            np.abs(magnitude, out=magnitude)
+            self.stats['max_drift'] = max(self.stats['max_drift'], float(magnitude.max()))
+            self.stats['renormalizations'] += 1
+            np.abs(z, out=magnitude)
+            z /= magnitude
+        return rotated
+
+    def render(self, freq, phase, t, target_freq=None, out=None, sweep=None):
+        freqs = np.reshape(freq, -1)
+        if target_freq is None or len(t) < 2:
+            self.stats['fallback_partials'] += len(freqs)
+            return self.exact.render(freq, phase, t, out=out, sweep=sweep)
+
+        phases = np.reshape(phase, -1)
+        targets = np.reshape(target_freq, -1)
+        glide, tolerance = _scratch(self._buffers, freqs.shape, ('glide', 'tolerance'))
+        steady, moving = _scratch(self._buffers, freqs.shape, ('steady', 'moving'), bool)
+        np.subtract(freqs, targets, out=glide)
+        np.abs(glide, out=glide)
+        np.abs(targets, out=tolerance)
+        tolerance *= self.glide_tolerance
+        np.less_equal(glide, tolerance, out=steady)
+        if sweep is not None:
+            np.equal(np.reshape(sweep[0], -1), 0, out=moving)
+            steady &= moving
+        steady_count = int(np.count_nonzero(steady))
+        self.stats['recursive_partials'] += steady_count
+        self.stats['fallback_partials'] += len(freqs) - steady_count
+
+        if steady_count == 0:
+            return self.exact.render(freq, phase, t, out=out, sweep=sweep)
+        if steady_count == len(freqs):
+            # Every partial is holding still: run the recurrence in scratch without allocating.
+            # Held partials rotate at target_freq, which stays constant while the key is down.
+            rotated, = _scratch(self._buffers, (len(t), len(freqs)), ('rotated',), np.complex128)
+            waves = self._rotate(targets, phases, t, rotated).imag.T
+            if out is None:
+                return waves.copy() if np.ndim(freq) else waves[0].copy()
+            np.copyto(out, waves.reshape(out.shape))
+            return out
+
+        # Some of each: both sets are gathered into scratch by row index, rendered
+        # there and written back, so only the row indices are allocated per call.
+        # Without mode='clip', take() buffers its output.
+        waves = np.empty((len(freqs), len(t))) if out is None else out.reshape(len(freqs), len(t))
+        np.logical_not(steady, out=moving)
+        glide_rows = np.flatnonzero(moving)
+        steady_rows = np.flatnonzero(steady)
+
+        count = len(glide_rows)
+        glide_freq, glide_phase = _scratch(self._buffers, (count, 1), ('glide_freq', 'glide_phase'))
+        glide_waves, = _scratch(self._buffers, (count, len(t)), ('glide_waves',))
+        np.take(freqs, glide_rows, out=glide_freq.reshape(count), mode='clip')
+        np.take(phases, glide_rows, out=glide_phase.reshape(count), mode='clip')
+        if sweep is not None:
+            delta, u = sweep
+            glide_delta, = _scratch(self._buffers, (count, 1), ('glide_delta',))
+            np.take(np.reshape(delta, -1), glide_rows, out=glide_delta.reshape(count), mode='clip')
+            if np.ndim(u) == 2:
+                # One glide curve per partial
+                glide_u, = _scratch(self._buffers, (count, len(t)), ('glide_u',))
+                u = np.take(u, glide_rows, axis=0, out=glide_u, mode='clip')
+            sweep = (glide_delta, u)
+        self.exact.render(glide_freq, glide_phase, t, out=glide_waves, sweep=sweep)
+        waves[glide_rows] = glide_waves
+
+        steady_freq, steady_phase = _scratch(self._buffers, (steady_count,), ('steady_freq', 'steady_phase'))
+        # One flat buffer for every split, since its trailing dimension changes with steady_count
+        rotated, = _scratch(self._buffers, (len(t) * len(freqs),), ('rotated',), np.complex128)
+        rotated = rotated[:len(t) * steady_count].reshape(len(t), steady_count)
+        np.take(targets, steady_rows, out=steady_freq, mode='clip')
+        np.take(phases, steady_rows, out=steady_phase, mode='clip')
+        waves[steady_rows] = self._rotate(steady_freq, steady_phase, t, rotated).imag.T
+
+        if out is not None:
+            return out
+        return waves if np.ndim(freq) else waves[0]
+
+OSCILLATORS = {
+    ExactOscillator.name: ExactOscillator,
+    WavetableOscillator.name: WavetableOscillator,
+    RecursiveOscillator.name: RecursiveOscillator,
+}
+
+def create_oscillator(name="exact", **options):
+    if name not in OSCILLATORS:
+        raise ValueError(f"Unknown oscillator '{name}'")
+    return OSCILLATORS[name](**options)
+
+def compare_oscillators(partials=200, frame_count=64, sample_rate=44100, repeats=200):
+    """Time each backend against the exact path and report its worst-case error"""
+    rng = np.random.default_rng(0)
+    freq = rng.uniform(20, sample_rate / 2, partials)[:, None]
+    phase = rng.uniform(0, 2 * np.pi, partials)[:, None]
+    t = np.arange(frame_count) / sample_rate
+
+    candidates = [ExactOscillator(), RecursiveOscillator()]
+    for size in (256, 1024, 4096, 16384):
+        for order in WavetableOscillator.ORDERS:
+            candidates.append(WavetableOscillator(size, order))
+
+    reference = candidates[0].render(freq, phase, t)
+    results = []
+    for osc in candidates:
+        start = time.perf_counter()
+        for _ in range(repeats):
+            wave = osc.render(freq, phase, t, freq)
+        elapsed = (time.perf_counter() - start) / repeats
+        results.append({
+            'oscillator': osc.name,
+            'table_size': getattr(osc, 'table_size', None),
+            'order': getattr(osc, 'order', None),
+            'us_per_chunk': elapsed * 1e6,
+            'max_error': float(np.abs(wave - reference).max()),
+        })
+    return results
+
+if __name__ == "__main__":
+    for r in compare_oscillators():
+        print(f"{r['oscillator']:>10} size={str(r['table_size']):>6} order={str(r['order']):>4} "
+              f"{r['us_per_chunk']:9.1f} us/chunk  max err {r['max_error']:.2e}")
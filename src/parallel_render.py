@@ -0,0 +1,487 @@
+import itertools
+import os
+import threading
+import time
+from collections import deque
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from harmonic_bank import HarmonicBank
+from envelope_cache import EnvelopeCache
+from oscillators import create_oscillator
+from param_block import ParamBlock
+
+FIELDS = HarmonicBank.FIELDS
+# Per-chunk job header in the shared control block, followed by the pressed trigger numbers
+JOB_FIELDS = ('seq', 'version', 'frame_count', 'current_freq', 'amp', 'check_triggers', 'pressed_count')
+MAX_TRIGGERS = 256
+
+class SharedArray:
+    """numpy array backed by a named shared memory segment"""
+    def __init__(self, shape, dtype=np.float64, name=None):
+        dtype = np.dtype(dtype)
+        if name is None:
+            size = max(1, int(np.prod(shape)) * dtype.itemsize)
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.array = np.ndarray(shape, dtype=dtype, buffer=self.shm.buf)
+        if self.owner:
+            self.array[...] = 0
+        self.spec = (self.shm.name, tuple(shape), dtype.str)
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, dtype = spec
+        return cls(shape, dtype, name)
+
+    def close(self):
+        self.array = None
+        if self.owner:
+            self.shm.unlink()
+        try:
+            self.shm.close()
+        except BufferError:
+            # Views handed out elsewhere (old blocks) keep the mapping alive until they go
+            pass
+
+class MirrorState:
+    """Read-back of every harmonic's runtime fields, indexed by the harmonic's slot.
+
+    Workers copy their rows here after each chunk so BankField reads (the UI's
+    frequency display, detach) see recent values. Writes from this side are not
+    sent back to the workers.
+    """
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.shared = SharedArray((len(FIELDS), capacity))
+
+class ShardLayout:
+    """What ParallelBank.commit hands to the ParamBlock in place of a BankState"""
+    def __init__(self, mirror, ring, count):
+        self.mirror = mirror
+        self.ring = ring
+        self.count = count
+        for i, name in enumerate(FIELDS):
+            setattr(self, name, mirror.shared.array[i])
+        # Mirror slot of each harmonic, in block order; set by ParallelBank.commit
+        self.slots = np.zeros(count, dtype=np.intp)
+        # Block rows each worker renders; set by ParallelBank.publish
+        self.shards = ()
+
+    def read(self, name, out):
+        """Copy field `name` into `out`, one value per harmonic in block order"""
+        np.take(getattr(self, name), self.slots, out=out)
+
+class ParallelBank:
+    """Shards the harmonic rows across worker processes.
+
+    Drop-in for HarmonicBank on the SineGen side (attach/detach/commit and the
+    callback entry points). Each worker keeps a HarmonicBank for its own rows
+    and renders them `lookahead` chunks ahead of playback into a shared ring
+    of per-row output. The callback sums a finished slot over its rows in row
+    order, exactly as HarmonicBank.synthesize does, so the mix is bit-identical
+    to the single-process bank fed the same controls `lookahead` chunks earlier.
+    The first `lookahead` chunks are silence.
+
+    Per-chunk controls (pitch, amplitude, pressed triggers) go through a
+    shared control block, and runtime state comes back through the shared
+    mirror. Layouts, which carry tunings and other Python objects, are
+    pickled to each worker over a pipe once per commit, never per chunk.
+    """
+    def __init__(self, generator, workers=None, lookahead=1, realtime=True):
+        if workers is None:
+            workers = max(1, (os.cpu_count() or 2) - 1)
+        if int(workers) < 1:
+            raise ValueError("Parallel rendering needs at least one worker")
+        if int(lookahead) < 0:
+            raise ValueError("Lookahead can't be negative")
+        self.generator = generator
+        self.workers = int(workers)
+        self.lookahead = int(lookahead)
+        self.slots = self.lookahead + 1
+        self.chunk_size = generator.chunk_size
+        # Offline renders turn this off and wait for every chunk instead of skipping late ones
+        self.realtime = realtime
+        self.late_chunks = 0
+        # Workers cull out-of-band partials from their own shards and don't report the count
+        self.culled = 0
+
+        self._mirror = MirrorState(64)
+        self._ring = SharedArray((self.slots, 64, self.chunk_size))
+        self.state = ShardLayout(self._mirror, self._ring, 0)
+        self._free_slots = list(range(self._mirror.capacity - 1, -1, -1))
+        self._uids = itertools.count()
+        self._loads = [0] * self.workers
+        # Segments replaced by bigger ones, freed once no queued job can still use them
+        self._retired = deque()
+
+        self._control = SharedArray((self.slots, len(JOB_FIELDS) + MAX_TRIGGERS))
+        self._in_flight = deque()
+        # Jobs each worker has reported done; workers finish jobs in order, one token each
+        self._finished = [0] * self.workers
+        self._next_seq = 0
+        self._pending = None
+        self._mix = np.zeros(self.chunk_size)
+
+        ctx = mp.get_context('spawn')
+        self._job_ready = [ctx.Semaphore(0) for _ in range(self.workers)]
+        self._job_done = [ctx.Semaphore(0) for _ in range(self.workers)]
+        self._conns = []
+        self._processes = []
+        for w in range(self.workers):
+            receiver, sender = ctx.Pipe(duplex=False)
+            process = ctx.Process(
+                target=_worker_main,
+                args=(self._control.spec, self.slots, receiver, self._job_ready[w], self._job_done[w]),
+                daemon=True)
+            process.start()
+            receiver.close()
+            self._conns.append(sender)
+            self._processes.append(process)
+
+    def attach(self, harmonic):
+        if harmonic.__dict__.get('_bank') is not None:
+            raise ValueError(f"Harmonic {harmonic.multiplier}x already belongs to a bank")
+        harmonic._slot = -1
+        harmonic._bank = self
+        harmonic._uid = next(self._uids)
+        harmonic._worker = self._loads.index(min(self._loads))
+        self._loads[harmonic._worker] += 1
+
+    def detach(self, harmonic):
+        if harmonic.__dict__.get('_bank') is not self:
+            return
+        if harmonic._slot >= 0:
+            for name in FIELDS:
+                harmonic.__dict__[name] = float(getattr(self.state, name)[harmonic._slot])
+            self._free_slots.append(harmonic._slot)
+        self._loads[harmonic._worker] -= 1
+        harmonic._bank = None
+        harmonic._slot = -1
+
+    def commit(self, harmonics):
+        """Give new harmonics a mirror slot and make sure the ring has a row for every harmonic"""
+        new = [h for h in harmonics if h._slot < 0]
+        if len(new) > len(self._free_slots):
+            self._grow_mirror(self._mirror.capacity - len(self._free_slots) + len(new))
+        mirror = self._mirror.shared.array
+        for harmonic in new:
+            slot = self._free_slots.pop()
+            for i, name in enumerate(FIELDS):
+                mirror[i, slot] = harmonic.__dict__[name]
+            harmonic._slot = slot
+        if len(harmonics) > self._ring.array.shape[1]:
+            self._retire(self._ring)
+            self._ring = SharedArray((self.slots, max(len(harmonics), 2 * self._ring.array.shape[1]),
+                                      self.chunk_size))
+        self.state = ShardLayout(self._mirror, self._ring, len(harmonics))
+        self.state.slots[:] = [h._slot for h in harmonics]
+        return self.state
+
+    def _grow_mirror(self, needed):
+        old = self._mirror
+        mirror = MirrorState(max(needed, 2 * old.capacity))
+        mirror.shared.array[:, :old.capacity] = old.shared.array
+        self._free_slots = list(range(mirror.capacity - 1, old.capacity - 1, -1)) + self._free_slots
+        self._retire(old.shared)
+        self._mirror = mirror
+
+    def _retire(self, segment):
+        # Jobs for the block being built now will use the replacement
+        self._retired.append((self.generator._version + 1, segment))
+
+    def publish(self, block):
+        """Send each worker its shard of `block` before the audio thread can pick the block up"""
+        harmonics = block.harmonics
+        shards = [[] for _ in range(self.workers)]
+        for row, harmonic in enumerate(harmonics):
+            shards[harmonic._worker].append(row)
+
+        layout = block.bank_state
+        common = {
+            'version': block.version,
+            'ring': layout.ring.spec,
+            'mirror': layout.mirror.shared.spec,
+            'oscillator': self.generator.oscillator_spec,
+            'sample_rate': self.generator.sample_rate,
+            'triggers': tuple(indices for _, indices in block.triggers),
+            'total_amp': block.total_amp,
+            'global_amp_smoothing': block.global_amp_smoothing,
+            'global_pitch_smoothing': block.global_pitch_smoothing,
+            'active_threshold': block.active_threshold,
+            'band': block.band,
+            'tuning': block.tuning,
+        }
+        layout.shards = tuple(np.array(rows, dtype=np.intp) for rows in shards)
+        for conn, rows in zip(self._conns, layout.shards):
+            shard = dict(common)
+            shard.update({
+                'rows': rows,
+                'uids': [harmonics[i]._uid for i in rows],
+                'slots': np.array([harmonics[i]._slot for i in rows], dtype=np.intp),
+                'initial': np.array([[harmonics[i].__dict__.get(name, 0.0) for name in FIELDS] for i in rows]),
+                'multiplier': block.multiplier[rows],
+                'initial_amp': block.initial_amp[rows],
+                'amp_smoothing': block.amp_smoothing[rows],
+                'pitch_smoothing': block.pitch_smoothing[rows],
+                'snap_enabled': block.snap_enabled[rows],
+            })
+            conn.send(shard)
+
+    def apply_triggers(self, block, pressed, current_freq):
+        # Carried by the next job; workers retarget their own rows
+        if len(pressed) > MAX_TRIGGERS:
+            pressed = pressed[:MAX_TRIGGERS]
+        self._pending = (pressed, current_freq)
+
+    def smooth(self, generator, block, frame_count):
+        # Smoothing runs in the workers as part of each job
+        return True
+
+    def synthesize(self, generator, block, frame_count, amp):
+        """Queue a job with this chunk's controls and mix the one queued `lookahead` chunks ago.
+
+        The mix has the frame count that chunk was queued with. In real-time
+        mode a worker that hasn't finished that chunk is not waited for when
+        lookahead gives it a head start, and for at most one chunk's time
+        otherwise; the chunk is mixed from the workers that are done. While a
+        late worker still holds a ring slot, no new job is queued and that
+        call's controls are skipped: a silent chunk takes the job's place, so
+        playback stays `lookahead` chunks behind the controls.
+        """
+        if frame_count > self.chunk_size:
+            raise ValueError(f"Parallel rendering is sized for chunks of at most {self.chunk_size} frames")
+        # Prime the ring with silence, so every job renders the controls of the call that queued it
+        while len(self._in_flight) < self.lookahead:
+            if self._next_seq:
+                # Only a skipped job leaves a gap after the start
+                self.late_chunks += 1
+            self._in_flight.append((None, block.version, None, frame_count))
+        # The job queued `slots` ago used the same slot; every worker has to be done with it
+        if len(self._in_flight) < self.slots and self._ready(self._next_seq - self.slots, None):
+            self._dispatch(block, frame_count, amp)
+        return self._collect(frame_count, generator.sample_rate)
+
+    def _dispatch(self, block, frame_count, amp):
+        seq = self._next_seq
+        slot = seq % self.slots
+        job = self._control.array[slot]
+        pending = self._pending
+        self._pending = None
+        job[1] = block.version
+        job[2] = frame_count
+        job[4] = amp
+        job[5] = pending is not None
+        if pending is not None:
+            pressed, current_freq = pending
+            job[3] = current_freq
+            job[6] = len(pressed)
+            job[7:7 + len(pressed)] = pressed
+        job[0] = seq
+        for ready in self._job_ready:
+            ready.release()
+        self._in_flight.append((seq, block.version, block.bank_state, frame_count))
+        self._next_seq += 1
+
+    def _ready(self, seq, budget):
+        """Whether every worker has finished job `seq`, collecting their tokens.
+
+        Offline, waits for as long as it takes. In real-time mode, polls
+        when `budget` is None and otherwise waits up to `budget` seconds in all.
+        """
+        deadline = None if budget is None else time.perf_counter() + budget
+        for worker, done in enumerate(self._job_done):
+            while self._finished[worker] <= seq:
+                if not self.realtime:
+                    done.acquire()
+                elif not done.acquire(timeout=0 if deadline is None
+                                      else max(deadline - time.perf_counter(), 0)):
+                    break
+                self._finished[worker] += 1
+        return min(self._finished) > seq
+
+    def _collect(self, frame_count, sample_rate):
+        if not self._in_flight:
+            # Without lookahead a skipped job leaves nothing to play
+            self.late_chunks += 1
+            mix = self._mix[:frame_count]
+            mix[:] = 0
+            return mix
+        seq, version, layout, frame_count = self._in_flight.popleft()
+        mix = self._mix[:frame_count]
+        if seq is None:
+            mix[:] = 0
+            return mix
+        # With lookahead the job has had at least a chunk already; without, it was only just queued
+        ring = layout.ring.array[seq % self.slots]
+        if self._ready(seq, None if self.lookahead else frame_count / sample_rate):
+            np.sum(ring[:layout.count, :frame_count], axis=0, out=mix)
+        else:
+            # Waiting any longer would miss the deadline: play the shards that are ready
+            self.late_chunks += 1
+            mix[:] = 0
+            for worker, rows in enumerate(layout.shards):
+                if self._finished[worker] > seq:
+                    mix += np.sum(ring[rows, :frame_count], axis=0)
+        while self._retired and self._retired[0][0] <= version:
+            self._retired.popleft()[1].close()
+        return mix
+
+    def close(self):
+        """Stop the workers and release every shared segment"""
+        if not self._processes:
+            return
+        # Let queued jobs finish so the stop marker can't overwrite one a worker hasn't read
+        for worker, done in enumerate(self._job_done):
+            while self._finished[worker] < self._next_seq and done.acquire(timeout=1):
+                self._finished[worker] += 1
+        self._in_flight.clear()
+        job = self._control.array[self._next_seq % self.slots]
+        job[0] = -1
+        for ready in self._job_ready:
+            ready.release()
+        for conn in self._conns:
+            conn.close()
+        for process in self._processes:
+            process.join(timeout=2)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        while self._retired:
+            self._retired.popleft()[1].close()
+        for segment in (self._control, self._ring, self._mirror.shared):
+            segment.close()
+        self.state = None
+
+class _ShardRow:
+    # Worker-side stand-in for Harmonic: HarmonicBank only needs _slot and the field values
+    def __init__(self, values):
+        self.__dict__.update(zip(FIELDS, values))
+        self.multiplier = None
+
+class _ShardContext:
+    # The parts of SineGen that HarmonicBank reads
+    def __init__(self):
+        self.sample_rate = None
+        self.envelope_cache = EnvelopeCache()
+        self.oscillator = None
+        self.oscillator_spec = None
+
+def _apply_layout(layout, bank, rows_by_uid, context, segments):
+    if context.oscillator_spec != layout['oscillator']:
+        name, options = layout['oscillator']
+        context.oscillator = create_oscillator(name, **options)
+        context.oscillator_spec = layout['oscillator']
+    context.sample_rate = layout['sample_rate']
+    for key in ('ring', 'mirror'):
+        if segments.get(key) is None or segments[key].spec != layout[key]:
+            if segments.get(key) is not None:
+                segments[key].close()
+            segments[key] = SharedArray.attach(layout[key])
+
+    rows = []
+    for uid, values in zip(layout['uids'], layout['initial']):
+        row = rows_by_uid.get(uid)
+        if row is None:
+            row = _ShardRow(values)
+            bank.attach(row)
+        rows.append(row)
+    rows_by_uid.clear()
+    rows_by_uid.update(zip(layout['uids'], rows))
+    state = bank.commit(rows)
+
+    local = {int(row): i for i, row in enumerate(layout['rows'])}
+    triggers = tuple((None, tuple(local[i] for i in indices if i in local)) for indices in layout['triggers'])
+    return ParamBlock(
+        version=layout['version'], harmonics=(), rows=(),
+        multiplier=layout['multiplier'], initial_amp=layout['initial_amp'],
+        amp_smoothing=layout['amp_smoothing'], pitch_smoothing=layout['pitch_smoothing'],
+        snap_enabled=layout['snap_enabled'], total_amp=layout['total_amp'], triggers=triggers,
+        min_freq=None, max_freq=None,
+        global_amp_smoothing=layout['global_amp_smoothing'],
+        global_pitch_smoothing=layout['global_pitch_smoothing'],
+        active_threshold=layout['active_threshold'],
+        # Shards hand back one row per partial, so they always render in the time domain
+        spectral_crossover=float('inf'),
+        band=layout['band'],
+        tuning=layout['tuning'],
+        bank_state=state,
+        bank=bank,
+    )
+
+def _worker_main(control_spec, slots, conn, job_ready, job_done):
+    layouts = {}
+    arrived = threading.Condition()
+
+    def receive():
+        # Layouts arrive whenever the UI commits; keep them until a job asks for one
+        while True:
+            try:
+                layout = conn.recv()
+            except (EOFError, OSError):
+                layout = None
+            with arrived:
+                if layout is None:
+                    layouts['closed'] = True
+                else:
+                    layouts[layout['version']] = layout
+                arrived.notify_all()
+            if layout is None:
+                return
+
+    threading.Thread(target=receive, daemon=True).start()
+    control = SharedArray.attach(control_spec)
+    bank = HarmonicBank()
+    context = _ShardContext()
+    rows_by_uid = {}
+    segments = {}
+    block = None
+    seq = 0
+
+    while True:
+        job_ready.acquire()
+        job = control.array[seq % slots]
+        if int(job[0]) < 0:
+            break
+        version = int(job[1])
+        if block is None or block.version != version:
+            with arrived:
+                arrived.wait_for(lambda: version in layouts or 'closed' in layouts)
+                if version not in layouts:
+                    break
+                layout = layouts.pop(version)
+                for old in [v for v in layouts if v != 'closed' and v < version]:
+                    del layouts[old]
+            block = _apply_layout(layout, bank, rows_by_uid, context, segments)
+            rows = layout['rows']
+            mirror_slots = layout['slots']
+
+        frame_count = int(job[2])
+        if job[5]:
+            pressed = job[7:7 + int(job[6])].astype(np.intp).tolist()
+            bank.apply_triggers(block, pressed, float(job[3]))
+        ring = segments['ring'].array[seq % slots]
+        if bank.smooth(context, block, frame_count):
+            partials = bank.partials(context, block, frame_count, float(job[4]))
+            if bank.active_rows is None:
+                ring[rows, :frame_count] = partials
+            else:
+                # Idle rows still occupy the ring; zeros leave the in-order sum unchanged
+                ring[rows, :frame_count] = 0
+                ring[rows[bank.active_rows], :frame_count] = partials
+        else:
+            ring[rows, :frame_count] = 0
+        if len(rows):
+            mirror = segments['mirror'].array
+            state = bank.active
+            for i, name in enumerate(FIELDS):
+                mirror[i, mirror_slots] = getattr(state, name)
+        job_done.release()
+        seq += 1
+
+    for segment in segments.values():
+        segment.close()
+    control.close()
@@ -0,0 +1,62 @@
+import numpy as np
+from audible_band import AudibleBand
+
+class ParamBlock:
+    """Immutable parameter snapshot published by SineGen.commit().
+
+    The audio callback reads the latest block once per chunk; writers never
+    touch a published block, they build a new one and swap the reference.
+    Settings are read from `source`, the generator or a Patch, and `bank`
+    is the engine that owns `bank_state`.
+    """
+    __slots__ = (
+        'version', 'harmonics', 'rows', 'multiplier', 'initial_amp', 'amp_smoothing',
+        'pitch_smoothing', 'snap_enabled', 'total_amp', 'triggers', 'min_freq', 'max_freq',
+        'global_amp_smoothing', 'global_pitch_smoothing', 'active_threshold', 'spectral_crossover',
+        'band', 'tuning', 'bank_state', 'bank'
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            object.__setattr__(self, name, fields[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("ParamBlock is immutable; publish a new one with SineGen.commit()")
+
+    @classmethod
+    def capture(cls, source, version, harmonics, triggers, bank_state, bank=None):
+        # Per-harmonic parameters as plain tuples for the loop engine...
+        rows = tuple(
+            (h, h.multiplier, h.initial_amp, h.amp_smoothing, h.pitch_smoothing, h.snap_enabled)
+            for h in harmonics
+        )
+
+        # ...and as read-only arrays for the bank engine
+        def column(index, dtype=np.float64):
+            arr = np.fromiter((row[index] for row in rows), dtype=dtype, count=len(rows))
+            arr.flags.writeable = False
+            return arr
+
+        initial_amp = column(2)
+        return cls(
+            version=version,
+            harmonics=harmonics,
+            rows=rows,
+            multiplier=column(1),
+            initial_amp=initial_amp,
+            amp_smoothing=column(3),
+            pitch_smoothing=column(4),
+            snap_enabled=column(5, bool),
+            total_amp=float(initial_amp.sum()) or 1,
+            triggers=triggers,
+            min_freq=source.min_freq,
+            max_freq=source.max_freq,
+            global_amp_smoothing=source.global_amp_smoothing,
+            global_pitch_smoothing=source.global_pitch_smoothing,
+            active_threshold=source.active_threshold,
+            spectral_crossover=source.spectral_crossover,
+            band=AudibleBand(source.audible_low, source.sample_rate / 2),
+            tuning=source.tuning,
+            bank_state=bank_state,
+            bank=bank,
+        )
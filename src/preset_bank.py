@@ -0,0 +1,197 @@
+import os
+import sys
+import threading
+import zipfile
+from collections import OrderedDict, deque
+from config_manager import ConfigManager
+from harmonic_bank import HarmonicBank
+
+# What an unreadable or malformed preset file raises while being read and prepared
+# (json.JSONDecodeError is a ValueError, a damaged .npz a BadZipFile)
+PRESET_ERRORS = (OSError, ValueError, KeyError, TypeError, AttributeError, zipfile.BadZipFile)
+
+def patch_bytes(patch):
+    """Rough memory held by a prepared patch: its arrays plus a Python harmonic and row per partial"""
+    block = patch.block
+    total = sum(getattr(block, name).nbytes
+                for name in ('multiplier', 'initial_amp', 'amp_smoothing', 'pitch_smoothing', 'snap_enabled'))
+    if block.bank_state is not None:
+        total += sum(getattr(block.bank_state, name).nbytes for name in HarmonicBank.FIELDS)
+    if block.harmonics:
+        harmonic = block.harmonics[0]
+        per_harmonic = sys.getsizeof(harmonic) + sys.getsizeof(harmonic.__dict__) + sys.getsizeof(block.rows[0])
+        total += len(block.harmonics) * per_harmonic
+    return total
+
+class Preset:
+    def __init__(self, name, filepath, hotkey_ids):
+        self.name = name
+        self.filepath = filepath
+        self.hotkey_ids = hotkey_ids
+        # Parsed file, kept so a fresh patch can be prepared without reading it again
+        self.config = None
+        self.mtime = None
+        self.patch = None
+        self.nbytes = 0
+        # (mtime, exception) of the last failed reload; the file is skipped until its mtime changes
+        self.error = None
+
+class PresetBank:
+    """Configs preloaded as ready-to-install patches, switched by hotkey mid-performance.
+
+    Each preset keeps its parsed config and a patch from SineGen.prepare_patch(),
+    so select() is a few reference swaps and a crossfade at the next chunk
+    boundary. Prepared patches are held to `max_bytes`: least recently
+    selected ones are dropped first and prepared again when next needed.
+    An installed patch is live, so a fresh copy is prepared in the background
+    for the next switch. Polyphony settings in a preset are not applied.
+    Files that fail to reload are reported once through `errors`.
+    """
+    def __init__(self, generator, max_bytes=64 * 2**20, crossfade=0.05):
+        self.generator = generator
+        self.max_bytes = max_bytes
+        self.crossfade = crossfade
+        # Least recently selected first
+        self.presets = OrderedDict()
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self._held = set()
+        self._watcher = None
+        self._stop_watching = threading.Event()
+        # (preset name, exception) for each failed reload, for the UI thread to report
+        self.errors = deque()
+
+    def add(self, name, filepath, hotkey=None):
+        """Register and preload the config at `filepath`; `hotkey` selects it from poll()"""
+        preset = Preset(name, filepath, self.generator.key_state.combo_ids(hotkey))
+        config, mtime, patch = self._read(filepath)
+        with self._lock:
+            old = self.presets.pop(name, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self.presets[name] = preset
+            preset.config, preset.mtime = config, mtime
+            self._store(preset, patch)
+        return preset
+
+    def remove(self, name):
+        with self._lock:
+            preset = self.presets.pop(name, None)
+            if preset is not None:
+                self.bytes -= preset.nbytes
+
+    def select(self, name):
+        """Crossfade to preset `name`; returns the patch that is now live"""
+        with self._lock:
+            preset = self.presets.get(name)
+            if preset is None:
+                raise ValueError(f"Unknown preset '{name}'")
+            self.presets.move_to_end(name)
+            patch = preset.patch
+            self._store(preset, None)
+        if patch is None:
+            # Evicted, or its background copy isn't ready yet
+            patch = self._prepare(preset.config)
+        self.generator.install_patch(patch, self.crossfade)
+        threading.Thread(target=self._refill, args=(preset,), daemon=True).start()
+        return patch
+
+    def poll(self):
+        """Select the preset whose hotkey went down since the last poll.
+
+        Call regularly from the UI thread; returns the selected name or None.
+        """
+        key_state = self.generator.key_state
+        selected = None
+        for name, preset in list(self.presets.items()):
+            if key_state.is_pressed(preset.hotkey_ids):
+                if name not in self._held:
+                    self._held.add(name)
+                    selected = name
+            else:
+                self._held.discard(name)
+        if selected is not None:
+            self.select(selected)
+        return selected
+
+    def watch(self, interval=1.0):
+        """Reload presets whose files change, checking every `interval` seconds from a background thread"""
+        if self._watcher is not None:
+            return
+        self._stop_watching.clear()
+        self._watcher = threading.Thread(target=self._watch, args=(interval,), daemon=True)
+        self._watcher.start()
+
+    def stop(self):
+        if self._watcher is not None:
+            self._stop_watching.set()
+            self._watcher.join()
+            self._watcher = None
+
+    def reload(self):
+        """Reload every preset whose file changed since it was last read; watch() calls this.
+
+        Returns the names reloaded. Failures go to `errors`, once per file version.
+        """
+        reloaded = []
+        for preset in list(self.presets.values()):
+            try:
+                mtime = os.path.getmtime(preset.filepath)
+            except OSError:
+                # Gone for now; _read() below reports it
+                mtime = None
+            if mtime == preset.mtime or (preset.error is not None and preset.error[0] == mtime):
+                continue
+            try:
+                config, mtime, patch = self._read(preset.filepath)
+            except PRESET_ERRORS as e:
+                # Missing, half-written or malformed: report once, retry when the file changes
+                preset.error = (mtime, e)
+                self.errors.append((preset.name, e))
+                continue
+            preset.error = None
+            # The live copy keeps playing; the reloaded one is used from the next select()
+            with self._lock:
+                preset.config, preset.mtime = config, mtime
+                self._store(preset, patch)
+            reloaded.append(preset.name)
+        return reloaded
+
+    def _watch(self, interval):
+        while not self._stop_watching.wait(interval):
+            self.reload()
+
+    def _read(self, filepath):
+        mtime = os.path.getmtime(filepath)
+        config = ConfigManager.read_config(filepath)
+        return config, mtime, self._prepare(config)
+
+    def _refill(self, preset):
+        patch = self._prepare(preset.config)
+        with self._lock:
+            if preset.patch is None:
+                self._store(preset, patch)
+
+    def _prepare(self, config):
+        harmonics, groups = ConfigManager.patch_specs(config)
+        return self.generator.prepare_patch(harmonics, groups, ConfigManager.patch_settings(config),
+                                            config.get('tuning'))
+
+    def _store(self, preset, patch):
+        # Lock held. `bytes` is the sum of nbytes over registered presets
+        registered = self.presets.get(preset.name) is preset
+        if registered:
+            self.bytes -= preset.nbytes
+        preset.patch = patch
+        preset.nbytes = patch_bytes(patch) if patch is not None else 0
+        if registered and patch is not None:
+            self.bytes += preset.nbytes
+            self._evict(preset)
+
+    def _evict(self, keep):
+        # Lock held; drop prepared patches, least recently selected first, until back under budget
+        for preset in list(self.presets.values()):
+            if self.bytes <= self.max_bytes:
+                break
+            if preset is not keep and preset.patch is not None:
+                self._store(preset, None)
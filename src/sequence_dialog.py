@@ -1,5 +1,6 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
+from sequence_expr import SequenceExpression, MAX_ITERATIONS
 
 class SequenceDialog:
     def __init__(self, parent, initial_value):
@@ -26,7 +27,7 @@ class SequenceDialog:
         self.iterations_entry.insert(0, "3")  # Default value
         
         # Example label
-        example_text = "Example: x*2 (will double frequency each time)"
+        example_text = "Examples: x*2 (doubles each time), math.sqrt(x) + 1"
         ttk.Label(main_frame, text=example_text, font=('TkDefaultFont', 9)).pack(anchor=tk.W, pady=(0,10))
         
         # Button frame
@@ -48,15 +49,17 @@ class SequenceDialog:
         
         try:
             iterations = int(iterations_str)
-            if iterations <= 0 or iterations > 20:  # Reasonable limit
-                raise ValueError("Iterations must be between 1 and 20")
+            if iterations <= 0 or iterations > MAX_ITERATIONS:
+                raise ValueError(f"Iterations must be between 1 and {MAX_ITERATIONS}")
         except ValueError:
-            messagebox.showerror("Error", "Iterations must be a positive integer (max 20)")
+            messagebox.showerror("Error", f"Iterations must be a positive integer (max {MAX_ITERATIONS})")
             return
         
-        # Basic code validation
-        if not all(c.isalnum() or c in ' x_().*+-/^%' for c in code_str):
-            messagebox.showerror("Error", "Code contains invalid characters")
+        # Only arithmetic on x and math functions get through
+        try:
+            SequenceExpression(code_str)
+        except ValueError as e:
+            messagebox.showerror("Error", str(e))
             return
         
         self.result = (code_str, iterations)
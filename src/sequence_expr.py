@@ -0,0 +1,85 @@
+import ast
+import math
+import numpy as np
+
+# Longest sequence SequenceDialog accepts
+MAX_ITERATIONS = 10000
+
+# The only names an expression can use besides x: math.<name> for these, where this Python has them
+MATH_NAMES = frozenset(name for name in (
+    'pi', 'e', 'tau', 'sqrt', 'cbrt', 'exp', 'exp2', 'log', 'log2', 'log10', 'pow', 'hypot',
+    'sin', 'cos', 'tan', 'asin', 'acos', 'atan', 'atan2', 'sinh', 'cosh', 'tanh',
+    'floor', 'ceil', 'trunc', 'fabs', 'fmod', 'copysign', 'remainder',
+) if hasattr(math, name))
+OPERATORS = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.UAdd, ast.USub)
+
+class SequenceExpression:
+    """A multiplier recurrence such as "x * 2" or "math.sqrt(x) + 1", checked and compiled once.
+
+    Only arithmetic, number literals, `x` and the functions and constants in
+    MATH_NAMES are accepted; anything else is rejected with a ValueError
+    before the expression is compiled. Integer literals become floats, so
+    powers overflow instead of growing without bound.
+    """
+    def __init__(self, source):
+        self.source = source
+        try:
+            tree = ast.parse(source.strip(), mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f"Invalid expression: {e.msg}") from None
+        self._check(tree.body)
+        self._code = compile(tree, '<sequence>', 'eval')
+        self._namespace = {'__builtins__': {}, 'math': math}
+
+    def _check(self, node):
+        if isinstance(node, ast.Constant):
+            if type(node.value) not in (int, float):
+                raise ValueError(f"Unsupported constant {node.value!r}")
+            node.value = float(node.value)
+        elif isinstance(node, ast.Name):
+            if node.id != 'x':
+                raise ValueError(f"Unknown name '{node.id}'; only x and math.<name> are available")
+        elif isinstance(node, ast.Attribute):
+            if not (isinstance(node.value, ast.Name) and node.value.id == 'math' and node.attr in MATH_NAMES):
+                raise ValueError(f"Unsupported attribute '{ast.unparse(node)}'")
+        elif isinstance(node, ast.BinOp):
+            self._check_operator(node.op)
+            self._check(node.left)
+            self._check(node.right)
+        elif isinstance(node, ast.UnaryOp):
+            self._check_operator(node.op)
+            self._check(node.operand)
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Attribute) or node.keywords:
+                raise ValueError("Only math functions can be called, with positional arguments")
+            self._check(node.func)
+            for arg in node.args:
+                self._check(arg)
+        else:
+            raise ValueError(f"Unsupported syntax: {type(node).__name__}")
+
+    @staticmethod
+    def _check_operator(op):
+        if not isinstance(op, OPERATORS):
+            hint = "; use ** for powers" if isinstance(op, ast.BitXor) else ""
+            raise ValueError(f"Unsupported operator {type(op).__name__}{hint}")
+
+    def __call__(self, x):
+        value = eval(self._code, self._namespace, {'x': float(x)})
+        if not isinstance(value, (int, float)):
+            raise ValueError(f"Expression must evaluate to a real number, got {value!r}")
+        return float(value)
+
+    def sequence(self, start, count):
+        """`count` values of the recurrence from x = `start`, not including `start`"""
+        values = np.empty(count)
+        x = float(start)
+        for i in range(count):
+            try:
+                value = self(x)
+            except (ArithmeticError, ValueError, TypeError) as e:
+                raise ValueError(f"Iteration {i + 1} with x = {x}: {e}") from None
+            if not math.isfinite(value):
+                raise ValueError(f"Iteration {i + 1} with x = {x}: result is {value}")
+            values[i] = x = value
+        return values
@@ -1,10 +1,31 @@
+import itertools
 import numpy as np
-import pyaudio
-import keyboard
-import time
-from utils import MusicUtils
+from contextlib import contextmanager
+from time import perf_counter, perf_counter_ns
+from harmonic_bank import BankField, HarmonicBank
+from oscillators import create_oscillator
+from envelope_cache import EnvelopeCache
+from key_state import KeyState
+from param_block import ParamBlock
+from instrumentation import CallbackStats
+from display_feed import DisplayFeed
+from voices import VoicePool
+from tuning import get_tuning
+from spectral_render import SPECTRAL_CROSSOVER
+from audible_band import AUDIBLE_LOW
+from mouse_input import MouseInput, ControlRamps
+
+# PA_CONTINUE, so rendering never has to import the audio backend
+PA_CONTINUE = 0
 
 class Harmonic:
+    # Runtime state advanced by the audio thread; parameters stay plain attributes
+    phase = BankField()
+    current_amp = BankField()
+    target_amp = BankField()
+    current_freq = BankField()
+    target_freq = BankField()
+
     def __init__(self, multiplier, initial_amp=1.0, amp_smoothing=100, pitch_smoothing=50, trigger_key="space"):
         self.multiplier = float(multiplier)
         self.initial_amp = float(initial_amp)
@@ -17,6 +38,8 @@ class Harmonic:
         self.target_amp = 0.0
         self.target_freq = 0.0
         self.current_freq = 0.0
+        # Frequency the last rendered chunk ended at, where the next one's glide starts
+        self.start_freq = 0.0
         self.group = None
 
 class Group:
@@ -25,70 +48,411 @@ class Group:
         self.trigger_key = trigger_key
         self.harmonics = harmonics or []
 
+class Patch:
+    """Harmonics, groups and settings built off to the side by SineGen.prepare_patch().
+
+    Everything the audio thread needs is already in `block`, so installing
+    a patch is a handful of reference swaps. Settings are attributes, as on
+    the generator. A patch can be installed once; after that it is live.
+    """
+    def __init__(self, harmonics, index, groups, settings, tuning_name, tuning, sample_rate, bank):
+        self.harmonics = harmonics
+        self.index = index
+        self.groups = groups
+        self.settings = settings
+        for name, value in settings.items():
+            setattr(self, name, value)
+        self.tuning_name = tuning_name
+        self.tuning = tuning
+        self.sample_rate = sample_rate
+        self.bank = bank
+        self.block = None
+        self.installed = False
+
+class Crossfade:
+    """Outgoing patch that keeps rendering under a newly installed one for `frames` samples"""
+    def __init__(self, block, frames):
+        self.block = block
+        self.frames = frames
+        self.done = 0
+
 class SineGen:
-    def __init__(self, sample_rate=44100, max_freq=3000, chunk_size=1024):
+    ENGINES = ("loop", "bank", "parallel")
+
+    def __init__(self, sample_rate=44100, max_freq=3000, chunk_size=1024, engine="loop",
+                 oscillator="exact", oscillator_options=None, key_source=None, engine_options=None):
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown engine '{engine}'")
         self.sample_rate = sample_rate
         self.max_freq = max_freq
         self.min_freq = 1
         self.chunk_size = chunk_size
         self.mouse_x = 1920 // 2
         self.mouse_y = 1080 // 2
+        # Timestamped positions from the UI's listener; until the first push() the
+        # callback reads mouse_x/mouse_y once per chunk instead
+        self.mouse = MouseInput()
+        self._ramps = None
+        # Glide curve for this chunk's pitch changes, or None to hold pitch within chunks
+        self.pitch_sweep = None
         self.harmonics = []
+        # Quantized multiplier -> indices into self.harmonics
+        self.multiplier_tolerance = 1e-4
+        self._harmonic_index = {}
         self.groups = {}
         self.group_assignments = {}
         self.master_amp = 0.5
         self.global_amp_smoothing = 100
         self.global_pitch_smoothing = 50
-        self.last_key_check = time.time()
+        # Harmonics whose target and current amplitude are both below this are skipped
+        self.active_threshold = 1e-5
+        # The bank engine mixes through inverse FFTs from this many active harmonics up;
+        # see benchmark.measure_crossover(). float('inf') keeps it in the time domain.
+        self.spectral_crossover = SPECTRAL_CROSSOVER
+        # Partials below this or above Nyquist are faded out and culled; see AudibleBand
+        self.audible_low = AUDIBLE_LOW
+        # Note table shared by snapping in the audio thread and note names in the UI
+        self.tuning_name = "24-tet"
+        self.tuning = get_tuning(self.tuning_name)
         self.key_check_interval = 0.02
+        # Counted in samples so offline rendering sees the same trigger timing as playback
+        self._frames_since_key_check = float('inf')
+        # Fed by its own input thread; call key_state.start() to begin listening
+        self.key_state = KeyState(key_source)
         self.screen_x = 1920
         self.screen_y = 1080
+        self.engine = engine
+        # Writers publish immutable ParamBlocks; the audio callback reads the latest once per chunk
+        self._params = None
+        # Versions are drawn from one counter so blocks prepared on other threads never collide
+        self._versions = itertools.count(1)
+        self._version = 0
+        self._batch_depth = 0
+        self.envelope_cache = EnvelopeCache()
+        self.set_oscillator(oscillator, **(oscillator_options or {}))
+        # Opt-in vectorized engines: harmonic state lives in contiguous arrays,
+        # either here or sharded across worker processes (engine_options: workers, lookahead)
+        if engine == "bank":
+            self.bank = HarmonicBank()
+        elif engine == "parallel":
+            # Imported here: multiprocessing and shared memory only load when asked for
+            from parallel_render import ParallelBank
+            self.bank = ParallelBank(self, **(engine_options or {}))
+        else:
+            self.bank = None
+        # Set by set_polyphony(); when present it renders instead of the engine above
+        self.voices = None
+        # Output chunk reused by every callback; pyaudio copies it out before the next one
+        self._output = None
+        # Time axis, envelope, wave and mix buffers the loop engine reuses for every harmonic
+        self._loop_buffers = None
+        # Set by install_patch() while the previous patch fades out
+        self._fade = None
+        self._fade_output = None
+        # Per-stage callback timings and PortAudio status counts, readable from any thread
+        self.stats = CallbackStats()
+        # Current frequencies for the UI's note and frequency readouts
+        self.display = DisplayFeed()
+        self.commit()
+
+    SETTINGS = ('min_freq', 'max_freq', 'global_amp_smoothing', 'global_pitch_smoothing', 'active_threshold',
+                'spectral_crossover', 'audible_low')
+
+    def commit(self):
+        """Publish the current harmonics, groups and settings to the audio thread"""
+        harmonics = tuple(self.harmonics)
+        bank_state = self.bank.commit(harmonics) if self.bank is not None else None
+        self._version = next(self._versions)
+        block = ParamBlock.capture(self, self._version, harmonics,
+                                   self._build_triggers(harmonics, self.groups, self._harmonic_index), bank_state,
+                                   self.bank)
+        if self.engine == "parallel":
+            self.bank.publish(block)
+        # A single reference assignment is atomic, so the callback never sees a half-built block
+        self._params = block
+
+    def close(self):
+        """Release engine resources; the parallel engine stops its worker processes"""
+        if self.engine == "parallel":
+            self.bank.close()
+
+    @contextmanager
+    def batch_update(self):
+        """Group several edits into one published block"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.commit()
+
+    def _changed(self):
+        if self._batch_depth == 0:
+            self.commit()
+
+    def update_settings(self, **settings):
+        for name, value in settings.items():
+            if name not in self.SETTINGS:
+                raise ValueError(f"Unknown setting '{name}'")
+        if 'global_amp_smoothing' in settings:
+            self.envelope_cache.invalidate(self.global_amp_smoothing)
+        for name, value in settings.items():
+            setattr(self, name, float(value))
+        self._changed()
+
+    def set_harmonic_params(self, multiplier, **params):
+        idx = self._get_harmonic_index(multiplier)
+        if idx == -1:
+            raise ValueError(f"Harmonic {multiplier}x not found")
+        harmonic = self.harmonics[idx]
+        for name, value in params.items():
+            if name not in ('initial_amp', 'amp_smoothing', 'pitch_smoothing', 'snap_enabled'):
+                raise ValueError(f"Unknown harmonic parameter '{name}'")
+            if name in ('amp_smoothing', 'pitch_smoothing'):
+                # Slider drags would otherwise leave a trail of stale kernels in the cache
+                self.envelope_cache.invalidate(getattr(harmonic, name))
+            setattr(harmonic, name, bool(value) if name == 'snap_enabled' else float(value))
+        self._changed()
+
+    def set_oscillator(self, name, **options):
+        self.oscillator = create_oscillator(name, **options)
+        self.oscillator_spec = (name, options)
+        if self.engine == "parallel" and self._params is not None:
+            # Workers build their own oscillator from the next published block
+            self._changed()
 
-    def _get_harmonic_index(self, multiplier):
-        for i, h in enumerate(self.harmonics):
-            if h.multiplier == multiplier:
-                return i
-        return -1
+    def set_tuning(self, name):
+        """Switch note snapping and naming to a built-in tuning or a Scala .scl file"""
+        self.tuning = get_tuning(name)
+        self.tuning_name = name
+        self._changed()
+
+    def set_polyphony(self, voices, partials=32, steal='oldest'):
+        """Play every trigger as its own voice, latched at the mouse pitch on key-down.
+
+        `voices` 0 goes back to a single note that follows the mouse.
+        """
+        # The callback picks up the new pool on its next chunk; voices still sounding in the old one stop
+        self.voices = VoicePool(voices, partials, steal) if voices else None
+
+    def _multiplier_key(self, multiplier):
+        return round(multiplier / self.multiplier_tolerance)
+
+    def _get_harmonic_index(self, multiplier, exact=False):
+        return self._find_harmonic(self.harmonics, self._harmonic_index, multiplier, exact)
+
+    def _find_harmonic(self, harmonics, index, multiplier, exact=False):
+        # An exact match wins; otherwise the closest within multiplier_tolerance, unless `exact`.
+        # Neighbouring buckets cover multipliers that straddle a quantization boundary.
+        key = self._multiplier_key(multiplier)
+        found, closest = -1, self.multiplier_tolerance
+        for k in (key, key - 1, key + 1):
+            for idx in index.get(k, ()):
+                distance = abs(harmonics[idx].multiplier - multiplier)
+                if distance == 0:
+                    return idx
+                if not exact and distance < closest:
+                    found, closest = idx, distance
+        return found
+
+    def _index_harmonic(self, index, multiplier, idx):
+        index.setdefault(self._multiplier_key(multiplier), []).append(idx)
+
+    def _reindex_harmonics(self):
+        self._harmonic_index = {}
+        for i, harmonic in enumerate(self.harmonics):
+            self._index_harmonic(self._harmonic_index, harmonic.multiplier, i)
+
+    def set_multiplier_tolerance(self, tolerance):
+        if tolerance <= 0:
+            raise ValueError("Multiplier tolerance must be positive")
+        self.multiplier_tolerance = float(tolerance)
+        self._reindex_harmonics()
 
     def add_harmonic(self, multiplier, initial_amp=1.0, amp_smoothing=100, pitch_smoothing=50, trigger_key="space"):
-        if self._get_harmonic_index(multiplier) == -1:
-            self.harmonics.append(Harmonic(multiplier, initial_amp, amp_smoothing, pitch_smoothing, trigger_key))
+        # Only an identical multiplier counts as a duplicate; close ones are distinct partials
+        if self._get_harmonic_index(multiplier, exact=True) == -1:
+            harmonic = Harmonic(multiplier, initial_amp, amp_smoothing, pitch_smoothing, trigger_key)
+            if self.bank is not None:
+                self.bank.attach(harmonic)
+            self._index_harmonic(self._harmonic_index, harmonic.multiplier, len(self.harmonics))
+            self.harmonics.append(harmonic)
+            self._changed()
+
+    def add_harmonics(self, harmonics):
+        """Add several harmonics as one published block.
+
+        Takes replace_patch's harmonic dicts; multipliers already in the patch
+        are skipped. Returns how many were added.
+        """
+        added, _ = self._build_harmonics(harmonics)
+        with self.batch_update():
+            count = 0
+            for harmonic in added:
+                if self._get_harmonic_index(harmonic.multiplier, exact=True) != -1:
+                    continue
+                if self.bank is not None:
+                    self.bank.attach(harmonic)
+                self._index_harmonic(self._harmonic_index, harmonic.multiplier, len(self.harmonics))
+                self.harmonics.append(harmonic)
+                count += 1
+            self._changed()
+        return count
 
     def remove_harmonic(self, multiplier):
         idx = self._get_harmonic_index(multiplier)
         if idx != -1:
             self.remove_from_group(multiplier)
+            if self.bank is not None:
+                self.bank.detach(self.harmonics[idx])
             del self.harmonics[idx]
+            self._reindex_harmonics()
+            self._changed()
+
+    def replace_patch(self, harmonics, groups=None):
+        """Swap every harmonic and group for new ones in one pass, published as one block.
+
+        `harmonics` is a sequence of dicts of add_harmonic arguments, optionally
+        with 'snap_enabled'; a multiplier already in the patch is skipped, as
+        add_harmonic would. `groups` maps group name to (trigger_key, multipliers).
+        """
+        with self.batch_update():
+            if self.bank is not None:
+                for harmonic in self.harmonics:
+                    self.bank.detach(harmonic)
+            self.harmonics, self._harmonic_index = self._build_harmonics(harmonics)
+            if self.bank is not None:
+                for harmonic in self.harmonics:
+                    self.bank.attach(harmonic)
+            self.groups = self._build_groups(groups)
+            self.group_assignments = {}
+            self._changed()
+
+    def _build_harmonics(self, specs):
+        harmonics = []
+        index = {}
+        for spec in specs:
+            spec = dict(spec)
+            snap_enabled = bool(spec.pop('snap_enabled', False))
+            harmonic = Harmonic(**spec)
+            if self._find_harmonic(harmonics, index, harmonic.multiplier, exact=True) != -1:
+                continue
+            harmonic.snap_enabled = snap_enabled
+            self._index_harmonic(index, harmonic.multiplier, len(harmonics))
+            harmonics.append(harmonic)
+        return harmonics, index
+
+    @staticmethod
+    def _build_groups(groups):
+        # Groups keep their lists exactly as given, the way configs have always loaded:
+        # a harmonic may sit in several groups (chords sharing a note) and keeps its own key
+        return {name: Group(name, trigger_key, list(multipliers))
+                for name, (trigger_key, multipliers) in (groups or {}).items()}
+
+    def prepare_patch(self, harmonics, groups=None, settings=None, tuning=None):
+        """Build a ready-to-render patch without touching the live one; see install_patch().
+
+        Takes replace_patch's arguments, plus `settings` overriding any of
+        SETTINGS and a `tuning` name. Safe to call from any thread.
+        """
+        values = {name: getattr(self, name) for name in self.SETTINGS}
+        for name, value in (settings or {}).items():
+            if name not in self.SETTINGS:
+                raise ValueError(f"Unknown setting '{name}'")
+            values[name] = float(value)
+        tuning_name = self.tuning_name if tuning is None else tuning
+        harmonics, index = self._build_harmonics(harmonics)
+        groups = self._build_groups(groups)
+        # The parallel engine's workers only ever hold the live patch
+        bank = HarmonicBank() if self.engine == "bank" else None
+        patch = Patch(harmonics, index, groups, values, tuning_name, get_tuning(tuning_name), self.sample_rate, bank)
+
+        layout = tuple(harmonics)
+        bank_state = None
+        if bank is not None:
+            for harmonic in harmonics:
+                bank.attach(harmonic)
+            bank_state = bank.commit(layout)
+        patch.block = ParamBlock.capture(patch, next(self._versions), layout,
+                                         self._build_triggers(layout, groups, index), bank_state, bank)
+        return patch
+
+    def install_patch(self, patch, crossfade=0.05):
+        """Make a prepared patch the live one at the next chunk boundary.
+
+        For `crossfade` seconds the outgoing patch keeps rendering and fades
+        out under the new one. Voices and the parallel engine switch without
+        a fade.
+        """
+        if patch.installed:
+            raise ValueError("Patch has already been installed")
+        patch.installed = True
+        if patch.global_amp_smoothing != self.global_amp_smoothing:
+            self.envelope_cache.invalidate(self.global_amp_smoothing)
+        for name in self.SETTINGS:
+            setattr(self, name, patch.settings[name])
+        self.tuning_name = patch.tuning_name
+        self.tuning = patch.tuning
+
+        if self.engine == "parallel":
+            with self.batch_update():
+                for harmonic in self.harmonics:
+                    self.bank.detach(harmonic)
+                self.harmonics = patch.harmonics
+                self._harmonic_index = patch.index
+                for harmonic in self.harmonics:
+                    self.bank.attach(harmonic)
+                self.groups = patch.groups
+                self.group_assignments = {}
+            return
+
+        old_block = self._params
+        self.harmonics = patch.harmonics
+        self._harmonic_index = patch.index
+        self.groups = patch.groups
+        self.group_assignments = {}
+        self.bank = patch.bank
+        self._version = patch.block.version
+        frames = int(crossfade * self.sample_rate)
+        # Published before the block: until the callback sees the new block it ignores the fade
+        self._fade = (Crossfade(old_block, frames)
+                      if frames > 0 and self.voices is None and old_block is not None and old_block.harmonics
+                      else None)
+        # Held keys retarget the new harmonics on the very next chunk
+        self._frames_since_key_check = float('inf')
+        self._params = patch.block
 
     def update_harmonic_multiplier(self, old_mult, new_mult):
         old_idx = self._get_harmonic_index(old_mult)
-        if old_idx == -1 or self._get_harmonic_index(new_mult) != -1:
+        if old_idx == -1 or self._get_harmonic_index(new_mult, exact=True) != -1:
             return False
+
+        with self.batch_update():
+            # Create new harmonic with same settings
+            old_harmonic = self.harmonics[old_idx]
+            group = old_harmonic.group
+            self.remove_harmonic(old_mult)
         
-        # Create new harmonic with same settings
-        old_harmonic = self.harmonics[old_idx]
-        group = old_harmonic.group
-        self.remove_harmonic(old_mult)
-        
-        self.add_harmonic(
-            multiplier=new_mult,
-            initial_amp=old_harmonic.initial_amp,
-            amp_smoothing=old_harmonic.amp_smoothing,
-            pitch_smoothing=old_harmonic.pitch_smoothing,
-            trigger_key=old_harmonic.trigger_key
-        )
-        
-        new_idx = self._get_harmonic_index(new_mult)
-        new_harmonic = self.harmonics[new_idx]
-        new_harmonic.snap_enabled = old_harmonic.snap_enabled
-        new_harmonic.current_amp = old_harmonic.current_amp
-        new_harmonic.target_amp = old_harmonic.target_amp
-        new_harmonic.target_freq = old_harmonic.target_freq
-        new_harmonic.current_freq = old_harmonic.current_freq
+            self.add_harmonic(
+                multiplier=new_mult,
+                initial_amp=old_harmonic.initial_amp,
+                amp_smoothing=old_harmonic.amp_smoothing,
+                pitch_smoothing=old_harmonic.pitch_smoothing,
+                trigger_key=old_harmonic.trigger_key
+            )
         
-        if group:
-            self.assign_to_group(new_mult, group)
+            new_idx = self._get_harmonic_index(new_mult)
+            new_harmonic = self.harmonics[new_idx]
+            new_harmonic.snap_enabled = old_harmonic.snap_enabled
+            new_harmonic.current_amp = old_harmonic.current_amp
+            new_harmonic.target_amp = old_harmonic.target_amp
+            new_harmonic.target_freq = old_harmonic.target_freq
+            new_harmonic.current_freq = old_harmonic.current_freq
         
+            if group:
+                self.assign_to_group(new_mult, group)
+
         return True
 
     # Group management methods
@@ -101,6 +465,7 @@ class SineGen:
         for mult in harmonics or []:
             if self._get_harmonic_index(mult) != -1:
                 self.group_assignments[mult] = group_name
+        self._changed()
 
     def assign_to_group(self, multiplier, group_name):
         if group_name not in self.groups:
@@ -112,6 +477,7 @@ class SineGen:
         self.groups[group_name].harmonics.append(multiplier)
         self.group_assignments[multiplier] = group_name
         self.harmonics[self._get_harmonic_index(multiplier)].group = group_name
+        self._changed()
 
     def remove_from_group(self, multiplier):
         if multiplier in self.group_assignments:
@@ -122,111 +488,297 @@ class SineGen:
             idx = self._get_harmonic_index(multiplier)
             if idx != -1:
                 self.harmonics[idx].group = None
+            self._changed()
 
     def remove_group(self, group_name):
         if group_name not in self.groups:
             raise ValueError(f"Group '{group_name}' doesn't exist")
         
-        for mult in self.groups[group_name].harmonics[:]:
-            self.remove_from_group(mult)
-        
-        del self.groups[group_name]
+        with self.batch_update():
+            for mult in self.groups[group_name].harmonics[:]:
+                self.remove_from_group(mult)
+
+            del self.groups[group_name]
 
     def set_group_key(self, group_name, trigger_key):
         if group_name not in self.groups:
             raise ValueError(f"Group '{group_name}' doesn't exist")
         self.groups[group_name].trigger_key = trigger_key
+        self._changed()
 
     def get_group_for_harmonic(self, multiplier):
         return self.group_assignments.get(multiplier)
 
+    def _output_buffer(self, frame_count):
+        if self._output is None or len(self._output[0]) != frame_count:
+            data = np.zeros(frame_count, dtype=np.float32)
+            self._output = (data, memoryview(data).cast('B').toreadonly())
+        return self._output
+
     def audio_callback(self, in_data, frame_count, time_info, status):
+        """Render one chunk.
+
+        The returned buffer is a read-only view of storage that the next call
+        overwrites; copy it if it has to outlive the callback.
+        """
+        start = perf_counter_ns()
+        # Pick up the latest published parameters once for the whole chunk
+        block = self._params
+        voices = self.voices
+
         # Convert mouse X position to logarithmic frequency scale
-        if self.min_freq <= 0 or self.max_freq <= self.min_freq:
-            current_freq = self.min_freq
+        if block.min_freq <= 0 or block.max_freq <= block.min_freq:
+            current_freq = block.min_freq
         else:
             ratio = self.mouse_x / self.screen_x
-            current_freq = self.min_freq * (self.max_freq / self.min_freq) ** ratio
+            current_freq = block.min_freq * (block.max_freq / block.min_freq) ** ratio
 
         current_amp = (self.mouse_y / self.screen_y) / 2
 
-        now = time.time()
-        if now - self.last_key_check >= self.key_check_interval:
-            self._update_triggered_harmonics(current_freq)
-            self.last_key_check = now
+        # Once the UI feeds self.mouse, pitch and amplitude follow it sample by sample
+        amp_ramp = None
+        self.pitch_sweep = None
+        ramps = self._control_ramps(frame_count)
+        if ramps.build(self.mouse, block, self.screen_x, self.screen_y, perf_counter()):
+            current_freq = float(ramps.freq[-1])
+            amp_ramp = ramps.amp32
+            # Engines render at unit amplitude and the ramp is applied to the mix
+            current_amp = 1.0
+            # Voices hold a latched pitch and the parallel workers render whole chunks at one pitch
+            if voices is None and (block.bank is None or isinstance(block.bank, HarmonicBank)):
+                self.pitch_sweep = ramps.sweep
+                if self.pitch_sweep is not None and block.bank is not None:
+                    block.bank.begin_chunk(block)
+
+        # Checked at the first chunk boundary an interval after the last check, so
+        # keys land on the same sample whatever the chunk size divides it into
+        if self._frames_since_key_check >= self.key_check_interval * self.sample_rate:
+            self._update_triggered_harmonics(current_freq, block, voices)
+            self._frames_since_key_check = 0
+        self._frames_since_key_check += frame_count
+        triggered = perf_counter_ns()
+
+        # The block's own engine: install_patch() swaps banks along with blocks
+        engine = voices if voices is not None else block.bank
+        if engine is not None:
+            rendering = engine.smooth(self, block, frame_count)
+            smoothed = perf_counter_ns()
+            mix = engine.synthesize(self, block, frame_count, current_amp) if rendering else None
+            synthesized = perf_counter_ns()
+
+            combined_wave, output = self._output_buffer(frame_count)
+            # The parallel engine's chunks keep the size they were queued with,
+            # which can differ from this one
+            if mix is not None:
+                count = min(len(mix), frame_count)
+                np.copyto(combined_wave[:count], mix[:count], casting='same_kind')
+                combined_wave[count:] = 0
+            else:
+                combined_wave[:] = 0
+            self._mix_fade(block, combined_wave, frame_count, current_amp)
+            if amp_ramp is not None:
+                combined_wave *= amp_ramp
+            self.display.publish(block, frame_count, self.sample_rate)
+            self.stats.record(status, frame_count, frame_count * 1e9 / self.sample_rate, triggered - start,
+                              smoothed - triggered, synthesized - smoothed, perf_counter_ns() - synthesized,
+                              engine.culled)
+            return (output, PA_CONTINUE)
 
-        combined_wave = np.zeros(frame_count, dtype=np.float32)
-        if self.harmonics:
-            total_amps = sum(h.initial_amp for h in self.harmonics) or 1
-            t = np.arange(frame_count) / self.sample_rate
+        combined_wave, output = self._output_buffer(frame_count)
+        # Summed in float64 and converted once: adding float64 waves into the float32 output allocates
+        mix = self._loop_scratch(frame_count)[3]
+        mix[:] = 0
+        smoothing_ns, synthesis_ns, culled = self._render_loop(block, frame_count, current_amp, mix)
+        np.copyto(combined_wave, mix, casting='same_kind')
+        self._mix_fade(block, combined_wave, frame_count, current_amp)
+        if amp_ramp is not None:
+            combined_wave *= amp_ramp
 
-            for harmonic in self.harmonics:
-                freq, envelope = self._process_harmonic(harmonic, frame_count)
+        self.display.publish(block, frame_count, self.sample_rate)
+        # Whatever the per-harmonic timers didn't cover is the output stage
+        elapsed = perf_counter_ns() - triggered
+        self.stats.record(status, frame_count, frame_count * 1e9 / self.sample_rate, triggered - start,
+                          smoothing_ns, synthesis_ns, elapsed - smoothing_ns - synthesis_ns, culled)
+        return (output, PA_CONTINUE)
+
+    def _control_ramps(self, frame_count):
+        ramps = self._ramps
+        if ramps is None or ramps.key != (frame_count, self.sample_rate):
+            ramps = self._ramps = ControlRamps(frame_count, self.sample_rate)
+        return ramps
+
+    def _loop_scratch(self, frame_count):
+        buffers = self._loop_buffers
+        if buffers is None or len(buffers[0]) != frame_count:
+            buffers = self._loop_buffers = (np.arange(frame_count) / self.sample_rate, np.empty(frame_count),
+                                            np.empty(frame_count), np.empty(frame_count))
+        return buffers
+
+    def _render_loop(self, block, frame_count, current_amp, out):
+        # The loop engine: every harmonic of `block` rendered one at a time and added to `out`.
+        # Returns (smoothing ns, synthesis ns, culled partials).
+        smoothing_ns = 0
+        synthesis_ns = 0
+        culled = 0
+        if block.rows:
+            total_amps = block.total_amp
+            t, envelope, sine_wave, _ = self._loop_scratch(frame_count)
+            duration = frame_count / self.sample_rate
+            sweep = self.pitch_sweep
+
+            threshold = block.active_threshold
+            for harmonic, _, initial_amp, amp_smoothing, pitch_smoothing, _ in block.rows:
+                if harmonic.target_amp < threshold and harmonic.current_amp < threshold:
+                    # Silent and not triggered: hold phase and frequency until the next trigger
+                    harmonic.current_amp = 0.0
+                    continue
+                before = perf_counter_ns()
+                glide_from = harmonic.current_freq
+                glide = self._process_harmonic(
+                    harmonic, frame_count,
+                    amp_smoothing if amp_smoothing > 0 else block.global_amp_smoothing,
+                    pitch_smoothing if pitch_smoothing > 0 else block.global_pitch_smoothing, envelope)
+                freq = harmonic.current_freq
+                smoothed = perf_counter_ns()
+                smoothing_ns += smoothed - before
+                # Glide from where the last chunk ended, unless the partial is only now fading in
+                start_freq = harmonic.start_freq
+                harmonic.start_freq = freq
+                band_gain = block.band.weight(freq)
+                if band_gain == 0:
+                    # Out of the audible band: the envelope moved on above, but nothing to synthesize.
+                    # Phase moves on too, so a partial gliding back in carries on where it would be.
+                    culled += 1
+                    cycles = (freq * duration if glide is None
+                              else glide_from * duration + (harmonic.target_freq - glide_from) * glide.glide_end)
+                    harmonic.phase = (harmonic.phase + 2 * np.pi * cycles) % (2 * np.pi)
+                    continue
                 phase = harmonic.phase
-                amp = current_amp * (harmonic.initial_amp / total_amps) * envelope
-                sine_wave = amp * np.sin(2 * np.pi * freq * t + phase)
-                combined_wave += sine_wave
-                harmonic.phase = (phase + 2 * np.pi * freq * frame_count / self.sample_rate) % (2 * np.pi)
+                fading_in = envelope[0] < threshold
+                envelope *= current_amp * (initial_amp * band_gain / total_amps)
+                if sweep is not None and not fading_in and start_freq > 0 and start_freq != freq:
+                    u, u_end = sweep
+                    delta = freq - start_freq
+                    self.oscillator.render(start_freq, phase, t, harmonic.target_freq, out=sine_wave,
+                                           sweep=(delta, u))
+                    cycles = start_freq * duration + delta * u_end
+                elif sweep is None and glide is not None:
+                    # Still gliding: follow the smoother sample by sample from where the chunk started
+                    delta = harmonic.target_freq - glide_from
+                    self.oscillator.render(glide_from, phase, t, harmonic.target_freq, out=sine_wave,
+                                           sweep=(delta, glide.glide))
+                    cycles = glide_from * duration + delta * glide.glide_end
+                else:
+                    self.oscillator.render(freq, phase, t, harmonic.target_freq, out=sine_wave)
+                    cycles = freq * duration
+                sine_wave *= envelope
+                out += sine_wave
+                harmonic.phase = (phase + 2 * np.pi * cycles) % (2 * np.pi)
+                synthesis_ns += perf_counter_ns() - smoothed
+        return smoothing_ns, synthesis_ns, culled
+
+    def _mix_fade(self, block, out, frame_count, current_amp):
+        # Render the outgoing patch of a crossfade and mix it under the new one in `out`
+        fade = self._fade
+        if fade is None or fade.block is None or block is fade.block:
+            return
+        if self._fade_output is None or len(self._fade_output) != frame_count:
+            self._fade_output = np.zeros(frame_count)
+        old = self._fade_output
+        bank = fade.block.bank
+        if bank is not None:
+            if self.pitch_sweep is not None:
+                bank.begin_chunk(fade.block)
+            if bank.smooth(self, fade.block, frame_count):
+                np.copyto(old, bank.synthesize(self, fade.block, frame_count, current_amp))
+            else:
+                old[:] = 0
+        else:
+            old[:] = 0
+            self._render_loop(fade.block, frame_count, current_amp, old)
+
+        # Equal-power curves: the two patches are unrelated, so their powers add
+        position = np.arange(fade.done, fade.done + frame_count) * (0.5 * np.pi / fade.frames)
+        np.minimum(position, 0.5 * np.pi, out=position)
+        out *= np.sin(position)
+        old *= np.cos(position)
+        out += old
+        fade.done += frame_count
+        if fade.done >= fade.frames:
+            # Let the old patch go; the fade itself is replaced by the next install
+            fade.block = None
+
+    def _build_triggers(self, harmonics, groups, index):
+        # Precompute key -> harmonic indices so the audio callback only reads the key table
+        triggers = []
+        for group in groups.values():
+            ids = self.key_state.combo_ids(group.trigger_key)
+            indices = tuple(idx for idx in (self._find_harmonic(harmonics, index, m) for m in group.harmonics)
+                            if idx != -1)
+            if ids and indices:
+                triggers.append((ids, indices))
+
+        individual = {}
+        for i, harmonic in enumerate(harmonics):
+            if harmonic.trigger_key and not harmonic.group:
+                ids = self.key_state.combo_ids(harmonic.trigger_key)
+                if ids:
+                    individual.setdefault(ids, []).append(i)
+        triggers.extend((ids, tuple(indices)) for ids, indices in individual.items())
 
-        return (combined_wave.tobytes(), pyaudio.paContinue)
+        return tuple(triggers)
+
+    def _update_triggered_harmonics(self, current_freq, block, voices=None):
+        key_state = self.key_state
+        pressed = [k for k, (ids, _) in enumerate(block.triggers) if key_state.is_pressed(ids)]
+
+        if voices is not None:
+            voices.update(block, pressed, current_freq)
+            return
+        if block.bank is not None:
+            block.bank.apply_triggers(block, pressed, current_freq)
+            return
 
-    def _update_triggered_harmonics(self, current_freq):
         triggered_harmonics = set()
+        for k in pressed:
+            triggered_harmonics.update(block.triggers[k][1])
 
-        # First check group keys
-        for group in self.groups.values():
-            if keyboard.is_pressed(group.trigger_key):
-                for mult in group.harmonics:
-                    idx = self._get_harmonic_index(mult)
-                    if idx != -1:
-                        harmonic = self.harmonics[idx]
-                        harmonic.target_amp = 1.0
-                        raw_freq = current_freq * harmonic.multiplier
-                        harmonic.target_freq = MusicUtils.snap_frequency(raw_freq) if harmonic.snap_enabled else raw_freq
-                        if harmonic.pitch_smoothing <= 0:
-                            harmonic.current_freq = harmonic.target_freq
-                        triggered_harmonics.add(idx)
-
-        # Then check individual harmonic keys
-        for i, harmonic in enumerate(self.harmonics):
-            if (harmonic.trigger_key and keyboard.is_pressed(harmonic.trigger_key) 
-                    and not harmonic.group):
+        # Snap every harmonic's pitch in one table lookup; only the snap-enabled ones use it
+        snapped = block.tuning.snap(block.multiplier * current_freq).tolist() if block.snap_enabled.any() else None
+        for i, (harmonic, multiplier, _, _, pitch_smoothing, snap_enabled) in enumerate(block.rows):
+            if i in triggered_harmonics:
                 harmonic.target_amp = 1.0
-                raw_freq = current_freq * harmonic.multiplier
-                harmonic.target_freq = MusicUtils.snap_frequency(raw_freq) if harmonic.snap_enabled else raw_freq
-                if harmonic.pitch_smoothing <= 0:
+                harmonic.target_freq = snapped[i] if snap_enabled else current_freq * multiplier
+                if pitch_smoothing <= 0:
                     harmonic.current_freq = harmonic.target_freq
-                triggered_harmonics.add(i)
-
-        # Turn off harmonics that aren't being triggered
-        for i, harmonic in enumerate(self.harmonics):
-            if i not in triggered_harmonics:
+            else:
+                # Turn off harmonics that aren't being triggered
                 harmonic.target_amp = 0.0
 
-    def _process_harmonic(self, harmonic, frame_count):
-        # Handle frequency smoothing
-        pitch_smoothing = harmonic.pitch_smoothing if harmonic.pitch_smoothing > 0 else self.global_pitch_smoothing
+    def _process_harmonic(self, harmonic, frame_count, amp_smoothing, pitch_smoothing, envelope):
+        # Smoothing values arrive with the global fallback already applied.
+        # Fills `envelope` with this chunk's amplitude curve and leaves current_freq where the
+        # chunk ends. Returns the pitch kernel while the frequency glides, None while it holds.
+        # Both move by their per-sample decay for every sample of the chunk, so glides take
+        # as long at any chunk size.
+        glide = None
         if pitch_smoothing > 0:
-            freq_tau = pitch_smoothing / 1000
-            freq_decay = np.exp(-1 / (freq_tau * self.sample_rate))
-            harmonic.current_freq = (harmonic.current_freq * freq_decay + 
-                                    harmonic.target_freq * (1 - freq_decay))
+            kernel = self.envelope_cache.get(pitch_smoothing, self.sample_rate, frame_count)
+            target_freq = harmonic.target_freq
+            if harmonic.current_freq != target_freq:
+                harmonic.current_freq = target_freq + (harmonic.current_freq - target_freq) * kernel.curve[-1]
+                glide = kernel
         else:
             harmonic.current_freq = harmonic.target_freq
-        
-        freq = harmonic.current_freq
-        
+
         # Handle amplitude smoothing
-        amp_smoothing = harmonic.amp_smoothing if harmonic.amp_smoothing > 0 else self.global_amp_smoothing
         if amp_smoothing > 0:
-            amp_tau = amp_smoothing / 1000
-            amp_decay = np.exp(-1 / (amp_tau * self.sample_rate))
-            steps = np.arange(frame_count)
-            envelope = (harmonic.current_amp * (amp_decay ** steps) + 
-                       harmonic.target_amp * (1 - amp_decay ** steps))
-            harmonic.current_amp = envelope[-1]
+            decay_curve = self.envelope_cache.get(amp_smoothing, self.sample_rate, frame_count).curve
+            target_amp = harmonic.target_amp
+            np.multiply(decay_curve, harmonic.current_amp - target_amp, out=envelope)
+            envelope += target_amp
+            harmonic.current_amp = float(envelope[-1])
         else:
-            envelope = np.full(frame_count, harmonic.target_amp, dtype=np.float32)
+            envelope.fill(harmonic.target_amp)
             harmonic.current_amp = harmonic.target_amp
-        
-        return freq, envelope
\ No newline at end of file
+        return glide
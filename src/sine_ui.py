@@ -1,22 +1,48 @@
+import os
+import time
 import tkinter as tk
-from tkinter import ttk, simpledialog, messagebox
-import pyaudio
-import keyboard
-from pynput import mouse
+from tkinter import ttk, simpledialog, messagebox, filedialog
 from harmonic_control import HarmonicControl
 from group_header import GroupHeader
-from config_manager import ConfigManager
+from status_panel import StatusPanel
+from config_manager import ConfigManager, CONFIG_FILETYPES
+from preset_bank import PresetBank
 from utils import MusicUtils
+from voices import VoicePool
+from tuning import TUNINGS
 
 class HarmonicsContainer(ttk.Frame):
+    """Virtualized, scrollable list of group headers and harmonic rows.
+
+    reconcile() flattens the generator's harmonics and groups into row
+    descriptions. Only rows in view, plus OVERSCAN on either side, get
+    widgets: canvas windows placed at a fixed row pitch and recycled from a
+    pool as the view scrolls, so the widget count stays flat however long
+    the patch is. A collapsed group contributes only its header.
+    """
+    OVERSCAN = 5
+    # Row pitch until a HarmonicControl has been measured
+    DEFAULT_ROW_HEIGHT = 32
+
     def __init__(self, parent, generator):
         super().__init__(parent)
         self.generator = generator
-        self.group_frames = {}
+        # (kind, key, section, indent) per row, top to bottom; key is the Harmonic or group
+        # name, section the group a harmonic row is listed under (a harmonic can be in several)
+        self.rows = []
+        # (kind, key, section) -> widget for the rows that currently have one
+        self.shown = {}
+        self.collapsed = set()
+        self._pool = {'control': [], 'header': [], 'label': []}
+        self._items = {}
+        self._row_height = None
+        self._region = None
+        self._group_names = ()
         
         self._setup_styles()
         self._setup_scrollable_area()
-        self.rebuild_ui()
+        self._add_window(ttk.Label(self.canvas, text="Ungrouped Harmonics", font=('Helvetica', 10, 'bold')), 'label')
+        self.reconcile()
 
     def _setup_styles(self):
         style = ttk.Style()
@@ -26,66 +52,127 @@ class HarmonicsContainer(ttk.Frame):
     def _setup_scrollable_area(self):
         self.canvas = tk.Canvas(self)
         self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.canvas.yview)
-        self.canvas.configure(yscrollcommand=self.scrollbar.set)
+        self.canvas.configure(yscrollcommand=self._on_scroll)
         
         self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        self.inner_frame = ttk.Frame(self.canvas)
-        self.canvas.create_window((0, 0), window=self.inner_frame, anchor="nw")
-        self.inner_frame.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
+        self.canvas.bind("<Configure>", lambda e: self._render())
 
-    def rebuild_ui(self):
-        for widget in self.inner_frame.winfo_children():
-            widget.destroy()
-        
-        self.group_frames = {}
-        
-        # Show ungrouped harmonics first
-        ungrouped = [h.multiplier for h in self.generator.harmonics 
-                    if not h.group]
-        
+    def _on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self._render()
+
+    def reconcile(self):
+        """Rebuild the row list from the generator and refresh the rows in view"""
+        generator = self.generator
+        group_names = tuple(generator.groups)
+        groups_changed = group_names != self._group_names
+        self._group_names = group_names
+        self.collapsed &= set(group_names)
+
+        rows = []
+        ungrouped = [h for h in generator.harmonics if not h.group]
         if ungrouped:
-            ttk.Label(self.inner_frame, text="Ungrouped Harmonics", font=('Helvetica', 10, 'bold')).pack(fill=tk.X, pady=(5,0))
-            for mult in ungrouped:
-                control = HarmonicControl(self.inner_frame, self.generator, mult, 
-                                        on_remove=self._on_harmonic_removed)
-                control.pack(fill=tk.X, pady=2, padx=10)
-        
-        # Then show groups
-        for group_name in self.generator.groups:
-            self._add_group_ui(group_name)
-        
-        self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+            rows.append(('label', None, None, 5))
+            rows.extend(('control', h, None, 10) for h in ungrouped)
+        for name, group in generator.groups.items():
+            rows.append(('header', name, None, 5))
+            if name in self.collapsed:
+                continue
+            for mult in group.harmonics:
+                idx = generator._get_harmonic_index(mult)
+                if idx != -1:
+                    rows.append(('control', generator.harmonics[idx], name, 25))
+        self.rows = rows
 
-    def _add_group_ui(self, group_name):
-        group_container = ttk.Frame(self.inner_frame)
-        group_container.pack(fill=tk.X, pady=(10,0))
-        self.group_frames[group_name] = group_container
-        
-        header = GroupHeader(
-            group_container,
-            self.generator, 
-            group_name,
-            on_edit=self._on_group_edit,
-            on_copy=self._on_group_copy,
-            on_remove=self._on_group_remove
-        )
-        header.pack(fill=tk.X, padx=5, pady=5)
-        
-        harmonics_frame = ttk.Frame(group_container)
-        harmonics_frame.pack(fill=tk.X, padx=20)
-        
-        for mult in self.generator.groups[group_name].harmonics:
-            idx = self.generator._get_harmonic_index(mult)
-            if idx != -1:
-                control = HarmonicControl(harmonics_frame, self.generator, mult, 
-                                        on_remove=self._on_harmonic_removed)
-                control.pack(fill=tk.X, pady=2)
-                control.update_display()
+        for (kind, key, _), widget in self.shown.items():
+            if kind == 'control':
+                widget.sync(key, groups_changed)
+            elif kind == 'header' and key in generator.groups:
+                widget.bind_group(key, key not in self.collapsed)
+        self._render()
+
+    def visible_controls(self):
+        return [widget for (kind, _, _), widget in self.shown.items() if kind == 'control']
+
+    def _render(self):
+        # Give widgets to the rows in view and hand the rest back to the pool
+        height = self._pitch()
+        top = self.canvas.canvasy(0)
+        first = max(int(top // height) - self.OVERSCAN, 0)
+        last = min(int((top + self.canvas.winfo_height()) // height) + 1 + self.OVERSCAN, len(self.rows))
+        wanted = {(kind, key, section): (i, indent) for i, (kind, key, section, indent) in
+                  zip(range(first, last), self.rows[first:last])}
+
+        for row in [row for row in self.shown if row not in wanted]:
+            widget = self.shown.pop(row)
+            self.canvas.itemconfigure(self._items[widget], state='hidden')
+            self._pool[row[0]].append(widget)
+
+        width = self.canvas.winfo_width()
+        for row, (i, indent) in wanted.items():
+            widget = self.shown.get(row)
+            if widget is None:
+                widget = self._take(row[0], row[1])
+                self.shown[row] = widget
+            item = self._items[widget]
+            self.canvas.coords(item, indent, i * height)
+            self.canvas.itemconfigure(item, width=max(width - indent - 5, 1), state='normal')
+        # Reconfiguring the canvas schedules another yscrollcommand, so only do it on a change
+        region = (0, 0, width, len(self.rows) * height)
+        if region != self._region:
+            self._region = region
+            self.canvas.configure(scrollregion=region)
+
+    def _take(self, kind, key):
+        # A pooled widget rebound to this row, or a new one when the pool is empty
+        pool = self._pool[kind]
+        if kind == 'control':
+            if pool:
+                control = pool.pop()
+                control.sync(key, True)
+                return control
+            return self._add_window(HarmonicControl(self.canvas, self.generator, key.multiplier,
+                                                    on_remove=self._on_harmonic_removed,
+                                                    on_change=self.reconcile))
+        if kind == 'header':
+            if pool:
+                header = pool.pop()
+                header.bind_group(key, key not in self.collapsed)
+                return header
+            return self._add_window(GroupHeader(
+                self.canvas,
+                self.generator,
+                key,
+                on_edit=self._on_group_edit,
+                on_copy=self._on_group_copy,
+                on_remove=self._on_group_remove,
+                on_toggle=self._on_group_toggle
+            ))
+        return pool.pop()
+
+    def _add_window(self, widget, pool=None):
+        self._items[widget] = self.canvas.create_window(0, 0, window=widget, anchor='nw', state='hidden')
+        if pool:
+            self._pool[pool].append(widget)
+        return widget
+
+    def _pitch(self):
+        # Every row gets the height of a HarmonicControl, measured once one exists
+        if self._row_height is None:
+            controls = self._pool['control'] + self.visible_controls()
+            if not controls:
+                return self.DEFAULT_ROW_HEIGHT
+            controls[0].update_idletasks()
+            self._row_height = controls[0].winfo_reqheight() + 4
+        return self._row_height
 
     def _on_harmonic_removed(self, multiplier):
-        self.rebuild_ui()
+        self.reconcile()
+
+    def _on_group_toggle(self, group_name):
+        self.collapsed ^= {group_name}
+        self.reconcile()
 
     def _on_group_edit(self, group_name):
         new_key = simpledialog.askstring(
@@ -95,7 +182,7 @@ class HarmonicsContainer(ttk.Frame):
         )
         if new_key:
             self.generator.set_group_key(group_name, new_key)
-            self.rebuild_ui()
+            self.reconcile()
 
     def _on_group_copy(self, group_name):
         new_name = simpledialog.askstring(
@@ -106,52 +193,66 @@ class HarmonicsContainer(ttk.Frame):
         if new_name:
             try:
                 original_group = self.generator.groups[group_name]
-                self.generator.create_group(new_name, original_group.trigger_key)
+                with self.generator.batch_update():
+                    self.generator.create_group(new_name, original_group.trigger_key)
                 
-                for mult in original_group.harmonics:
-                    idx = self.generator._get_harmonic_index(mult)
-                    if idx != -1:
-                        harmonic = self.generator.harmonics[idx]
-                        new_mult = self._find_unique_multiplier(mult)
+                    for mult in original_group.harmonics:
+                        idx = self.generator._get_harmonic_index(mult)
+                        if idx != -1:
+                            harmonic = self.generator.harmonics[idx]
+                            new_mult = self._find_unique_multiplier(mult)
                         
-                        self.generator.add_harmonic(
-                            multiplier=new_mult,
-                            initial_amp=harmonic.initial_amp,
-                            amp_smoothing=harmonic.amp_smoothing,
-                            pitch_smoothing=harmonic.pitch_smoothing,
-                            trigger_key=harmonic.trigger_key
-                        )
+                            self.generator.add_harmonic(
+                                multiplier=new_mult,
+                                initial_amp=harmonic.initial_amp,
+                                amp_smoothing=harmonic.amp_smoothing,
+                                pitch_smoothing=harmonic.pitch_smoothing,
+                                trigger_key=harmonic.trigger_key
+                            )
                         
-                        new_idx = self.generator._get_harmonic_index(new_mult)
-                        self.generator.harmonics[new_idx].snap_enabled = harmonic.snap_enabled
-                        self.generator.assign_to_group(new_mult, new_name)
-                
-                self.rebuild_ui()
+                            new_idx = self.generator._get_harmonic_index(new_mult)
+                            self.generator.harmonics[new_idx].snap_enabled = harmonic.snap_enabled
+                            self.generator.assign_to_group(new_mult, new_name)
+
+                self.reconcile()
                 messagebox.showinfo("Success", f"Group '{group_name}' copied to '{new_name}' with new harmonics")
             except Exception as e:
                 messagebox.showerror("Error", str(e))
 
     def _find_unique_multiplier(self, base_mult):
         new_mult = base_mult + 0.1
-        while any(abs(h.multiplier - new_mult) < 0.0001 for h in self.generator.harmonics):
+        while self.generator._get_harmonic_index(new_mult) != -1:
             new_mult += 0.1
         return new_mult
 
     def _on_group_remove(self, group_name):
         self.generator.remove_group(group_name)
-        self.rebuild_ui()
+        self.reconcile()
 
 class ControlUI(tk.Tk):
-    def __init__(self, generator):
+    # Bounds for the display refresh interval, which otherwise follows its own cost
+    REFRESH_MIN_MS = 50
+    REFRESH_MAX_MS = 500
+    # Preset hotkeys are checked this often
+    PRESET_POLL_MS = 20
+
+    def __init__(self, generator, startup=None):
         super().__init__()
         self.generator = generator
+        # StartupTimer from main(); stages are marked until the first chunk is rendered
+        self.startup = startup
         self.generator.screen_x = self.winfo_screenwidth()
         self.generator.screen_y = self.winfo_screenheight()
         
         self._setup_window()
         self._setup_ui()
+        self._mark_startup('window')
         self._setup_audio()
+        self._mark_startup('audio stream')
         self._setup_updater()
+        self._setup_presets()
+        if self.startup is not None:
+            self._wait_for_first_chunk()
 
     def _setup_window(self):
         self.title("Theremin")
@@ -167,6 +268,7 @@ class ControlUI(tk.Tk):
         self._setup_global_controls()
         self._setup_config_buttons()
         self._setup_frequency_controls()
+        self._setup_status_panel()
 
     def _setup_harmonic_entry(self):
         ttk.Label(self.main_frame, text="Multiplier").pack(pady=5)
@@ -211,9 +313,48 @@ class ControlUI(tk.Tk):
             from_=0,
             to=1000,
             value=self.generator.global_amp_smoothing,
-            command=lambda v: setattr(self.generator, 'global_amp_smoothing', float(v)))
+            command=self._on_global_smoothing_change)
         self.global_smoothing.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
 
+        # 0 voices: one note follows the mouse; otherwise each trigger latches its own pitch
+        voices = self.generator.voices
+        self.voices_var = tk.IntVar(value=voices.voices if voices else 0)
+        self.steal_var = tk.StringVar(value=voices.steal if voices else 'oldest')
+        ttk.Label(global_controls, text="Voices:").pack(side=tk.LEFT)
+        ttk.Spinbox(
+            global_controls,
+            from_=0,
+            to=64,
+            width=4,
+            textvariable=self.voices_var,
+            command=self._on_polyphony_change
+        ).pack(side=tk.LEFT, padx=5)
+        ttk.Combobox(
+            global_controls,
+            values=VoicePool.STEAL_POLICIES,
+            width=9,
+            state='readonly',
+            textvariable=self.steal_var
+        ).pack(side=tk.LEFT, padx=5)
+        self.steal_var.trace_add('write', lambda *args: self._on_polyphony_change())
+
+    def _on_global_smoothing_change(self, value):
+        self.generator.update_settings(global_amp_smoothing=float(value))
+
+    def _on_polyphony_change(self):
+        try:
+            self.generator.set_polyphony(self.voices_var.get(), steal=self.steal_var.get())
+        except (tk.TclError, ValueError):
+            pass
+
+    def _on_config_loaded(self):
+        self.harmonics_container.reconcile()
+        voices = self.generator.voices
+        self.voices_var.set(voices.voices if voices else 0)
+        if voices:
+            self.steal_var.set(voices.steal)
+        self.tuning_var.set(self.generator.tuning_name)
+
     def _setup_config_buttons(self):
         config_btn_frame = ttk.Frame(self.main_frame)
         config_btn_frame.pack(fill=tk.X, pady=5)
@@ -227,10 +368,53 @@ class ControlUI(tk.Tk):
         ttk.Button(
             config_btn_frame, 
             text="Load Config", 
-            command=lambda: ConfigManager.load_config(self.generator, self, 
-                                                     self.harmonics_container.rebuild_ui)
+            command=lambda: ConfigManager.load_config(self.generator, self, self._on_config_loaded)
         ).pack(side=tk.LEFT, padx=5)
 
+        ttk.Button(config_btn_frame, text="Add Preset", command=self._add_preset).pack(side=tk.LEFT, padx=5)
+        self.presets_var = tk.StringVar(value="No presets")
+        ttk.Label(config_btn_frame, textvariable=self.presets_var).pack(side=tk.LEFT, padx=5)
+
+    def _setup_presets(self):
+        # Preloaded configs, switched by hotkey; files edited on disk are picked up in the background
+        self.presets = PresetBank(self.generator)
+        self._current_preset = None
+        self.presets.watch()
+        self._poll_presets()
+
+    def _add_preset(self):
+        filepath = filedialog.askopenfilename(parent=self, filetypes=CONFIG_FILETYPES, title='Add preset')
+        if not filepath:
+            return
+        hotkey = simpledialog.askstring("Preset", "Hotkey to switch to this preset (e.g. f1):", parent=self)
+        if hotkey is None:
+            return
+        name = os.path.splitext(os.path.basename(filepath))[0]
+        try:
+            self.presets.add(name, filepath, hotkey.strip() or None)
+        except Exception as e:
+            messagebox.showerror("Error", f"Failed to load preset:\n{str(e)}")
+            return
+        self._show_presets()
+
+    def _show_presets(self, current=None):
+        if current is not None:
+            self._current_preset = current
+        names = [f"[{name}]" if name == self._current_preset else name
+                 for name in self.presets.presets]
+        self.presets_var.set(" ".join(names) if names else "No presets")
+
+    def _poll_presets(self):
+        selected = self.presets.poll()
+        if selected is not None:
+            self._on_config_loaded()
+            self._show_presets(selected)
+        errors = self.presets.errors
+        while errors:
+            name, error = errors.popleft()
+            messagebox.showerror("Error", f"Failed to reload preset '{name}':\n{str(error)}", parent=self)
+        self.after(self.PRESET_POLL_MS, self._poll_presets)
+
     def _setup_frequency_controls(self):
         self.min_freq_var = tk.StringVar()
         self.max_freq_var = tk.StringVar()
@@ -272,6 +456,39 @@ class ControlUI(tk.Tk):
         ttk.Label(freq_frame, textvariable=self.max_freq_var, width=8).pack(side=tk.LEFT)
         self.max_freq_var.set(f"{MusicUtils.snap_to_c(self.generator.max_freq):.1f} Hz")
 
+        ttk.Label(freq_frame, text="Tuning:").pack(side=tk.LEFT, padx=(10, 0))
+        self.tuning_var = tk.StringVar(value=self.generator.tuning_name)
+        tuning_box = ttk.Combobox(
+            freq_frame,
+            values=tuple(TUNINGS),
+            width=10,
+            state='readonly',
+            textvariable=self.tuning_var
+        )
+        tuning_box.pack(side=tk.LEFT, padx=5)
+        tuning_box.bind('<<ComboboxSelected>>', lambda e: self._set_tuning(self.tuning_var.get()))
+        ttk.Button(freq_frame, text="Load .scl", command=self._load_scala).pack(side=tk.LEFT)
+
+    def _set_tuning(self, name):
+        try:
+            self.generator.set_tuning(name)
+        except (OSError, ValueError) as e:
+            messagebox.showerror("Error", f"Failed to load tuning:\n{str(e)}")
+        self.tuning_var.set(self.generator.tuning_name)
+
+    def _load_scala(self):
+        filepath = filedialog.askopenfilename(
+            parent=self,
+            filetypes=[('Scala scale files', '*.scl')],
+            title='Load tuning'
+        )
+        if filepath:
+            self._set_tuning(filepath)
+
+    def _setup_status_panel(self):
+        self.status_panel = StatusPanel(self.main_frame, self.generator)
+        self.status_panel.pack(fill=tk.X, pady=5)
+
     def _create_group(self):
         group_name = self.group_name_entry.get().strip()
         trigger_key = self.group_key_entry.get().strip()
@@ -282,7 +499,7 @@ class ControlUI(tk.Tk):
         
         try:
             self.generator.create_group(group_name, trigger_key)
-            self.harmonics_container.rebuild_ui()
+            self.harmonics_container.reconcile()
             self.group_name_entry.delete(0, tk.END)
             self.group_key_entry.delete(0, tk.END)
         except Exception as e:
@@ -291,9 +508,9 @@ class ControlUI(tk.Tk):
     def _add_harmonic(self, event=None):
         try:
             mult = float(self.harmonic_entry.get())
-            if mult not in [h.multiplier for h in self.generator.harmonics]:
+            if self.generator._get_harmonic_index(mult, exact=True) == -1:
                 self.generator.add_harmonic(mult)
-                self.harmonics_container.rebuild_ui()
+                self.harmonics_container.reconcile()
                 self.harmonic_entry.delete(0, tk.END)
         except ValueError:
             pass
@@ -304,7 +521,7 @@ class ControlUI(tk.Tk):
         snapped_freq = MusicUtils.snap_to_c(freq)
         
         if abs(self.generator.min_freq - snapped_freq) > 0.1:
-            self.generator.min_freq = snapped_freq
+            self.generator.update_settings(min_freq=snapped_freq)
             self.min_freq_var.set(f"{snapped_freq:.1f} Hz")
             
             # Update slider position to snapped value
@@ -320,7 +537,7 @@ class ControlUI(tk.Tk):
         snapped_freq = MusicUtils.snap_to_c(freq)
         
         if abs(self.generator.max_freq - snapped_freq) > 0.1:
-            self.generator.max_freq = snapped_freq
+            self.generator.update_settings(max_freq=snapped_freq)
             self.max_freq_var.set(f"{snapped_freq:.1f} Hz")
             
             # Update slider position to snapped value
@@ -330,13 +547,33 @@ class ControlUI(tk.Tk):
                 snapped_freq, self.min_freq_bound, self.max_freq_bound))
             self.max_freq.config(command=original_cmd)
 
+    def _mark_startup(self, stage):
+        if self.startup is not None:
+            self.startup.mark(stage)
+
+    def _wait_for_first_chunk(self):
+        if int(self.generator.stats.counters[0]) == 0:
+            self.after(5, self._wait_for_first_chunk)
+            return
+        self._mark_startup('first chunk')
+        print(self.startup.report())
+
     def _setup_audio(self):
+        # The input listener and audio backend load here, not at import time
+        import pyaudio
+        from pynput import mouse
+
+        # Every event is timestamped into the generator's ring; the callback ramps between them
+        mouse_input = self.generator.mouse
+
         def on_move(x, y):
             self.generator.mouse_x = x
             self.generator.mouse_y = y
+            mouse_input.push(x, y)
 
         self.mouse_listener = mouse.Listener(on_move=on_move)
         self.mouse_listener.start()
+        self.generator.key_state.start()
         
         self.pa = pyaudio.PyAudio()
         self.stream = self.pa.open(
@@ -350,24 +587,53 @@ class ControlUI(tk.Tk):
         self.stream.start_stream()
 
     def _setup_updater(self):
-        def update_all():
-            # Find all HarmonicControl widgets in the UI
-            def find_harmonic_controls(widget):
-                controls = []
-                for child in widget.winfo_children():
-                    if isinstance(child, HarmonicControl):
-                        controls.append(child)
-                    else:
-                        controls.extend(find_harmonic_controls(child))
-                return controls
-            
-            controls = find_harmonic_controls(self.harmonics_container.inner_frame)
-            for control in controls:
-                control.update_display()
-                
-            self.after(100, update_all)
-        
-        update_all()
+        self._refresh_job = None
+        self._refresh_harmonics = None
+        self._refresh_rows = {}
+        self._refresh_tuning = None
+        # Nothing is drawn while the window is minimized, so stop refreshing
+        self.bind('<Unmap>', lambda e: e.widget is self and self._pause_refresh())
+        self.bind('<Map>', lambda e: e.widget is self and self._schedule_refresh(0))
+        self._schedule_refresh(0)
+
+    def _schedule_refresh(self, delay_ms):
+        self._pause_refresh()
+        self._refresh_job = self.after(delay_ms, self._refresh_display)
+
+    def _pause_refresh(self):
+        if self._refresh_job is not None:
+            self.after_cancel(self._refresh_job)
+            self._refresh_job = None
+
+    def _refresh_display(self):
+        """Update the readouts of visible rows from the audio thread's latest frequencies"""
+        start = time.perf_counter()
+        harmonics, freqs = self.generator.display.latest
+        if harmonics is not self._refresh_harmonics:
+            self._refresh_harmonics = harmonics
+            self._refresh_rows = {h: i for i, h in enumerate(harmonics)}
+        tuning = self.generator.tuning
+        retune = tuning is not self._refresh_tuning
+        self._refresh_tuning = tuning
+
+        changed = []
+        for control in self.harmonics_container.visible_controls():
+            row = self._refresh_rows.get(control.harmonic)
+            if row is None:
+                # Not in a published block yet
+                continue
+            freq = float(freqs[row])
+            text = f"{freq:.1f} Hz"
+            if retune or text != control.freq_text:
+                changed.append((control, freq, text))
+        # Name every changed frequency with one table lookup
+        labels = tuning.labels([freq for _, freq, _ in changed])
+        for (control, _, text), label in zip(changed, labels):
+            control.show_frequency(text, label)
+
+        # Keep the refresh to about a tenth of the UI thread's time
+        elapsed_ms = (time.perf_counter() - start) * 1e3
+        self._schedule_refresh(int(min(max(10 * elapsed_ms, self.REFRESH_MIN_MS), self.REFRESH_MAX_MS)))
 
     def on_closing(self):
         if hasattr(self, 'stream'):
@@ -377,4 +643,8 @@ class ControlUI(tk.Tk):
             self.pa.terminate()
         if hasattr(self, 'mouse_listener'):
             self.mouse_listener.stop()
+        self.generator.key_state.stop()
+        if hasattr(self, 'presets'):
+            self.presets.stop()
+        self.generator.close()
         self.destroy()
\ No newline at end of file
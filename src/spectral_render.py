@@ -0,0 +1,142 @@
+import numpy as np
+
+# Active partial count from which the bank engine renders spectrally. There is no automatic
+# switch: the spectral mix is only close while partials hold their pitch (see
+# SpectralRenderer), and where the time domain stops winning depends on the machine's np.sin
+# as much as on the chunk size. To opt in, pick a count for your chunk size from the p99
+# timings of benchmark.measure_crossover() and set it with
+# SineGen.update_settings(spectral_crossover=...).
+SPECTRAL_CROSSOVER = float('inf')
+
+class SpectralRenderer:
+    """Inverse-FFT additive synthesis with windowed overlap-add.
+
+    Each frame's spectrum is built by stamping every partial's window
+    transform, `lobe_bins` bins wide, at the partial's fractional bin and
+    scaling it by the partial's complex amplitude. One inverse real FFT then
+    gives the sum of all the windowed partials. Periodic Hann frames at 50%
+    overlap add back to the plain sum, so a frame costs
+    O(partials * lobe_bins + frame_size log frame_size) instead of
+    O(partials * frame_size).
+
+    Each frame holds every partial at the frequency its chunk ends at, with
+    phase derived from the chunk-start phase; the time-domain path glides
+    sample by sample instead. Amplitude follows the same exponential
+    envelope, sampled at the frame centre.
+
+    The result approximates the time-domain mix. With every partial holding
+    its pitch it stays within about 0.1% relative RMS. A frame keeps the
+    frequency of the chunk it was built in for all the chunks it spans, so
+    gliding partials and envelopes still moving are off by much more,
+    worst at chunks well below the frame size.
+    """
+    _lobes = {}
+
+    def __init__(self, frame_size=512, lobe_bins=16, oversampling=512):
+        if frame_size < 16 or frame_size % 2:
+            raise ValueError("Frame size must be an even number of at least 16 samples")
+        if not 4 <= lobe_bins <= frame_size // 2:
+            raise ValueError("Lobe width must be between 4 bins and half the frame size")
+        self.frame_size = int(frame_size)
+        self.hop = self.frame_size // 2
+        self.lobe_bins = int(lobe_bins)
+        self.oversampling = int(oversampling)
+        self.lobe = self._get_lobe(self.frame_size, self.lobe_bins, self.oversampling)
+        # Lobe bins relative to the bin just below each partial
+        self._bin_offsets = np.arange(self.lobe_bins) - self.lobe_bins // 2 + 1
+        self._tail = np.zeros(self.frame_size)
+        self._buffer = None
+        self.restart()
+
+    @classmethod
+    def _get_lobe(cls, frame_size, lobe_bins, oversampling):
+        # Window transform W(k - b) for each lobe bin k, tabulated over
+        # `oversampling` + 1 sub-bin offsets of the partial b; shared by every instance
+        key = (frame_size, lobe_bins, oversampling)
+        if key not in cls._lobes:
+            n = np.arange(frame_size)
+            window = 0.5 - 0.5 * np.cos(2 * np.pi * n / frame_size)
+            fractions = np.arange(oversampling + 1) / oversampling
+            offsets = np.arange(lobe_bins) - lobe_bins // 2 + 1
+            nu = offsets[None, :] - fractions[:, None]
+            lobe = np.exp(-2j * np.pi * nu[..., None] * n / frame_size) @ window
+            lobe.flags.writeable = False
+            cls._lobes[key] = lobe
+        return cls._lobes[key]
+
+    def restart(self):
+        """Forget the overlap-add history; the next chunk starts a fresh stream"""
+        self._tail[:] = 0
+        # Frames that would have started before the first chunk still overlap it
+        self._next = self.hop - self.frame_size
+
+    def render(self, freq, phase, current_amp, target_amp, decay, gain, frame_count, sample_rate):
+        """Mix one chunk of partials; returns a float64 array of `frame_count` samples.
+
+        All arguments but the last two are per-partial columns: `phase` is the
+        phase at the chunk start, amplitudes move from `current_amp` toward
+        `target_amp` by `decay` per sample, and `gain` scales the result.
+        Partial state is left for the caller to advance.
+        """
+        size = self.frame_size
+        starts = np.arange(self._next, frame_count, self.hop)
+        self._next = (int(starts[-1]) + self.hop if len(starts) else self._next) - frame_count
+        waves = ()
+        if len(starts):
+            waves = self._frames(starts, freq, phase, current_amp, target_amp, decay, gain, sample_rate)
+
+        buffer = self._work_buffer(frame_count)
+        buffer[:size] = self._tail
+        buffer[size:] = 0
+        for start, wave in zip(starts.tolist(), waves):
+            # Frames started before this chunk only contribute their remainder
+            first = max(start, 0)
+            buffer[first:start + size] += wave[first - start:]
+        self._tail[:] = buffer[frame_count:frame_count + size]
+        return buffer[:frame_count]
+
+    def _frames(self, starts, freq, phase, current_amp, target_amp, decay, gain, sample_rate):
+        # One windowed frame per start offset, as rows of a (frames, frame_size) array
+        size = self.frame_size
+        half = size // 2 + 1
+
+        # Window transforms for every partial, interpolated between tabulated sub-bin offsets
+        position = freq * (size / sample_rate)
+        below = np.floor(position)
+        sub = (position - below) * self.oversampling
+        step = np.minimum(sub.astype(np.intp), self.oversampling - 1)
+        sub -= step
+        lobes = self.lobe[step] * (1 - sub)[:, None] + self.lobe[step + 1] * sub[:, None]
+
+        # Bins below 0 or above Nyquist fold back onto the real spectrum as conjugates
+        bins = (below.astype(np.intp)[:, None] + self._bin_offsets) % size
+        mirrored = bins > size // 2
+        bins[mirrored] = size - bins[mirrored]
+        conj = np.where(mirrored, -1.0, 1.0)
+        # DC and Nyquist have no mirror partner; irfft reads only their real part
+        lobes[(bins == 0) | (bins == size // 2)] *= 2
+
+        # Complex amplitude of every partial in every frame: amplitude at the frame
+        # centre, phase at the frame start, shifted a quarter turn so cos becomes sin
+        centres = starts + size // 2
+        # Sample k of the chunk has taken k + 1 steps of the envelope; see EnvelopeKernel
+        power = decay[None, :] ** (centres[:, None] + 1)
+        power[:, decay == 0] = 0
+        amps = target_amp + (current_amp - target_amp) * power
+        amps *= 0.5 * gain
+        angles = phase + np.outer(starts, freq * (2 * np.pi / sample_rate)) - np.pi / 2
+        coeffs = amps * np.exp(1j * angles)
+
+        frames = len(starts)
+        weights = coeffs[:, :, None] * lobes[None]
+        weights.imag *= conj
+        weights = weights.ravel()
+        flat = ((np.arange(frames) * half)[:, None, None] + bins[None]).ravel()
+        spectrum = np.bincount(flat, weights.real, frames * half).astype(np.complex128)
+        spectrum.imag = np.bincount(flat, weights.imag, frames * half)
+        return np.fft.irfft(spectrum.reshape(frames, half), n=size, axis=1)
+
+    def _work_buffer(self, frame_count):
+        if self._buffer is None or len(self._buffer) != frame_count + self.frame_size:
+            self._buffer = np.zeros(frame_count + self.frame_size)
+        return self._buffer
@@ -0,0 +1,50 @@
+import tkinter as tk
+from tkinter import ttk, filedialog, messagebox
+
+class StatusPanel(ttk.Frame):
+    """Audio callback health: stage timings, deadline misses and PortAudio status flags"""
+    REFRESH_MS = 500
+
+    def __init__(self, parent, generator):
+        super().__init__(parent)
+        self.generator = generator
+        self.stages_var = tk.StringVar()
+        self.counters_var = tk.StringVar()
+
+        self._setup_ui()
+        self._refresh()
+
+    def _setup_ui(self):
+        ttk.Label(self, text="Audio:", font=('Helvetica', 10, 'bold')).pack(side=tk.LEFT, padx=(5, 0))
+        ttk.Label(self, textvariable=self.stages_var).pack(side=tk.LEFT, padx=5)
+        ttk.Label(self, textvariable=self.counters_var).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(self, text="Export Stats", command=self._export).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(self, text="Reset", command=self.generator.stats.reset).pack(side=tk.RIGHT)
+
+    def _refresh(self):
+        stats = self.generator.stats.snapshot()
+        stages = stats['stages']
+        self.stages_var.set("  ".join(
+            f"{name} {stages[name]['mean_us']:.0f}/{stages[name]['max_us']:.0f} us"
+            for name in ('triggers', 'smoothing', 'synthesis', 'output', 'callback')))
+
+        counters = stats['counters']
+        self.counters_var.set(
+            f"late {counters['deadline_misses']}/{counters['callbacks']}  "
+            f"underflows {counters['output_underflow']}  overflows {counters['output_overflow']}  "
+            f"culled {counters['culled_partials'] / max(counters['callbacks'], 1):.0f}/chunk")
+        self.after(self.REFRESH_MS, self._refresh)
+
+    def _export(self):
+        filepath = filedialog.asksaveasfilename(
+            parent=self,
+            defaultextension='.json',
+            filetypes=[('JSON files', '*.json')],
+            title='Export audio stats'
+        )
+        if filepath:
+            try:
+                self.generator.stats.export(filepath)
+            except Exception as e:
+                messagebox.showerror('Error', f'Failed to export stats:\n{str(e)}', parent=self)
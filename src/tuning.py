@@ -0,0 +1,124 @@
+import os
+import numpy as np
+
+A4 = 440.0
+C0 = A4 * 2 ** -4.75
+NOTE_NAMES = ("C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B")
+QUARTER_TONE_NAMES = tuple(name + suffix for name in NOTE_NAMES for suffix in ("", "↑"))
+# 5-limit just intonation on C
+JUST_RATIOS = (1, 16 / 15, 9 / 8, 6 / 5, 5 / 4, 4 / 3, 45 / 32, 3 / 2, 8 / 5, 5 / 3, 9 / 5, 15 / 8)
+
+class TuningTable:
+    """Every note of a tuning system between `low` and `high` Hz, sorted by frequency.
+
+    Snapping and naming look notes up by binary search over the geometric
+    midpoints between neighbours, so a whole array of frequencies goes
+    through one np.searchsorted call.
+    """
+    def __init__(self, name, ratios, degree_names, period=2.0, base=C0, low=1.0, high=30000.0):
+        order = np.argsort(ratios)
+        ratios = np.asarray(ratios, dtype=np.float64)[order]
+        if len(ratios) == 0 or ratios[0] <= 0 or ratios[-1] >= period or period <= 1:
+            raise ValueError(f"Tuning '{name}' needs ratios in [1, period) and a period above 1")
+        self.name = name
+        self.period = float(period)
+        self.base = float(base)
+        self.degree_names = tuple(degree_names[i] for i in order)
+
+        first = int(np.floor(np.log(low / base) / np.log(period)))
+        last = int(np.ceil(np.log(high / base) / np.log(period)))
+        octaves = np.arange(first, last + 1)
+        self.frequencies = (base * self.period ** octaves[:, None] * ratios).ravel()
+        self.degrees = np.tile(np.arange(len(ratios)), len(octaves))
+        self.octaves = np.repeat(octaves, len(ratios))
+        self._edges = np.sqrt(self.frequencies[:-1] * self.frequencies[1:])
+        for arr in (self.frequencies, self.degrees, self.octaves, self._edges):
+            arr.flags.writeable = False
+
+    @classmethod
+    def equal(cls, name, steps, degree_names=None, **options):
+        return cls(name, 2 ** (np.arange(steps) / steps), degree_names or _degree_labels(steps), **options)
+
+    @classmethod
+    def from_scala(cls, filepath, **options):
+        """Load a Scala .scl file; the last pitch of the file is the period"""
+        with open(filepath, 'r', encoding='latin-1') as f:
+            lines = [line.strip() for line in f if not line.startswith('!')]
+        if len(lines) < 2:
+            raise ValueError(f"'{filepath}' is not a Scala scale file")
+        try:
+            count = int(lines[1].split()[0])
+        except (IndexError, ValueError):
+            raise ValueError(f"'{filepath}' has no note count on its second line")
+        pitches = [_scala_pitch(line) for line in lines[2:] if line][:count]
+        if count < 1 or len(pitches) < count:
+            raise ValueError(f"'{filepath}' lists fewer than {count} pitches")
+        ratios = [1.0] + pitches[:-1]
+        return cls(os.path.basename(filepath), ratios, _degree_labels(len(ratios)), period=pitches[-1], **options)
+
+    def nearest(self, freq):
+        """Index of the closest note (in cents) for each frequency"""
+        return np.searchsorted(self._edges, freq)
+
+    def snap(self, freq):
+        """Closest note frequency for each entry of `freq`; non-positive values pass through"""
+        freq = np.asarray(freq, dtype=np.float64)
+        return np.where(freq > 0, self.frequencies[self.nearest(freq)], freq)
+
+    def note(self, freq):
+        """(name, octave) of the closest note, or None for non-positive frequencies"""
+        if freq <= 0:
+            return None
+        i = int(self.nearest(freq))
+        return self.degree_names[self.degrees[i]], int(self.octaves[i])
+
+    def labels(self, freqs):
+        """Display labels such as "A4" for a batch of frequencies; "" where there is no note"""
+        freqs = np.asarray(freqs, dtype=np.float64)
+        indices = self.nearest(freqs).tolist()
+        names = self.degree_names
+        degrees = self.degrees
+        octaves = self.octaves
+        return [f"{names[degrees[i]]}{octaves[i]}" if f > 0 else ""
+                for i, f in zip(indices, freqs.tolist())]
+
+def _degree_labels(steps):
+    if steps == len(NOTE_NAMES):
+        return NOTE_NAMES
+    if steps == len(QUARTER_TONE_NAMES):
+        return QUARTER_TONE_NAMES
+    return tuple(f"[{i}]" for i in range(steps))
+
+def _scala_pitch(line):
+    # Cents contain a period, anything else is a ratio such as 3/2 or 2
+    token = line.split()[0]
+    try:
+        if '.' in token:
+            value = 2 ** (float(token) / 1200)
+        elif '/' in token:
+            numerator, denominator = token.split('/')
+            value = int(numerator) / int(denominator)
+        else:
+            value = float(int(token))
+    except (ValueError, ZeroDivisionError):
+        raise ValueError(f"Invalid Scala pitch '{token}'")
+    if value <= 0:
+        raise ValueError(f"Invalid Scala pitch '{token}'")
+    return value
+
+TUNINGS = {
+    '12-tet': lambda: TuningTable.equal('12-tet', 12),
+    '24-tet': lambda: TuningTable.equal('24-tet', 24),
+    'just': lambda: TuningTable('just', JUST_RATIOS, NOTE_NAMES),
+}
+_tables = {}
+
+def get_tuning(name="24-tet"):
+    """Table for a built-in tuning name (built once and shared) or a path to a .scl file"""
+    if str(name).lower().endswith('.scl'):
+        return TuningTable.from_scala(name)
+    if name not in TUNINGS:
+        raise ValueError(f"Unknown tuning '{name}'")
+    if name not in _tables:
+        _tables[name] = TUNINGS[name]()
+    return _tables[name]
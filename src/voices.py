@@ -0,0 +1,238 @@
+import numpy as np
+
+class VoicePool:
+    """Preallocated polyphonic voices layered on the harmonic and group triggers.
+
+    Each voice is one row of `partials` slots. Pressing a trigger latches its
+    harmonics at the current mouse pitch into a free voice; releasing it
+    drops the voice's targets to zero so it fades out with each partial's amp
+    smoothing, and the voice is reused once it falls silent. A stolen voice's
+    sound moves to one of as many tail rows, where it fades out over
+    STEAL_FADE ms instead of being cut. Every sounding voice and tail renders
+    together as one (rows * partials, frames) batch.
+
+    Drop-in for HarmonicBank on the callback side (smooth/synthesize), and
+    driven from the audio thread only.
+    """
+    STEAL_POLICIES = ('oldest', 'quietest')
+    # Per-slot state; parameters are copied in at note-on so voices outlive edits to the patch
+    FIELDS = ('phase', 'current_amp', 'target_amp', 'freq', 'gain', 'smoothing')
+    # Released voices whose loudest partial envelope is below this are done
+    SILENCE = 1e-4
+    # Amp smoothing, in ms, that stolen voices fade out with
+    STEAL_FADE = 5.0
+
+    def __init__(self, voices=16, partials=32, steal='oldest'):
+        if int(voices) < 1:
+            raise ValueError("A voice pool needs at least one voice")
+        if int(partials) < 1:
+            raise ValueError("Voices need at least one partial slot")
+        if steal not in self.STEAL_POLICIES:
+            raise ValueError(f"Unknown voice stealing policy '{steal}'")
+        self.voices = int(voices)
+        self.steal = steal
+        self.partials = 0
+        # Rows 0..voices-1 play notes; the rest are tails of stolen voices fading out
+        rows = 2 * self.voices
+        self.in_use = np.zeros(rows, dtype=bool)
+        self.released = np.zeros(rows, dtype=bool)
+        self.started = np.zeros(rows, dtype=np.int64)
+        self.loudness = np.empty(rows)
+        # Slots of each voice latched outside the audible band; they hold a gain of 0
+        self.culled_slots = np.zeros(rows, dtype=np.int64)
+        self.culled = 0
+        # Decay curves need reloading for these voices before the next chunk
+        self._stale = np.zeros(rows, dtype=bool)
+        # Trigger (key ids, harmonic rows) -> voice it holds, or -1 once that voice was stolen
+        self.held = {}
+        self._owners = [None] * rows
+        self._serial = 0
+        self._scratch_key = None
+        self.stolen = 0
+        self._allocate(int(partials))
+
+    def _allocate(self, partials):
+        # Grows every voice to `partials` slots, keeping what is already sounding
+        old = self.partials
+        for name in self.FIELDS:
+            values = np.zeros((len(self.in_use), partials))
+            if old:
+                values[:, :old] = getattr(self, name)
+            setattr(self, name, values)
+        self.partials = partials
+        self._scratch_key = None
+
+    def _prepare(self, generator, frame_count):
+        key = (self.partials, frame_count, generator.sample_rate)
+        if key != self._scratch_key:
+            rows = len(self.in_use) * self.partials
+            self.t = np.arange(frame_count) / generator.sample_rate
+            self.column = np.empty(rows)
+            self.curves = np.zeros((rows, frame_count))
+            self.envelope = np.empty((rows, frame_count))
+            self.waves = np.empty((rows, frame_count))
+            self.mix = np.empty(frame_count)
+            self._scratch_key = key
+            self._stale |= self.in_use
+        if self._stale.any():
+            for voice in np.flatnonzero(self._stale):
+                self._load_curves(generator, voice, frame_count)
+            self._stale[:] = False
+
+    def _load_curves(self, generator, voice, frame_count):
+        cache = generator.envelope_cache
+        base = voice * self.partials
+        for i, smoothing in enumerate(self.smoothing[voice].tolist()):
+            self.curves[base + i] = cache.get(smoothing, generator.sample_rate, frame_count).curve
+
+    def update(self, block, pressed, current_freq):
+        """Start voices for newly pressed triggers and release the ones let go.
+
+        `pressed` holds trigger numbers (indices into block.triggers), as for
+        HarmonicBank.apply_triggers.
+        """
+        down = [block.triggers[k] for k in pressed]
+        for trigger in [t for t in self.held if t not in down]:
+            voice = self.held.pop(trigger)
+            if voice >= 0:
+                self.released[voice] = True
+                self.target_amp[voice] = 0
+        for trigger in down:
+            if trigger not in self.held:
+                self.held[trigger] = self.note_on(block, trigger, current_freq)
+
+    def note_on(self, block, trigger, current_freq):
+        """Latch the trigger's harmonics at `current_freq` into a voice and return its index"""
+        rows = np.array(trigger[1], dtype=np.intp)
+        count = len(rows)
+        if count > self.partials:
+            self._allocate(count)
+        voice = self._free_voice()
+
+        freq = block.multiplier[rows] * current_freq
+        snap = block.snap_enabled[rows]
+        if snap.any():
+            freq[snap] = block.tuning.snap(freq[snap])
+        smoothing = block.amp_smoothing[rows]
+        band_gain = block.band.gain(freq, out=np.empty(count), work=np.empty(count))
+
+        for name in self.FIELDS:
+            getattr(self, name)[voice] = 0
+        self.freq[voice, :count] = freq
+        self.gain[voice, :count] = block.initial_amp[rows] * band_gain / block.total_amp
+        self.culled_slots[voice] = count - np.count_nonzero(band_gain)
+        self.target_amp[voice, :count] = 1
+        self.smoothing[voice, :count] = np.where(smoothing > 0, smoothing, block.global_amp_smoothing)
+
+        self.in_use[voice] = True
+        self.released[voice] = False
+        self.started[voice] = self._serial
+        self._serial += 1
+        self._stale[voice] = True
+        self._owners[voice] = trigger
+        return voice
+
+    def _free_voice(self):
+        # Lowest free index first, so the sounding voices stay packed at the front
+        playing = self.in_use[:self.voices]
+        if not playing.all():
+            return int(np.argmin(playing))
+
+        # Steal a voice that is already fading out before one that is still held
+        candidates = np.flatnonzero(self.released[:self.voices])
+        if not len(candidates):
+            candidates = np.arange(self.voices)
+        if self.steal == 'oldest':
+            voice = int(candidates[np.argmin(self.started[candidates])])
+        else:
+            loudness = np.sum(self.current_amp[:self.voices] * self.gain[:self.voices], axis=1)
+            voice = int(candidates[np.argmin(loudness[candidates])])
+
+        owner = self._owners[voice]
+        if self.held.get(owner) == voice:
+            # Still held: keep the trigger latched so it isn't restarted on the next key check
+            self.held[owner] = -1
+        self._fade_out(voice)
+        self.stolen += 1
+        return voice
+
+    def _fade_out(self, voice):
+        # Move the stolen voice's sound to a free tail row and let it fade from where it is
+        free = np.flatnonzero(~self.in_use[self.voices:])
+        if not len(free):
+            # Every tail is still fading from earlier steals: this one is cut
+            return
+        tail = self.voices + int(free[0])
+        for name in self.FIELDS:
+            getattr(self, name)[tail] = getattr(self, name)[voice]
+        self.target_amp[tail] = 0
+        self.smoothing[tail] = self.STEAL_FADE
+        self.culled_slots[tail] = self.culled_slots[voice]
+        self.in_use[tail] = True
+        self.released[tail] = True
+        self._stale[tail] = True
+
+    def _rows(self):
+        # Slot rows up to and including the highest sounding voice or tail
+        top = len(self.in_use) - int(np.argmax(self.in_use[::-1]))
+        return top * self.partials
+
+    def smooth(self, generator, block, frame_count):
+        """Build this chunk's amplitude envelopes; returns False when no voice is sounding"""
+        if not self.in_use.any():
+            self.culled = 0
+            return False
+        self.culled = int(np.sum(self.culled_slots, where=self.in_use))
+        self._prepare(generator, frame_count)
+        rows = self._rows()
+        current_amp = self.current_amp.reshape(-1)[:rows]
+        target_amp = self.target_amp.reshape(-1)[:rows]
+        column = self.column[:rows]
+        envelope = self.envelope[:rows]
+        waves = self.waves[:rows]
+
+        # Same envelope as HarmonicBank.smooth: target + (current - target) * curve
+        np.subtract(current_amp, target_amp, out=column)
+        np.copyto(waves, column[:, None])
+        np.multiply(waves, self.curves[:rows], out=envelope)
+        np.copyto(waves, target_amp[:, None])
+        envelope += waves
+        current_amp[:] = envelope[:, -1]
+        return True
+
+    def synthesize(self, generator, block, frame_count, amp):
+        """Oscillate and sum the voices enveloped by smooth(); returns the float64 mix"""
+        rows = self._rows()
+        phase = self.phase.reshape(-1)[:rows]
+        freq = self.freq.reshape(-1)[:rows]
+        column = self.column[:rows]
+        envelope = self.envelope[:rows]
+        waves = self.waves[:rows]
+
+        np.multiply(self.gain.reshape(-1)[:rows], amp, out=column)
+        np.copyto(waves, column[:, None])
+        envelope *= waves
+        # Latched voices hold their pitch, so every partial is at its target frequency
+        generator.oscillator.render(freq[:, None], phase[:, None], self.t, freq[:, None], out=waves)
+        envelope *= waves
+
+        np.multiply(freq, 2 * np.pi * frame_count / generator.sample_rate, out=column)
+        phase += column
+        np.remainder(phase, 2 * np.pi, out=phase)
+        mix = np.sum(envelope, axis=0, out=self.mix)
+        self._retire()
+        return mix
+
+    def _retire(self):
+        if not self.released.any():
+            return
+        np.max(self.current_amp, axis=1, out=self.loudness)
+        for voice in np.flatnonzero(self.released & (self.loudness < self.SILENCE)):
+            self.in_use[voice] = False
+            self.released[voice] = False
+            self.current_amp[voice] = 0
+            self.gain[voice] = 0
+            self._owners[voice] = None
+
+    def sounding(self):
+        return int(np.count_nonzero(self.in_use[:self.voices]))
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+from key_state import FakeKeySource
+from sine_gen import SineGen
+
+SAMPLE_RATE = 44100
+CHUNK = 256
+
+def play(engine, audible_low):
+    keys = FakeKeySource()
+    generator = SineGen(chunk_size=CHUNK, engine=engine, key_source=keys)
+    generator.key_state.start()
+    # Both glide up from 0 Hz towards ~55 and ~110 Hz, through the low edge of the band
+    generator.add_harmonic(1.0, 1.0, 20, 200, trigger_key='a')
+    generator.add_harmonic(2.0, 0.5, 20, 300, trigger_key='a')
+    if audible_low is not None:
+        generator.update_settings(audible_low=audible_low)
+    keys.press('a')
+    outputs = []
+    for _ in range(SAMPLE_RATE // CHUNK):
+        data, _ = generator.audio_callback(None, CHUNK, None, 0)
+        outputs.append(np.frombuffer(data, dtype=np.float32).copy())
+    return np.concatenate(outputs)
+
+@pytest.mark.parametrize('engine', ['loop', 'bank'])
+def test_culled_partials_come_back_in_phase(engine):
+    culled = play(engine, None)
+    unculled = play(engine, 0)
+    # Both partials are culled at first, then clear the band's low fade within 0.2 s
+    assert not np.array_equal(culled[:2048], unculled[:2048])
+    settled = SAMPLE_RATE // 5
+    assert np.abs(unculled[settled:]).max() > 0.1
+    np.testing.assert_allclose(culled[settled:], unculled[settled:], rtol=0, atol=1e-5)
@@ -0,0 +1,40 @@
+import glob
+import os
+import pytest
+from config_manager import ConfigManager
+from key_state import FakeKeySource
+from sine_gen import SineGen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_CONFIGS = sorted(glob.glob(os.path.join(ROOT, 'sample configs', '*.json')))
+
+@pytest.mark.parametrize('path', SAMPLE_CONFIGS, ids=os.path.basename)
+def test_sample_config_round_trips_through_npz(path, tmp_path):
+    config = ConfigManager.read_config(path)
+    preset = str(tmp_path / 'preset.npz')
+    ConfigManager.write_config(config, preset)
+    loaded = ConfigManager.read_config(preset)
+
+    assert ConfigManager.patch_specs(loaded) == ConfigManager.patch_specs(config)
+    assert ConfigManager.patch_settings(loaded) == ConfigManager.patch_settings(config)
+    for key in set(config) - {'harmonics', 'groups'}:
+        assert loaded[key] == config[key]
+
+def test_apply_config_goes_through_update_settings():
+    generator = SineGen(chunk_size=64, key_source=FakeKeySource())
+    generator.key_state.start()
+    generator.add_harmonic(1.0, 1.0, 0, 0, trigger_key='a')
+    generator.key_state.press('a')
+    generator.audio_callback(None, 64, None, 0)
+    old_smoothing = generator.global_amp_smoothing
+    assert any(key[0] == old_smoothing for key in generator.envelope_cache._kernels)
+
+    config = ConfigManager.read_config(os.path.join(ROOT, 'sample configs', 'flute.json'))
+    assert config['global_amp_smoothing'] != old_smoothing
+    ConfigManager.apply_config(generator, config)
+    # Past the next key check, so the flute's harmonics play and the cache is read again
+    for _ in range(20):
+        generator.audio_callback(None, 64, None, 0)
+
+    assert generator._params.global_amp_smoothing == config['global_amp_smoothing']
+    assert not any(key[0] == old_smoothing for key in generator.envelope_cache._kernels)
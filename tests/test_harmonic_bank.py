@@ -0,0 +1,34 @@
+import numpy as np
+from key_state import FakeKeySource
+from sine_gen import SineGen
+
+CHUNK = 512
+# Chunk at which each key goes down (True) or up (False)
+SCRIPT = {0: [('a', True)], 20: [('s', True)], 45: [('a', False)], 60: [('d', True)],
+          80: [('s', False), ('a', True)], 110: [('d', False), ('a', False)]}
+
+def play(engine):
+    keys = FakeKeySource()
+    generator = SineGen(chunk_size=CHUNK, engine=engine, key_source=keys)
+    generator.key_state.start()
+    with generator.batch_update():
+        for m in range(1, 9):
+            generator.add_harmonic(m * 1.5, 1.0 / m, 10 * m, 20 + 15 * m, trigger_key='a')
+        generator.create_group('upper', 's', [3.0, 6.0, 9.0])
+        generator.add_harmonic(0.5, 0.7, 40, 0, trigger_key='d')
+        generator.set_harmonic_params(4.5, snap_enabled=True)
+        # Band gain is taken per chunk in both engines, but keep the glides from 0 Hz out of it
+        generator.update_settings(audible_low=0)
+    outputs = []
+    for chunk in range(140):
+        for key, down in SCRIPT.get(chunk, ()):
+            (keys.press if down else keys.release)(key)
+        generator.mouse_x = 300 + 7 * chunk
+        data, _ = generator.audio_callback(None, CHUNK, None, 0)
+        outputs.append(np.frombuffer(data, dtype=np.float32).copy())
+    return np.concatenate(outputs)
+
+def test_bank_matches_the_loop_engine():
+    loop, bank = play('loop'), play('bank')
+    assert np.abs(loop).max() > 0.1
+    np.testing.assert_allclose(bank, loop, rtol=0, atol=1e-6)
@@ -0,0 +1,80 @@
+from key_state import FakeKeySource, KeyState
+from sine_gen import SineGen
+
+def started():
+    keys = FakeKeySource()
+    state = KeyState(keys)
+    state.start()
+    return keys, state
+
+def test_single_key():
+    keys, state = started()
+    ids = state.combo_ids('A')
+    assert ids == state.combo_ids('a')
+    assert not state.is_pressed(ids)
+    keys.press('a')
+    assert state.is_pressed(ids)
+    keys.release('A')
+    assert not state.is_pressed(ids)
+
+def test_space_and_empty_triggers():
+    keys, state = started()
+    assert state.combo_ids(' ') == state.combo_ids('space')
+    keys.press(' ')
+    assert state.is_pressed(state.combo_ids('space'))
+    # A harmonic without a trigger key never sounds
+    assert not state.is_pressed(state.combo_ids(''))
+
+def test_combo_needs_every_key():
+    keys, state = started()
+    combo = state.combo_ids('ctrl+a')
+    assert combo == (state.key_id('ctrl'), state.key_id('a'))
+    keys.press('a')
+    assert not state.is_pressed(combo)
+    keys.press('ctrl')
+    assert state.is_pressed(combo)
+    assert state.is_pressed(state.combo_ids('a'))
+    # Releasing either key releases the combo, in whichever order
+    keys.release('ctrl')
+    assert not state.is_pressed(combo)
+    keys.press('ctrl')
+    keys.release('a')
+    assert not state.is_pressed(combo)
+
+def test_keys_past_capacity_never_trigger():
+    keys = FakeKeySource()
+    state = KeyState(keys, max_keys=2)
+    state.start()
+    assert state.combo_ids('a+b') != ()
+    assert state.combo_ids('c') == ()
+    assert state.combo_ids('a+c') == ()
+    keys.press('c')
+    assert not state.pressed.any()
+
+def test_stop_releases_everything():
+    keys, state = started()
+    keys.press('a')
+    state.stop()
+    assert not state.is_pressed(state.combo_ids('a'))
+
+def test_trigger_transitions_reach_the_harmonics():
+    for engine in ('loop', 'bank'):
+        keys = FakeKeySource()
+        generator = SineGen(chunk_size=1024, engine=engine, key_source=keys)
+        generator.key_state.start()
+        generator.add_harmonic(1.0, trigger_key='a')
+        generator.add_harmonic(2.0, trigger_key='ctrl+a')
+        generator.add_harmonic(3.0, trigger_key='c')
+        generator.create_group('pair', 'b', [3.0])
+        low, combo, grouped = generator.harmonics
+        steps = [((), (0, 0, 0)), (('a',), (1, 0, 0)), (('a', 'ctrl'), (1, 1, 0)),
+                 (('ctrl', 'b'), (0, 0, 1)), ((), (0, 0, 0))]
+        down = set()
+        for held, expected in steps:
+            for key in down - set(held):
+                keys.release(key)
+            for key in set(held) - down:
+                keys.press(key)
+            down = set(held)
+            generator.audio_callback(None, 1024, None, 0)
+            assert (low.target_amp, combo.target_amp, grouped.target_amp) == expected, (engine, held)
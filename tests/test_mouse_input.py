@@ -0,0 +1,87 @@
+import numpy as np
+import sine_gen
+from key_state import FakeKeySource
+from mouse_input import MouseInput
+from sine_gen import SineGen
+from test_render_alloc import CHUNK, build, numpy_allocations
+
+SAMPLE_RATE = 44100
+
+def test_ramp_interpolates_between_events():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        mouse = MouseInput(capacity=int(rng.integers(2, 40)), resolution=0.0)
+        at = 0.0
+        for _ in range(int(rng.integers(1, 80))):
+            at += float(rng.exponential(0.002))
+            mouse.push(rng.uniform(0, 1920), rng.uniform(0, 1080), at=at)
+        frame_count = int(rng.choice([1, 64, 512]))
+        end = at + float(rng.uniform(-0.02, 0.02))
+        out = np.empty((2, frame_count))
+        assert mouse.ramp(end, frame_count, SAMPLE_RATE, out)
+
+        stored = min(mouse.count, mouse.capacity)
+        slots = (np.arange(stored) + mouse.count - stored) % mouse.capacity
+        sample_times = end + np.arange(1 - frame_count, 1) / SAMPLE_RATE
+        for axis in range(2):
+            expected = np.interp(sample_times, mouse.times[slots], mouse.positions[axis, slots])
+            np.testing.assert_allclose(out[axis], expected, rtol=0, atol=1e-6)
+
+def test_ramp_waits_for_the_first_event():
+    out = np.zeros((2, 4))
+    assert not MouseInput().ramp(1.0, 4, SAMPLE_RATE, out)
+    assert not out.any()
+
+def test_ramped_render_does_not_allocate_chunk_buffers(monkeypatch):
+    clock = [1.0]
+    monkeypatch.setattr(sine_gen, 'perf_counter', lambda: clock[0])
+    for engine in ('loop', 'bank'):
+        generator = build(engine, 'exact')
+
+        class Moving:
+            # A pointer reporting three moves per chunk, replayed by audio_callback
+            def __init__(self):
+                self.chunk = 0
+
+            def audio_callback(self, *args):
+                for k in range(3):
+                    x = 500 + (3 * self.chunk + k) % 50
+                    generator.mouse.push(x, 500, at=clock[0] + k * CHUNK / SAMPLE_RATE / 3)
+                clock[0] += CHUNK / SAMPLE_RATE
+                self.chunk += 1
+                return generator.audio_callback(*args)
+
+        moving = Moving()
+        for _ in range(50):
+            moving.audio_callback(None, CHUNK, None, 0)
+        assert generator.pitch_sweep is not None
+        held, peak = numpy_allocations(moving, 50)
+        assert held == 0
+        assert peak < CHUNK * 8
+
+def test_held_mouse_sounds_the_same_at_any_chunk_size(monkeypatch):
+    clock = [1.0]
+    monkeypatch.setattr(sine_gen, 'perf_counter', lambda: clock[0])
+
+    def play(chunk):
+        keys = FakeKeySource()
+        generator = SineGen(chunk_size=chunk, key_source=keys)
+        generator.key_state.start()
+        for m in range(1, 6):
+            generator.add_harmonic(float(m), 1.0 / m, 20, 40 * m, trigger_key='a')
+        # Band gain is taken once per chunk, so keep the glide up from 0 Hz out of the low fade
+        generator.update_settings(audible_low=0)
+        clock[0] = 1.0
+        generator.mouse.push(1200, 400, at=clock[0])
+        keys.press('a')
+        outputs = []
+        # 882-sample key checks fall every 1024 frames at both sizes
+        for _ in range(16 * 1024 // chunk):
+            clock[0] += chunk / SAMPLE_RATE
+            data, _ = generator.audio_callback(None, chunk, None, 0)
+            outputs.append(np.frombuffer(data, dtype=np.float32).copy())
+        return np.concatenate(outputs)
+
+    small, large = play(64), play(512)
+    assert np.abs(small).max() > 0.1
+    np.testing.assert_allclose(small, large, rtol=0, atol=1e-5)
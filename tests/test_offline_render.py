@@ -0,0 +1,30 @@
+import os
+import wave
+import numpy as np
+import pytest
+from config_manager import ConfigManager
+from key_state import FakeKeySource
+from offline_render import load_script, render_offline
+from sine_gen import SineGen
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def render(engine, block_size, wav_path):
+    keys = FakeKeySource()
+    generator = SineGen(chunk_size=block_size, engine=engine, key_source=keys)
+    ConfigManager.apply_config(generator, ConfigManager.read_config(os.path.join(ROOT, 'sample configs', 'flute.json')))
+    script = load_script(os.path.join(ROOT, 'sample gestures', 'sweep.json'))
+    script['duration'] = 3.0
+    render_offline(generator, keys, script, wav_path, block_size)
+    with wave.open(wav_path, 'rb') as wav:
+        return np.frombuffer(wav.readframes(wav.getnframes()), dtype=np.int16).astype(np.int32)
+
+@pytest.mark.parametrize('engine', ['loop', 'bank'])
+def test_block_size_does_not_change_the_sound(engine, tmp_path):
+    # The script's events fall every 0.5 s, on block starts and key checks at both sizes
+    small = render(engine, 63, str(tmp_path / 'small.wav'))
+    large = render(engine, 2205, str(tmp_path / 'large.wav'))
+    assert len(small) == len(large) == 3 * 44100
+    assert np.abs(small).max() > 1000
+    # Equal up to rounding to 16 bits
+    assert np.abs(small - large).max() <= 1
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from oscillators import ExactOscillator, RecursiveOscillator
+
+@pytest.mark.parametrize('per_row_curve', [False, True])
+def test_recursive_mixes_steady_and_gliding_partials(per_row_curve):
+    rng = np.random.default_rng(1)
+    rows, frames = 12, 1024
+    t = np.arange(frames) / 44100
+    freq = rng.uniform(50, 5000, rows)[:, None]
+    phase = rng.uniform(0, 2 * np.pi, rows)[:, None]
+    target = freq.copy()
+    # Rows 1, 4, 7, ... still glide toward their target; the rest hold it
+    target[1::3] *= 1.01
+    delta = target - freq
+    u = np.cumsum(rng.uniform(0, 1, (rows, frames) if per_row_curve else frames), axis=-1) / 44100
+    oscillator = RecursiveOscillator()
+    out = np.empty((rows, frames))
+    for _ in range(3):
+        # Repeated to run on warm scratch buffers too
+        oscillator.render(freq, phase, t, target, out=out, sweep=(delta, u))
+        expected = ExactOscillator().render(freq, phase, t, sweep=(delta, u))
+        np.testing.assert_allclose(out, expected, rtol=0, atol=1e-9)
+    assert oscillator.stats['recursive_partials'] == 3 * 8
+    assert oscillator.stats['fallback_partials'] == 3 * 4
+    np.testing.assert_allclose(oscillator.render(freq, phase, t, target, sweep=(delta, u)), expected,
+                               rtol=0, atol=1e-9)
@@ -0,0 +1,94 @@
+import os
+import signal
+import time
+import numpy as np
+import pytest
+from key_state import FakeKeySource
+from sine_gen import SineGen
+
+CHUNK = 256
+
+def build(engine, chunk_size=CHUNK, **engine_options):
+    keys = FakeKeySource()
+    generator = SineGen(chunk_size=chunk_size, engine=engine, key_source=keys, engine_options=engine_options or None)
+    generator.key_state.start()
+    for m in range(1, 13):
+        generator.add_harmonic(m * 1.5, 1.0 / m, 5 if m % 2 else 0, 3 if m % 3 else 0,
+                               trigger_key='a' if m % 2 else 'b')
+    return generator, keys
+
+def play(generator, keys, chunks):
+    """Render `chunks` chunks while the mouse moves and keys change, returning each chunk's output"""
+    outputs = []
+    for i in range(chunks):
+        generator.mouse_x = 300 + 37 * i
+        generator.mouse_y = 200 + 23 * (i % 11)
+        if i == 0:
+            keys.press('a')
+        elif i == 9:
+            keys.press('b')
+        elif i == 20:
+            keys.release('a')
+        data, _ = generator.audio_callback(None, CHUNK, None, 0)
+        outputs.append(np.frombuffer(data, dtype=np.float32).copy())
+    return outputs
+
+@pytest.mark.parametrize('lookahead', [None, 0, 2])
+def test_parallel_matches_bank_delayed_by_lookahead(lookahead):
+    options = {'workers': 2, 'realtime': False}
+    if lookahead is not None:
+        options['lookahead'] = lookahead
+    generator, keys = build('parallel', **options)
+    try:
+        delay = generator.bank.lookahead
+        parallel = play(generator, keys, 40)
+    finally:
+        generator.bank.close()
+    reference = play(*build('bank'), 40)
+
+    assert any(chunk.any() for chunk in reference)
+    for i in range(delay):
+        assert not parallel[i].any()
+    for i in range(delay, 40):
+        np.testing.assert_array_equal(parallel[i], reference[i - delay])
+
+@pytest.mark.skipif(not hasattr(signal, 'SIGSTOP'), reason="needs SIGSTOP to hold a worker back")
+def test_realtime_callback_does_not_wait_for_a_late_worker():
+    chunk = 4096
+    generator, keys = build('parallel', chunk, workers=2, lookahead=1)
+    bank = generator.bank
+    seconds = chunk / generator.sample_rate
+    try:
+        keys.press('a')
+        keys.press('b')
+
+        def callback():
+            start = time.perf_counter()
+            data, _ = generator.audio_callback(None, chunk, None, 0)
+            elapsed = time.perf_counter() - start
+            time.sleep(max(seconds - elapsed, 0))
+            return np.frombuffer(data, dtype=np.float32).copy(), elapsed
+
+        for _ in range(4):
+            callback()
+        os.kill(bank._processes[1].pid, signal.SIGSTOP)
+        try:
+            late = [callback() for _ in range(4)]
+        finally:
+            os.kill(bank._processes[1].pid, signal.SIGCONT)
+        # Every chunk is on time. The first was finished before the worker stopped; the next
+        # two play the running worker's partials alone, and then the stopped worker holds
+        # every ring slot
+        assert all(elapsed < seconds / 2 for _, elapsed in late)
+        assert bank.late_chunks == 3
+        assert late[1][0].any() and late[2][0].any()
+        assert not late[3][0].any()
+
+        for _ in range(4):
+            callback()
+        missed = bank.late_chunks
+        recovered = [callback()[0] for _ in range(4)]
+        assert bank.late_chunks == missed
+        assert all(output.any() for output in recovered)
+    finally:
+        bank.close()
@@ -0,0 +1,117 @@
+import json
+import os
+import time
+import pytest
+from key_state import FakeKeySource
+from preset_bank import PresetBank, patch_bytes
+from sine_gen import SineGen
+
+def write(tmp_path, name, multipliers, mtime=None):
+    path = tmp_path / f'{name}.json'
+    config = {'global_amp_smoothing': 40,
+              'harmonics': [{'multiplier': m, 'amplitude': 0.5, 'trigger_key': 'a'} for m in multipliers]}
+    path.write_text(json.dumps(config))
+    if mtime is not None:
+        # Explicit times: back-to-back writes can share an mtime on coarse filesystems
+        os.utime(path, (mtime, mtime))
+    return str(path)
+
+def make_bank(**options):
+    keys = FakeKeySource()
+    generator = SineGen(key_source=keys)
+    generator.key_state.start()
+    return keys, PresetBank(generator, **options)
+
+def refilled(preset):
+    # select() prepares the next copy on a background thread
+    deadline = time.monotonic() + 5
+    while preset.patch is None:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+def test_select_installs_the_preset(tmp_path):
+    _, bank = make_bank()
+    bank.add('low', write(tmp_path, 'low', [1.0, 2.0]))
+    bank.add('high', write(tmp_path, 'high', [3.0, 4.0, 5.0]))
+    patch = bank.select('high')
+    assert patch.installed
+    assert [h.multiplier for h in bank.generator.harmonics] == [3.0, 4.0, 5.0]
+    assert bank.generator.global_amp_smoothing == 40
+    assert list(bank.presets) == ['low', 'high']
+    # The installed patch is live; selecting again installs a fresh copy
+    refilled(bank.presets['high'])
+    assert bank.presets['high'].patch is not patch
+    assert bank.select('high') is not patch
+    with pytest.raises(ValueError):
+        bank.select('missing')
+
+def test_poll_selects_once_per_press(tmp_path):
+    keys, bank = make_bank()
+    bank.add('low', write(tmp_path, 'low', [1.0]), hotkey='ctrl+1')
+    assert bank.poll() is None
+    keys.press('ctrl')
+    keys.press('1')
+    assert bank.poll() == 'low'
+    assert bank.poll() is None
+    keys.release('1')
+    assert bank.poll() is None
+    keys.press('1')
+    assert bank.poll() == 'low'
+
+def test_least_recently_selected_is_evicted(tmp_path):
+    _, bank = make_bank()
+    presets = [bank.add(name, write(tmp_path, name, [1.0, 2.0, 3.0])) for name in ('one', 'two', 'three')]
+    size = presets[0].nbytes
+    assert size == patch_bytes(presets[0].patch) > 0
+    assert bank.bytes == 3 * size
+
+    _, bank = make_bank(max_bytes=int(2.5 * size))
+    one, two, three = [bank.add(name, write(tmp_path, name, [1.0, 2.0, 3.0])) for name in ('one', 'two', 'three')]
+    assert one.patch is None
+    assert two.patch is not None and three.patch is not None
+    assert bank.bytes == 2 * size
+
+    bank.select('two')
+    refilled(two)
+    four = bank.add('four', write(tmp_path, 'four', [1.0, 2.0, 3.0]))
+    # 'three' was added before 'two' was last selected
+    assert three.patch is None
+    assert two.patch is not None and four.patch is not None
+    assert bank.bytes == 2 * size <= bank.max_bytes
+
+    # An evicted preset is prepared again on demand
+    patch = bank.select('one')
+    assert [h.multiplier for h in patch.harmonics] == [1.0, 2.0, 3.0]
+
+def test_failed_reload_is_reported_once(tmp_path):
+    _, bank = make_bank()
+    path = write(tmp_path, 'preset', [1.0, 2.0], mtime=1000)
+    preset = bank.add('preset', path)
+    assert bank.reload() == []
+
+    with open(path, 'w') as f:
+        f.write('{"harmonics": [')
+    os.utime(path, (2000, 2000))
+    assert bank.reload() == []
+    assert len(bank.errors) == 1
+    name, error = bank.errors[0]
+    assert name == 'preset' and isinstance(error, ValueError)
+    # Skipped until the file changes again; the last good config stays
+    assert bank.reload() == []
+    assert len(bank.errors) == 1
+    assert len(preset.config['harmonics']) == 2
+    assert preset.patch is not None
+
+    os.remove(path)
+    assert bank.reload() == []
+    assert len(bank.errors) == 2
+    assert bank.reload() == []
+    assert len(bank.errors) == 2
+
+    write(tmp_path, 'preset', [1.0, 2.0, 3.0], mtime=3000)
+    assert bank.reload() == ['preset']
+    assert preset.error is None
+    assert preset.mtime == 3000
+    assert [h.multiplier for h in preset.patch.harmonics] == [1.0, 2.0, 3.0]
+    assert len(bank.errors) == 2
+    assert bank.reload() == []
@@ -0,0 +1,70 @@
+import tracemalloc
+import numpy as np
+import pytest
+from key_state import FakeKeySource
+from sine_gen import SineGen
+
+CHUNK = 1024
+
+def build(engine, oscillator):
+    keys = FakeKeySource()
+    generator = SineGen(chunk_size=CHUNK, engine=engine, oscillator=oscillator, key_source=keys)
+    generator.key_state.start()
+    for m in range(1, 40):
+        # No pitch glide: partials gliding into the audible band would grow the active set chunk by chunk
+        generator.add_harmonic(float(m), 0.5, 0 if m % 3 == 0 else 30, 0, trigger_key='a')
+    generator.key_state.press('a')
+    return generator
+
+def numpy_allocations(generator, chunks):
+    """(numpy blocks still held, peak numpy bytes above the starting point) over `chunks` callbacks"""
+    numpy_only = [tracemalloc.DomainFilter(True, np.lib.tracemalloc_domain)]
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot().filter_traces(numpy_only)
+        tracemalloc.reset_peak()
+        start = tracemalloc.get_traced_memory()[0]
+        for _ in range(chunks):
+            generator.audio_callback(None, CHUNK, None, 0)
+        peak = tracemalloc.get_traced_memory()[1] - start
+        after = tracemalloc.take_snapshot().filter_traces(numpy_only)
+    finally:
+        tracemalloc.stop()
+    held = sum(stat.count_diff for stat in after.compare_to(before, 'lineno') if stat.count_diff > 0)
+    return held, peak
+
+@pytest.mark.parametrize('engine', ['loop', 'bank'])
+@pytest.mark.parametrize('oscillator', ['exact', 'wavetable', 'recursive'])
+def test_steady_render_does_not_allocate_chunk_buffers(engine, oscillator):
+    generator = build(engine, oscillator)
+    # The first chunks size the scratch buffers and settle the envelopes
+    for _ in range(50):
+        generator.audio_callback(None, CHUNK, None, 0)
+    held, peak = numpy_allocations(generator, 50)
+    assert held == 0
+    # Any temporary the size of a chunk would be CHUNK * 8 bytes
+    assert peak < CHUNK * 8
+
+def test_mixed_recursive_render_does_not_allocate_chunk_buffers():
+    generator = build('bank', 'recursive')
+    # Every other partial glides after each move while the rest jump straight to pitch
+    for i, harmonic in enumerate(generator.harmonics):
+        generator.set_harmonic_params(harmonic.multiplier, pitch_smoothing=40 if i % 2 else 0)
+
+    class Wandering:
+        def __init__(self):
+            self.chunk = 0
+
+        def audio_callback(self, *args):
+            generator.mouse_x = 900 + 40 * (self.chunk % 5)
+            self.chunk += 1
+            return generator.audio_callback(*args)
+
+    wandering = Wandering()
+    for _ in range(50):
+        wandering.audio_callback(None, CHUNK, None, 0)
+    stats = generator.oscillator.stats
+    assert stats['recursive_partials'] and stats['fallback_partials']
+    held, peak = numpy_allocations(wandering, 50)
+    assert held == 0
+    assert peak < CHUNK * 8
@@ -0,0 +1,62 @@
+import math
+import numpy as np
+import pytest
+from sequence_expr import SequenceExpression
+
+@pytest.mark.parametrize('source, x, expected', [
+    ("x * 2", 3, 6.0),
+    ("  x + 1  ", 1, 2.0),
+    ("x / 3 + 7 // 2 - 5 % 3", 3, 2.0),
+    ("-x ** 2", 3, -9.0),
+    ("1 / 2", 0, 0.5),
+    ("math.sqrt(x) + math.pi", 4, 2 + math.pi),
+    ("math.atan2(x, 1) * 4", 1, math.pi),
+    ("math.pow(x, 1.5)", 4, 8.0),
+    ("math.log(x, 2)", 8, 3.0),
+])
+def test_valid_expressions(source, x, expected):
+    assert SequenceExpression(source)(x) == pytest.approx(expected)
+
+def test_sequence_iterates_from_start():
+    np.testing.assert_allclose(SequenceExpression("x * 2").sequence(1, 4), [2, 4, 8, 16])
+    np.testing.assert_allclose(SequenceExpression("x + 1").sequence(0.5, 0), [])
+
+@pytest.mark.parametrize('source', [
+    # Attribute access beyond math.<name>
+    "x.real", "math.__dict__", "math.sys", "(1).__class__", "math.sqrt.__self__",
+    # Dunder and other names
+    "__import__('os')", "__builtins__", "y + 1", "math", "abs(x)",
+    # Calls outside the whitelist
+    "open('f')", "math.sqrt(x=1)", "math.sqrt(*[x])", "(lambda: 1)()",
+    # Lambdas, comprehensions and other syntax
+    "lambda x: x", "[x for x in (1, 2)]", "{x for x in (1,)}", "(x for x in (1,))",
+    "x if x else 1", "x < 1", "x and 1", "[x]", "(x, 1)", "f'{x}'", "(y := 1)", "x[0]",
+    # Constants other than numbers, operators outside the arithmetic ones
+    "'1'", "None", "1j", "True", "x ^ 2", "x << 1", "x @ x", "~x",
+    # Not an expression at all
+    "import os", "x = 1", "", "x +",
+])
+def test_rejected_expressions(source):
+    with pytest.raises(ValueError):
+        SequenceExpression(source)
+
+def test_power_hint():
+    with pytest.raises(ValueError, match=r"\*\*"):
+        SequenceExpression("x ^ 2")
+
+def test_huge_exponents_overflow_instead_of_hanging():
+    # Integer literals are floats, so neither compiling nor evaluating builds a huge integer
+    expression = SequenceExpression("9 ** 9 ** 9 + x")
+    with pytest.raises(OverflowError):
+        expression(1)
+    with pytest.raises(ValueError, match="Iteration 1"):
+        expression.sequence(1, 3)
+    with pytest.raises(ValueError, match="Iteration 2"):
+        SequenceExpression("x ** 100").sequence(10, 5)
+
+@pytest.mark.parametrize('source, start', [
+    ("x / 0", 1), ("math.log(x)", -1), ("x ** 0.5", -4), ("x * 1e308", 10), ("math.sqrt(x, 2)", 1),
+])
+def test_bad_values_fail_the_sequence(source, start):
+    with pytest.raises(ValueError, match="Iteration 1"):
+        SequenceExpression(source).sequence(start, 2)
@@ -0,0 +1,39 @@
+import pytest
+from sine_gen import SineGen
+
+def generator_with(*multipliers):
+    generator = SineGen()
+    for multiplier in multipliers:
+        generator.add_harmonic(multiplier)
+    return generator
+
+@pytest.mark.parametrize('stored, query', [
+    # Either side of the bucket edge at 2.00005, with the default 1e-4 tolerance
+    (2.000049, 2.000051), (2.000051, 2.000049),
+    # Within tolerance but a whole bucket apart
+    (2.00001, 2.00009), (2.00009, 2.00001),
+])
+def test_find_harmonic_across_a_bucket_edge(stored, query):
+    generator = generator_with(stored)
+    assert generator._multiplier_key(stored) != generator._multiplier_key(query)
+    assert generator._get_harmonic_index(query) == 0
+    assert generator._get_harmonic_index(query, exact=True) == -1
+
+@pytest.mark.parametrize('query', [2.00011, 1.99989])
+def test_find_harmonic_outside_tolerance(query):
+    assert generator_with(2.0)._get_harmonic_index(query) == -1
+
+def test_close_multipliers_stay_distinct():
+    generator = generator_with(3.0, 3.00004)
+    assert [h.multiplier for h in generator.harmonics] == [3.0, 3.00004]
+    assert generator._get_harmonic_index(3.0, exact=True) == 0
+    assert generator._get_harmonic_index(3.00004, exact=True) == 1
+    # A near miss resolves to the closer of the two
+    assert generator._get_harmonic_index(2.99999) == 0
+    assert generator._get_harmonic_index(3.00005) == 1
+    # Adding either again is a no-op
+    generator.add_harmonic(3.00004)
+    assert len(generator.harmonics) == 2
+    generator.remove_harmonic(3.00004)
+    assert [h.multiplier for h in generator.harmonics] == [3.0]
+    assert generator._get_harmonic_index(3.00004) == 0
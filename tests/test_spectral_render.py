@@ -0,0 +1,29 @@
+import numpy as np
+import pytest
+from key_state import FakeKeySource
+from sine_gen import SineGen
+
+def render(chunk, crossover, chunks):
+    keys = FakeKeySource()
+    generator = SineGen(chunk_size=chunk, engine='bank', key_source=keys)
+    generator.key_state.start()
+    generator.update_settings(spectral_crossover=crossover)
+    # Held pitches: the case the spectral path's accuracy is stated for
+    for m in range(1, 201):
+        generator.add_harmonic(1 + 0.37 * m, m ** -0.5, 30, 0, trigger_key='a')
+    keys.press('a')
+    return np.concatenate([np.frombuffer(generator.audio_callback(None, chunk, None, 0)[0], dtype=np.float32)
+                           for _ in range(chunks)]).astype(float)
+
+def test_time_domain_is_the_default():
+    assert SineGen(key_source=FakeKeySource()).spectral_crossover == float('inf')
+
+@pytest.mark.parametrize('chunk', [64, 512])
+def test_spectral_mix_stays_close_to_time_domain(chunk):
+    chunks = 16384 // chunk
+    exact = render(chunk, float('inf'), chunks)
+    spectral = render(chunk, 1, chunks)
+    # Once the amplitude envelopes have settled
+    settled = slice(len(exact) // 2, None)
+    error = np.sqrt(np.mean((spectral[settled] - exact[settled]) ** 2))
+    assert error < 2e-3 * np.sqrt(np.mean(exact[settled] ** 2))
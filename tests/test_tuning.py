@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+from tuning import A4, JUST_RATIOS, TuningTable, get_tuning
+
+def test_snap_to_twelve_tet():
+    table = get_tuning('12-tet')
+    semitone = 2 ** (1 / 12)
+    # Just under and just over half a semitone from A4
+    freqs = [A4 * semitone ** 0.49, A4 * semitone ** 0.51, A4 / semitone ** 0.49, A4]
+    np.testing.assert_allclose(table.snap(freqs), [A4, A4 * semitone, A4, A4])
+    # Non-positive frequencies pass through untouched
+    np.testing.assert_array_equal(table.snap([0.0, -5.0]), [0.0, -5.0])
+
+def test_snap_to_just_intonation():
+    table = get_tuning('just')
+    c4 = A4 * 2 ** -0.75
+    np.testing.assert_allclose(table.snap(c4 * 1.49), c4 * 1.5)
+    np.testing.assert_allclose(table.snap(c4 * np.array(JUST_RATIOS) * 1.001), c4 * np.array(JUST_RATIOS))
+
+def test_note_labels():
+    table = get_tuning('12-tet')
+    assert table.note(A4) == ('A', 4)
+    assert table.note(261.63) == ('C', 4)
+    assert table.note(0.0) is None
+    assert table.labels([A4, 466.2, 27.5, 0.0]) == ['A4', 'A#4', 'A0', '']
+    quarter = get_tuning('24-tet')
+    assert quarter.labels([A4 * 2 ** (1 / 24), A4]) == ['A↑4', 'A4']
+
+def test_bad_ratios_rejected():
+    with pytest.raises(ValueError):
+        TuningTable('empty', [], ())
+    with pytest.raises(ValueError):
+        TuningTable('past the period', [1.0, 2.5], ('a', 'b'))
+    with pytest.raises(ValueError):
+        get_tuning('19-tet')
+
+def write(tmp_path, text, name='scale.scl'):
+    path = tmp_path / name
+    path.write_text(text, encoding='latin-1')
+    return str(path)
+
+def test_scala_ratios_cents_and_comments(tmp_path):
+    path = write(tmp_path, "! scale.scl\n!\nPentatonic mix\n 5\n!\n 9/8\n 386.31371 cents\n3/2 fifth\n"
+                           "! trailing comment\n 1100.0\n2/1\n")
+    table = get_tuning(path)
+    assert table.name == 'scale.scl'
+    assert table.period == 2.0
+    assert table.degree_names == ('[0]', '[1]', '[2]', '[3]', '[4]')
+    assert table.degrees[0] == 0
+    octave = table.frequencies[:5] / table.frequencies[0]
+    np.testing.assert_allclose(octave, [1, 9 / 8, 5 / 4, 3 / 2, 2 ** (11 / 12)], rtol=1e-6)
+
+def test_scala_period_other_than_an_octave(tmp_path):
+    # Bohlen-Pierce: 13 equal steps of a tritave
+    steps = "".join(f"{1901.955 * k / 13:.5f}\n" for k in range(1, 13))
+    table = get_tuning(write(tmp_path, f"BP\n13\n{steps}3/1\n"))
+    assert table.period == 3.0
+    assert len(table.degree_names) == 13
+
+@pytest.mark.parametrize('text', [
+    "",
+    "! only comments\n",
+    "Description\nnot a count\n3/2\n",
+    "Description\n3\n9/8\n3/2\n",
+    "Description\n2\n9/8\nthree halves\n",
+    "Description\n2\n9/0\n2/1\n",
+    "Description\n2\n-3/2\n2/1\n",
+    "Description\n0\n",
+])
+def test_malformed_scala_rejected(tmp_path, text):
+    with pytest.raises(ValueError):
+        get_tuning(write(tmp_path, text))
@@ -0,0 +1,35 @@
+import numpy as np
+from key_state import FakeKeySource
+from sine_gen import SineGen
+
+CHUNK = 64
+
+def test_stolen_voice_fades_instead_of_clicking():
+    keys = FakeKeySource()
+    generator = SineGen(chunk_size=CHUNK, key_source=keys)
+    generator.key_state.start()
+    generator.key_check_interval = 0
+    for key, multiplier in zip('abc', (1.0, 1.5, 2.0)):
+        generator.add_harmonic(multiplier, 1.0, 10, 0, trigger_key=key)
+    generator.set_polyphony(2)
+
+    chunks = []
+    for i in range(200):
+        if i == 10:
+            keys.press('a')
+        elif i == 20:
+            keys.press('b')
+        elif i == 100:
+            # Both voices are held, so this steals the oldest one
+            keys.press('c')
+        data, _ = generator.audio_callback(None, CHUNK, None, 0)
+        chunks.append(np.frombuffer(data, dtype=np.float32).astype(float))
+    step = np.abs(np.diff(np.concatenate(chunks)))
+
+    assert generator.voices.stolen == 1
+    held = step[30 * CHUNK:90 * CHUNK].max()
+    # The steal happens at the start of chunk 100; no sample jump there beyond what steady playing has
+    assert step[99 * CHUNK:110 * CHUNK].max() <= 1.5 * held
+    # The tail is retired once it falls silent
+    assert generator.voices.sounding() == 2
+    assert not generator.voices.in_use[generator.voices.voices:].any()